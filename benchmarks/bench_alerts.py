@@ -0,0 +1,181 @@
+"""
+Benchmark of evaluating alert rules on scan updates.
+Compares AlertEngine (sorted threshold indexes) with checking every rule against every changed value,
+and checks that both fire the same alerts.
+"""
+
+import argparse
+import math
+import time
+
+import numpy as np
+
+from funding_rate_arbitrage.alerts import AlertEngine
+
+COLUMNS = {
+    "Divergence [%]": "divergence",
+    "Revenue [/100 USDT]": "revenue",
+}
+
+
+def synthetic_rules(engine, num_rules: int, symbols: list, exchanges: list, seed=0):
+    """
+    Register random rules, half of them global and half per symbol.
+
+    Args:
+        engine (AlertEngine): Engine.
+        num_rules (int): Number of rules.
+        symbols (list): Perpetual contract pairs.
+        exchanges (list): Names of exchanges.
+        seed (int): Random seed.
+
+    Returns: None
+
+    """
+    rng = np.random.default_rng(seed)
+    for _ in range(num_rules):
+        metric = rng.choice(["funding_rate", "divergence", "revenue"])
+        kind = rng.choice(["above", "below", "change"])
+        threshold = rng.uniform(0.01, 0.1) if kind == "change" else rng.normal(0, 0.1)
+        symbol = rng.choice(symbols) if rng.random() < 0.5 else None
+        exchange = (
+            rng.choice(exchanges)
+            if metric == "funding_rate" and rng.random() < 0.5
+            else None
+        )
+        engine.add_rule(str(metric), str(kind), threshold, symbol, exchange)
+
+
+def synthetic_updates(
+    num_updates: int, num_changed: int, symbols: list, exchanges: list, seed=0
+) -> list:
+    """
+    Generate updates of changed rows of the large divergence DataFrame (rates in %).
+    The first update lists every symbol, then funding rates of num_changed symbols move a little
+    in every update, as between two refreshes of a scan.
+
+    Args:
+        num_updates (int): Number of updates after the first one.
+        num_changed (int): Number of changed symbols per update.
+        symbols (list): Perpetual contract pairs.
+        exchanges (list): Names of exchanges.
+        seed (int): Random seed.
+
+    Returns (list): Dicts of perpetual contract pair and row.
+
+    """
+    rng = np.random.default_rng(seed)
+    rates = rng.normal(0.01, 0.05, (len(symbols), len(exchanges)))
+    updates = [_rows(symbols, exchanges, rates, np.arange(len(symbols)))]
+    for _ in range(num_updates):
+        changed = rng.choice(len(symbols), num_changed, replace=False)
+        rates[changed] += rng.normal(0, 0.005, (num_changed, len(exchanges)))
+        updates.append(_rows(symbols, exchanges, rates, changed))
+    return updates
+
+
+def _rows(symbols, exchanges, rates, positions) -> dict:
+    rows = {}
+    for i in positions.tolist():
+        divergence = float(rates[i].max() - rates[i].min())
+        rows[symbols[i]] = {
+            **dict(zip(exchanges, rates[i].tolist())),
+            "Divergence [%]": divergence,
+            "Commission [%]": 0.1,
+            "Revenue [/100 USDT]": divergence - 0.1,
+            "Time to Settlement [h]": math.nan,
+        }
+    return rows
+
+
+def naive_update(rules: dict, values: dict, rows: dict) -> list:
+    """
+    Check every rule against every changed value.
+
+    Args:
+        rules (dict): Dict of rule id and AlertRule.
+        values (dict): Dict of (symbol, metric, exchange) and latest value, updated in place.
+        rows (dict): Dict of perpetual contract pair and row.
+
+    Returns (list): (rule id, symbol, exchange) of fired rules.
+
+    """
+    fired = []
+    for symbol, row in rows.items():
+        for column, value in row.items():
+            if column in COLUMNS:
+                metric, exchange = COLUMNS[column], None
+            elif column.endswith("]"):
+                continue
+            else:
+                metric, exchange = "funding_rate", column
+            previous = values.get((symbol, metric, exchange), math.nan)
+            if value == previous:
+                continue
+            values[(symbol, metric, exchange)] = value
+            first = math.isnan(previous)
+            for rule_id, rule in rules.items():
+                if (
+                    rule.metric != metric
+                    or rule.symbol not in (None, symbol)
+                    or rule.exchange not in (None, exchange)
+                ):
+                    continue
+                t = rule.threshold
+                if rule.kind == "above":
+                    hit = (first or previous <= t) and value > t
+                elif rule.kind == "below":
+                    hit = (first or previous >= t) and value < t
+                else:
+                    hit = not first and abs(value - previous) >= t
+                if hit:
+                    fired.append((rule_id, symbol, exchange))
+    return fired
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rules", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--exchanges", type=int, default=6)
+    parser.add_argument("--updates", type=int, default=20)
+    parser.add_argument("--changed", type=int, default=100)
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i}/USDT:USDT" for i in range(args.symbols)]
+    exchanges = [f"exchange_{j}" for j in range(args.exchanges)]
+    updates = synthetic_updates(args.updates, args.changed, symbols, exchanges)
+    for num_rules in args.rules:
+        engine = AlertEngine(sinks=[], cooldown=0)
+        synthetic_rules(engine, num_rules, symbols, exchanges)
+        values = {}
+        # the first values of every symbol are not timed
+        first = updates[0]
+        assert sorted(
+            (a.rule_id, a.symbol, a.exchange) for a in engine.update(first)
+        ) == (sorted(naive_update(engine.rules, values, first)))
+
+        start = time.perf_counter()
+        indexed = [
+            sorted((a.rule_id, a.symbol, a.exchange) for a in engine.update(rows))
+            for rows in updates[1:]
+        ]
+        indexed_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        naive = [
+            sorted(naive_update(engine.rules, values, rows)) for rows in updates[1:]
+        ]
+        naive_seconds = time.perf_counter() - start
+        assert indexed == naive
+
+        evaluations = args.updates * args.changed
+        print(
+            f"{len(engine.rules)} rules, {evaluations} changed rows, "
+            f"{sum(map(len, indexed))} alerts"
+        )
+        print(
+            f"  every rule {naive_seconds * 1000:9.2f} ms, "
+            f"indexes {indexed_seconds * 1000:9.2f} ms "
+            f"({naive_seconds / indexed_seconds:.1f}x)"
+        )
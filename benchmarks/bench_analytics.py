@@ -0,0 +1,47 @@
+"""
+Benchmark of batch history analytics over a process pool on synthetic 8-hourly histories.
+Reports wall time, speedup and parallel efficiency for each number of workers, and checks
+that every run matches the single-process result.
+"""
+
+import argparse
+import os
+import time
+
+from bench_backtest import EXCHANGES, synthetic_histories
+
+from funding_rate_arbitrage.analytics import batch_analytics
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--settlements", type=int, default=3 * 365)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count()} - {None}),
+    )
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.symbols, args.settlements)
+    print(
+        f"{args.symbols} symbols x {len(EXCHANGES)} exchanges x {args.settlements} settlements, "
+        f"{os.cpu_count()} CPUs"
+    )
+    start = time.perf_counter()
+    baseline = batch_analytics(histories, workers=1)
+    baseline_seconds = time.perf_counter() - start
+    print(f"  1 worker:  {baseline_seconds:7.2f} s (in process)")
+    for workers in args.workers:
+        if workers == 1:
+            continue
+        start = time.perf_counter()
+        df = batch_analytics(histories, workers=workers)
+        seconds = time.perf_counter() - start
+        assert df.equals(baseline)
+        speedup = baseline_seconds / seconds
+        print(
+            f"{workers:3d} workers: {seconds:7.2f} s, speedup {speedup:5.2f}x, "
+            f"efficiency {speedup / workers:5.2f}"
+        )
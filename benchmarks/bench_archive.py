@@ -0,0 +1,102 @@
+"""
+Benchmark of exporting scan results as compact snapshots and deltas.
+Compares the size of the large divergence DataFrame as pickle and CSV with a Parquet ScanSnapshot,
+then times diff_scans between two scans where a share of symbols moved and reports the delta size,
+with rank moves reported within the top ranks (default) and for every rank.
+Checks that applying the delta restores the next snapshot.
+"""
+
+import argparse
+import io
+import os
+import tempfile
+import time
+
+import numpy as np
+from bench_divergence_dataframe import (
+    synthetic_commission_schedule,
+    synthetic_funding_rates,
+)
+
+from funding_rate_arbitrage.archive import DIFF_TOP, ScanDelta, ScanSnapshot, diff_scans
+from funding_rate_arbitrage.frarb import FundingRateArbitrage
+
+
+def moved_funding_rates(fr_by_exchange: dict, share: float, seed=1) -> dict:
+    """
+    Move funding rates of a share of symbols on every exchange.
+
+    Args:
+        fr_by_exchange (dict): Dict of exchange name and dict of perpetual contract pair and funding rate.
+        share (float): Share of symbols moved.
+        seed (int): Random seed.
+
+    Returns (dict): Moved funding rates.
+
+    """
+    rng = np.random.default_rng(seed)
+    moved = {}
+    for exchange, rates in fr_by_exchange.items():
+        move = rng.random(len(rates)) < share
+        moved[exchange] = {
+            symbol: rate + rng.normal(0, 0.0001) if m else rate
+            for (symbol, rate), m in zip(rates.items(), move)
+        }
+    return moved
+
+
+def file_size(write) -> int:
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "file")
+        write(path)
+        return os.path.getsize(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[2000, 20000])
+    parser.add_argument("--exchanges", type=int, default=10)
+    parser.add_argument("--moved", type=float, default=0.02)
+    parser.add_argument("--top", type=int, default=DIFF_TOP)
+    args = parser.parse_args()
+
+    fr = FundingRateArbitrage(
+        commission_schedule=synthetic_commission_schedule(args.exchanges)
+    )
+    for num_symbols in args.symbols:
+        rates = synthetic_funding_rates(num_symbols, args.exchanges)
+        df = fr.build_divergence_dataframe(rates, now=0)
+        next_df = fr.build_divergence_dataframe(
+            moved_funding_rates(rates, args.moved), now=0
+        )
+        base = ScanSnapshot.from_dataframe(df, timestamp=0)
+        new = ScanSnapshot.from_dataframe(next_df, timestamp=1)
+
+        start = time.perf_counter()
+        delta = diff_scans(base, new, top=args.top)
+        diff_seconds = time.perf_counter() - start
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "delta.parquet")
+            delta.write(path)
+            restored = ScanDelta.read(path).apply(base)
+        assert list(restored.symbols) == list(new.symbols)
+        assert np.array_equal(restored.rates, new.rates, equal_nan=True)
+        every_rank = diff_scans(base, new, top=None)
+
+        buffer = io.StringIO()
+        df.to_csv(buffer)
+        sizes = {
+            "csv": len(buffer.getvalue().encode()),
+            "pickle": file_size(df.to_pickle),
+            "parquet snapshot": file_size(base.write),
+            "parquet delta": file_size(delta.write),
+            "every rank delta": file_size(every_rank.write),
+        }
+        print(
+            f"{num_symbols} symbols x {args.exchanges} exchanges, "
+            f"{len(delta.changed.symbols)} symbols in delta (top {args.top}), "
+            f"{len(every_rank.changed.symbols)} with every rank move, "
+            f"diff {diff_seconds * 1000:.1f} ms"
+        )
+        for name, size in sizes.items():
+            print(f"  {name:>16}: {size / 1024:9.1f} KiB")
@@ -0,0 +1,81 @@
+"""
+Benchmark of the vectorized backtester on synthetic 8-hourly funding rate histories.
+Default size is a year of settlements for 500 symbols x 6 exchanges.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from funding_rate_arbitrage.backtest import Backtester
+
+EIGHT_HOURS = 8 * 60 * 60 * 1000
+EXCHANGES = ["binance", "bybit", "okx", "bitget", "gate", "coinex"]
+
+
+def synthetic_histories(num_symbols: int, num_settlements: int, seed=0) -> pd.DataFrame:
+    """
+    Generate funding rate histories of every symbol on every exchange settled every 8 hours.
+
+    Args:
+        num_symbols (int): Number of symbols.
+        num_settlements (int): Number of settlements.
+        seed (int): Random seed.
+
+    Returns (pd.DataFrame): timestamp [ms] and funding_rate columns indexed by (exchange, symbol).
+
+    """
+    rng = np.random.default_rng(seed)
+    num_pairs = len(EXCHANGES) * num_symbols
+    index = pd.MultiIndex.from_product(
+        [EXCHANGES, [f"S{i}/USDT:USDT" for i in range(num_symbols)]],
+        names=["exchange", "symbol"],
+    )
+    # persistent rates around a per-pair level
+    level = rng.normal(0.0001, 0.0002, (num_pairs, 1))
+    noise = rng.normal(0, 0.0001, (num_pairs, num_settlements)).cumsum(axis=1) * 0.1
+    rates = level + noise
+    start = 1_672_531_200_000
+    return pd.DataFrame(
+        {
+            "timestamp": np.tile(
+                start + np.arange(num_settlements, dtype=np.int64) * EIGHT_HOURS,
+                num_pairs,
+            ),
+            "funding_rate": rates.ravel(),
+        },
+        index=index.repeat(num_settlements),
+    )
+
+
+def timeit(func) -> float:
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--settlements", type=int, default=3 * 365)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    histories = synthetic_histories(args.symbols, args.settlements)
+    print(
+        f"{args.symbols} symbols x {len(EXCHANGES)} exchanges x {args.settlements} settlements"
+    )
+    start = time.perf_counter()
+    backtester = Backtester(histories)
+    print(f"prepare:          {time.perf_counter() - start:8.2f} s")
+    print(f"carry:            {timeit(lambda: backtester.carry(0.01, 0.0)):8.2f} s")
+    print(f"cross:            {timeit(lambda: backtester.cross(0.02, 0.0)):8.2f} s")
+    grid = [
+        (entry, exit_) for entry in (0.01, 0.02, 0.03, 0.05) for exit_ in (0.0, 0.005)
+    ]
+    seconds = timeit(
+        lambda: backtester.sweep(grid, strategy="cross", workers=args.workers)
+    )
+    print(f"cross sweep x{len(grid)}:   {seconds:8.2f} s")
@@ -0,0 +1,91 @@
+"""
+Benchmark of rendering funding rate history charts of many symbols to files.
+Compares a pyplot figure built per chart from every settlement (as figure_funding_rate_history)
+with ChartRenderer (Agg canvas, one reused figure, LTTB downsampling), then reruns ChartRenderer
+with unchanged histories, which are skipped by the cache.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt  # noqa: E402
+from bench_backtest import synthetic_histories  # noqa: E402
+
+from funding_rate_arbitrage.charts import ChartRenderer  # noqa: E402
+from funding_rate_arbitrage.history import FundingRateHistory  # noqa: E402
+
+
+def pyplot_chart(history: FundingRateHistory, path: str) -> None:
+    """
+    Former drawing of figure_funding_rate_history, saved to a file instead of shown.
+    """
+    funding_time = history.datetimes
+    funding_rate = history.rates * 100
+    plt.figure(figsize=(8, 4.5))
+    plt.plot(funding_time, funding_rate, label="funding rate")
+    plt.hlines(
+        xmin=funding_time[0],
+        xmax=funding_time[-1],
+        y=funding_rate.mean(),
+        label="average",
+        colors="r",
+        linestyles="-.",
+    )
+    plt.title(f"Funding rate history {history.symbol}")
+    plt.xlabel("timestamp")
+    plt.ylabel("Funding rate [%]")
+    plt.xticks(rotation=45)
+    plt.yticks(rotation=45)
+    plt.legend()
+    plt.tight_layout()
+    plt.savefig(path)
+    plt.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--settlements", type=int, default=3 * 3 * 365)
+    parser.add_argument("--max-points", type=int, default=1000)
+    parser.add_argument("--fmt", default="png", choices=["png", "svg"])
+    args = parser.parse_args()
+
+    df = synthetic_histories(args.symbols, args.settlements)
+    histories = [
+        FundingRateHistory(
+            exchange, symbol, group["timestamp"].to_numpy(), group["funding_rate"]
+        )
+        for (exchange, symbol), group in df.groupby(level=[0, 1], sort=False)
+    ]
+    print(f"{len(histories)} charts x {args.settlements} settlements")
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        for i, history in enumerate(histories):
+            pyplot_chart(history, os.path.join(directory, f"pyplot_{i}.{args.fmt}"))
+        pyplot_seconds = time.perf_counter() - start
+
+        renderer = ChartRenderer(
+            os.path.join(directory, "charts"), fmt=args.fmt, max_points=args.max_points
+        )
+        start = time.perf_counter()
+        rendered = renderer.render_many(histories)
+        render_seconds = time.perf_counter() - start
+        assert len(rendered) == len(histories)
+
+        start = time.perf_counter()
+        assert not renderer.render_many(histories)
+        cached_seconds = time.perf_counter() - start
+
+    per_chart = 1000 / len(histories)
+    print(f"  pyplot per chart: {pyplot_seconds * per_chart:8.2f} ms / chart")
+    print(
+        f"  ChartRenderer:    {render_seconds * per_chart:8.2f} ms / chart "
+        f"({pyplot_seconds / render_seconds:.1f}x)"
+    )
+    print(f"  cached rerun:     {cached_seconds * per_chart:8.2f} ms / chart")
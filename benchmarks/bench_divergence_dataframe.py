@@ -0,0 +1,166 @@
+"""
+Benchmark of building the large divergence DataFrame between multi exchanges.
+Compares the columnar pipeline with the former row-by-row implementation on synthetic funding rates.
+"""
+
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from funding_rate_arbitrage.commission import (DEFAULT_SCHEDULE,
+                                               CommissionSchedule)
+from funding_rate_arbitrage.frarb import FundingRateArbitrage
+
+EXCHANGES = ["binance", "bybit", "okx", "bitget", "gate", "coinex"]
+
+
+def synthetic_commission_schedule(num_exchanges: int) -> CommissionSchedule:
+    """
+    Synthetic exchanges "binance_0", "bybit_1", ... use commission of the real exchange.
+
+    Args:
+        num_exchanges (int): Number of exchanges.
+
+    Returns (CommissionSchedule): Commission schedule of synthetic exchanges.
+
+    """
+    return CommissionSchedule(
+        {
+            f"{EXCHANGES[j % len(EXCHANGES)]}_{j}": DEFAULT_SCHEDULE[
+                EXCHANGES[j % len(EXCHANGES)]
+            ]
+            for j in range(num_exchanges)
+        }
+    )
+
+
+def synthetic_funding_rates(num_symbols: int, num_exchanges: int, seed=0) -> dict:
+    """
+    Generate funding rates of perpetual contracts, each exchange listing ~80% of symbols.
+
+    Args:
+        num_symbols (int): Number of symbols.
+        num_exchanges (int): Number of exchanges.
+        seed (int): Random seed.
+
+    Returns (dict): Dict of exchange name and dict of perpetual contract pair and funding rate.
+
+    """
+    rng = np.random.default_rng(seed)
+    symbols = np.array([f"SYM{i}/USDT:USDT" for i in range(num_symbols)])
+    fr_by_exchange = {}
+    for j in range(num_exchanges):
+        listed = rng.random(num_symbols) < 0.8
+        rates = rng.normal(0.0001, 0.0005, num_symbols)
+        fr_by_exchange[f"{EXCHANGES[j % len(EXCHANGES)]}_{j}"] = dict(
+            zip(symbols[listed].tolist(), rates[listed].tolist())
+        )
+    return fr_by_exchange
+
+
+def legacy_divergence_dataframe(fr: FundingRateArbitrage, fr_by_exchange: dict):
+    """
+    Former implementation of get_large_divergence_dataframe_multi_exchanges.
+    """
+    df = pd.DataFrame()
+    for ex, fr_d in fr_by_exchange.items():
+        df_ex = pd.DataFrame(fr_d.values(), index=list(fr_d.keys()), columns=[ex]).T
+        df = pd.concat([df, df_ex])
+    df = df.T * 100
+
+    diff_d = {}
+    for i, data in df.iterrows():
+        diff_d[i] = data.max() - data.min()
+    df_diff = pd.DataFrame(
+        diff_d.values(), index=list(diff_d.keys()), columns=["Divergence [%]"]
+    ).T
+    df = pd.concat([df.T, df_diff]).T
+
+    comm_list = []
+    for i in df.index:
+        max_fr_exchange = df.loc[i][:-1].idxmax()
+        min_fr_exchange = df.loc[i][:-1].idxmin()
+        max_fr = df.loc[i][:-1].max()
+        min_fr = df.loc[i][:-1].min()
+        if max_fr >= 0 and min_fr >= 0:
+            min_commission = fr.get_commission(exchange=min_fr_exchange, trade="spot")
+            max_commission = fr.get_commission(
+                exchange=max_fr_exchange, trade="futures"
+            )
+        elif max_fr >= 0 > min_fr:
+            max_commission = fr.get_commission(
+                exchange=max_fr_exchange, trade="futures"
+            )
+            min_commission = fr.get_commission(
+                exchange=min_fr_exchange, trade="futures"
+            )
+        else:
+            try:
+                max_commission = fr.get_commission(
+                    exchange=max_fr_exchange, trade="options"
+                ) + fr.get_commission(exchange=max_fr_exchange, trade="spot")
+                min_commission = fr.get_commission(
+                    exchange=min_fr_exchange, trade="futures"
+                )
+            except KeyError:
+                max_commission = fr.get_commission(
+                    exchange=max_fr_exchange, trade="futures"
+                )
+                min_commission = fr.get_commission(
+                    exchange=min_fr_exchange, trade="futures"
+                )
+        comm_list.append(2 * (max_commission + min_commission))
+
+    comm_d = {index: commission for index, commission in zip(df.index, comm_list)}
+    df_comm = pd.DataFrame(
+        comm_d.values(), index=list(comm_d.keys()), columns=["Commission [%]"]
+    ).T
+    df = pd.concat([df.T, df_comm]).T
+
+    revenue = [
+        diff_value - comm_value
+        for diff_value, comm_value in zip(diff_d.values(), comm_d.values())
+    ]
+    df_rv = pd.DataFrame(
+        revenue, index=list(comm_d.keys()), columns=["Revenue [/100 USDT]"]
+    ).T
+    return pd.concat([df.T, df_rv]).T
+
+
+def timeit(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=2000)
+    parser.add_argument("--exchanges", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    fr = FundingRateArbitrage(
+        commission_schedule=synthetic_commission_schedule(args.exchanges)
+    )
+    fr_by_exchange = synthetic_funding_rates(args.symbols, args.exchanges)
+
+    # plain funding rates carry no settlement schedule
+    columnar = fr.build_divergence_dataframe(fr_by_exchange).drop(
+        columns="Time to Settlement [h]"
+    )
+    legacy = legacy_divergence_dataframe(fr, fr_by_exchange)
+    pd.testing.assert_frame_equal(columnar, legacy, check_exact=True)
+
+    t_columnar = timeit(
+        lambda: fr.build_divergence_dataframe(fr_by_exchange), args.repeat
+    )
+    t_legacy = timeit(lambda: legacy_divergence_dataframe(fr, fr_by_exchange), 1)
+    print(f"{args.symbols} symbols x {args.exchanges} exchanges")
+    print(f"legacy:   {t_legacy * 1000:10.1f} ms")
+    print(f"columnar: {t_columnar * 1000:10.1f} ms ({t_legacy / t_columnar:.0f}x)")
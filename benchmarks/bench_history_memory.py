@@ -0,0 +1,101 @@
+"""
+Benchmark of memory used by funding rate histories.
+Compares lists of datetime and float (fetch_funding_rate_history) with typed columns
+(FundingRateHistory, load_histories) on synthetic 8-hourly histories.
+"""
+
+import argparse
+import gc
+import tracemalloc
+
+import numpy as np
+
+# imported by the package on first use, imported here so that no measurement pays for it
+import pandas  # noqa: F401
+
+from funding_rate_arbitrage.history import FundingRateHistory, FundingRateHistoryStore
+
+EIGHT_HOURS = 8 * 60 * 60 * 1000
+
+
+def synthetic_records(num_records: int, seed: int) -> list:
+    """
+    Generate ccxt funding rate history structures settled every 8 hours.
+
+    Args:
+        num_records (int): Number of settlements.
+        seed (int): Random seed.
+
+    Returns (list): ccxt funding rate history structures.
+
+    """
+    rng = np.random.default_rng(seed)
+    start = 1_672_531_200_000
+    return [
+        {"timestamp": start + i * EIGHT_HOURS, "fundingRate": rate}
+        for i, rate in enumerate(rng.normal(0.0001, 0.0003, num_records).tolist())
+    ]
+
+
+def retained_memory(build) -> int:
+    """
+    Measure memory retained by the object returned from build.
+
+    Args:
+        build (callable): Function building the object.
+
+    Returns (int): Retained bytes.
+
+    """
+    gc.collect()
+    tracemalloc.start()
+    obj = build()
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del obj
+    return retained
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, default=1000)
+    parser.add_argument("--records", type=int, default=1095, help="1 year of 8h")
+    args = parser.parse_args()
+
+    symbols = [f"SYM{i}/USDT:USDT" for i in range(args.symbols)]
+    histories = {
+        s: synthetic_records(args.records, seed) for seed, s in enumerate(symbols)
+    }
+
+    store = FundingRateHistoryStore(":memory:")
+    for s, records in histories.items():
+        store.write("binance", s, records)
+
+    legacy = retained_memory(
+        lambda: [
+            FundingRateHistory.from_records("binance", s, records).to_tuple()
+            for s, records in histories.items()
+        ]
+    )
+    columns = retained_memory(
+        lambda: [
+            FundingRateHistory.from_records("binance", s, records)
+            for s, records in histories.items()
+        ]
+    )
+    frame = retained_memory(lambda: store.load_histories())
+
+    num = args.symbols * args.records
+    print(f"{args.symbols} symbols x {args.records} records ({num} records)")
+    print(
+        f"datetime/float lists: {legacy / 2**20:8.1f} MiB ({legacy / num:5.1f} B/record)"
+    )
+    print(
+        f"typed columns:        {columns / 2**20:8.1f} MiB ({columns / num:5.1f} B/record, "
+        f"{legacy / columns:.1f}x smaller)"
+    )
+    print(
+        f"MultiIndex frame:     {frame / 2**20:8.1f} MiB ({frame / num:5.1f} B/record, "
+        f"{legacy / frame:.1f}x smaller)"
+    )
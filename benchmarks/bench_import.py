@@ -0,0 +1,83 @@
+"""
+Benchmark of startup: time and memory of importing funding_rate_arbitrage.frarb in a fresh interpreter.
+Every measurement runs in a new process, so modules cached by a previous run do not count.
+Time is measured without tracemalloc, which slows imports down, and peak memory in a separate traced run.
+Heavy dependencies (ccxt, pandas, matplotlib, rich) should be missing after the import and
+only loaded by the first call needing them.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY = ["ccxt", "ccxt.async_support", "pandas", "matplotlib", "rich"]
+
+# code run in the fresh interpreter, prints a JSON line
+PROBE = """
+import json, resource, sys, time, tracemalloc
+if {trace}:
+    tracemalloc.start()
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+_, peak = tracemalloc.get_traced_memory()
+print(json.dumps({{
+    "seconds": seconds,
+    "peak_bytes": peak,
+    "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    "modules": len(sys.modules),
+    "heavy": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+CASES = {
+    "import frarb": "import funding_rate_arbitrage.frarb",
+    "construct": "from funding_rate_arbitrage.frarb import FundingRateArbitrage\n"
+    "FundingRateArbitrage()",
+    "first client": "from funding_rate_arbitrage.frarb import FundingRateArbitrage\n"
+    "FundingRateArbitrage().pool.get('binance')",
+}
+
+
+def probe(statement: str, trace=False) -> dict:
+    """
+    Run a statement in a fresh interpreter.
+
+    Args:
+        statement (str): Python statements.
+        trace (bool): Trace allocations with tracemalloc (peak_bytes is 0 otherwise).
+
+    Returns (dict): seconds, peak_bytes (tracemalloc), max_rss_kib, modules and heavy modules loaded.
+
+    """
+    code = PROBE.format(statement=statement, heavy=HEAVY, trace=trace)
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="JSON file of results")
+    args = parser.parse_args()
+
+    results = []
+    for name, statement in CASES.items():
+        runs = [probe(statement) for _ in range(args.repeat)]
+        best = min(runs, key=lambda r: r["seconds"])
+        best["peak_bytes"] = probe(statement, trace=True)["peak_bytes"]
+        results.append({"case": name, **best})
+        print(
+            f"{name:>13}: {best['seconds'] * 1000:7.1f} ms, "
+            f"peak {best['peak_bytes'] / 2**20:6.1f} MiB, "
+            f"max RSS {best['max_rss_kib'] / 1024:6.1f} MiB, "
+            f"{best['modules']:5d} modules, loaded {', '.join(best['heavy']) or '-'}"
+        )
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {"python": sys.version.split()[0], "results": results}, f, indent=2
+            )
@@ -0,0 +1,124 @@
+"""
+Benchmark of ranking and rendering the top opportunities of a large divergence DataFrame.
+Compares partial selection with Opportunity records (ranking module), using the legs found by
+build_divergence_dataframe, with the former sort_values().head() and per-row df.loc / idxmax / idxmin
+rendering, and checks that both agree.
+"""
+
+import argparse
+import time
+
+from bench_divergence_dataframe import (
+    synthetic_commission_schedule,
+    synthetic_funding_rates,
+)
+
+from funding_rate_arbitrage.frarb import FundingRateArbitrage
+from funding_rate_arbitrage.ranking import (
+    multi_exchange_lines,
+    multi_exchange_opportunities,
+    top_rows,
+)
+
+SORTED_BY = "Revenue [/100 USDT]"
+
+
+def legacy_rank(df, display_num: int):
+    """
+    Former ranking of display_large_divergence_multi_exchange.
+    """
+    return df.sort_values(by=SORTED_BY, ascending=False).head(display_num)
+
+
+def legacy_lines(df, display_num: int) -> list:
+    """
+    Former rendering of display_one_by_one_multi_exchanges, as lines instead of prints.
+    """
+    lines = []
+    for i in df.sort_values(by=SORTED_BY, ascending=False).head(display_num).index:
+        lines.append("------------------------------------------------")
+        revenue = df.loc[i]["Revenue [/100 USDT]"]
+        if revenue > 0:
+            lines.append(
+                f"[bold deep_sky_blue1]Revenue: {revenue:.4f} USDT / 100USDT[/]"
+            )
+        else:
+            lines.append(f"[bold red]Revenue: {revenue:.4f} USDT / 100USDT[/]")
+        frs = df.loc[i].iloc[: df.columns.get_loc("Divergence [%]")]
+        max_fr_exchange = frs.idxmax()
+        min_fr_exchange = frs.idxmin()
+        max_fr = frs.max()
+        min_fr = frs.min()
+        if max_fr > 0 and min_fr > 0:
+            lines.append(
+                f"[bold red]SELL: {max_fr_exchange} {i} Perp (Funding Rate {max_fr:.4f} %)[/]"
+            )
+            lines.append(f"[bold blue]BUY: {min_fr_exchange} {i} Spot[/]")
+        elif max_fr > 0 > min_fr:
+            lines.append(
+                f"[bold red]SELL: {max_fr_exchange} {i} Perp (Funding Rate {max_fr:.4f} %)[/]"
+            )
+            lines.append(
+                f"[bold blue]BUY: {min_fr_exchange} {i} Perp (Funding Rate {min_fr:.4f} %)[/]"
+            )
+        else:
+            lines.append(f"[bold red]SELL: {max_fr_exchange} {i} Options[/]")
+            lines.append(
+                f"[bold blue]BUY: {min_fr_exchange} {i} Perp (Funding Rate {min_fr:.4f} %)[/]"
+            )
+        lines.append(f'Divergence: {df.loc[i]["Divergence [%]"]:.4f} %')
+        lines.append(f'Commission: {df.loc[i]["Commission [%]"]:.4f} %')
+    return lines
+
+
+def new_lines(df, display_num: int, legs=None) -> list:
+    return [
+        line
+        for opportunity in multi_exchange_opportunities(
+            df, display_num, SORTED_BY, legs=legs
+        )
+        for line in multi_exchange_lines(opportunity)
+    ]
+
+
+def timeit(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--symbols", type=int, nargs="+", default=[2000, 20000, 200000])
+    parser.add_argument("--exchanges", type=int, default=20)
+    parser.add_argument("--display-num", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    fr = FundingRateArbitrage(
+        commission_schedule=synthetic_commission_schedule(args.exchanges)
+    )
+    for num_symbols in args.symbols:
+        df, legs = fr.build_divergence_dataframe(
+            synthetic_funding_rates(num_symbols, args.exchanges), legs=True
+        )
+        n = args.display_num
+        assert legacy_rank(df, n).equals(top_rows(df, SORTED_BY, n))
+        assert legacy_lines(df, n) == new_lines(df, n) == new_lines(df, n, legs)
+
+        rank_legacy = timeit(lambda: legacy_rank(df, n), args.repeat)
+        rank_new = timeit(lambda: top_rows(df, SORTED_BY, n), args.repeat)
+        render_legacy = timeit(lambda: legacy_lines(df, n), args.repeat)
+        render_new = timeit(lambda: new_lines(df, n, legs), args.repeat)
+        print(f"{num_symbols} symbols x {args.exchanges} exchanges, top {n}")
+        print(
+            f"  rank:   sort_values {rank_legacy * 1000:8.2f} ms, "
+            f"argpartition {rank_new * 1000:8.2f} ms ({rank_legacy / rank_new:.1f}x)"
+        )
+        print(
+            f"  render: df.loc      {render_legacy * 1000:8.2f} ms, "
+            f"records      {render_new * 1000:8.2f} ms ({render_legacy / render_new:.1f}x)"
+        )
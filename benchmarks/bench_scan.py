@@ -0,0 +1,256 @@
+"""
+Offline benchmark of the scan path: single-exchange, multi-exchange, history and volatility entry points.
+Responses of load_markets, fetch_funding_rate(s) and fetch_funding_rate_history are replayed by
+FakeExchange from recorded fixtures (--fixtures, see fakes.record_fixture) or synthetic ones, with a
+fixed latency per request. Wall time and peak memory of every entry point at every universe size are
+written as JSON, and compared with the results of a previous run when --baseline is given.
+
+    python benchmarks/bench_scan.py --sizes 100 500 2000 --output scan.json
+    python benchmarks/bench_scan.py --sizes 100 500 2000 --baseline scan.json
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import time
+import tracemalloc
+
+# imported by the package on first use, imported here so that no entry point pays for it
+import ccxt  # noqa: F401
+import pandas  # noqa: F401
+
+from funding_rate_arbitrage.fakes import (
+    FakeExchange,
+    SyncFakeExchange,
+    synthetic_fixture,
+)
+from funding_rate_arbitrage.frarb import FundingRateArbitrage
+from funding_rate_arbitrage.history import FundingRateHistoryStore
+
+EXCHANGES = ["binance", "bybit", "okx", "bitget", "gate", "coinex"]
+
+
+def load_fixtures(args) -> dict:
+    """
+    Load recorded fixtures <exchange>.json of --fixtures, or generate synthetic ones.
+
+    Args:
+        args (argparse.Namespace): Arguments.
+
+    Returns (dict): Dict of exchange name and fixture.
+
+    """
+    if args.fixtures is None:
+        size = max(args.sizes)
+        return {
+            ex: synthetic_fixture(
+                id=ex,
+                num_symbols=size,
+                num_settlements=args.settlements,
+                rate_limit=args.rate_limit,
+                seed=seed,
+            )
+            for seed, ex in enumerate(EXCHANGES[: args.exchanges])
+        }
+    fixtures = {}
+    for name in sorted(os.listdir(args.fixtures)):
+        if name.endswith(".json"):
+            with open(os.path.join(args.fixtures, name)) as f:
+                fixture = json.load(f)
+            fixture["rateLimit"] = args.rate_limit
+            fixtures[fixture["id"]] = fixture
+    return fixtures
+
+
+def truncate(fixture: dict, size: int) -> dict:
+    """
+    Keep the first size symbols of a fixture.
+
+    Args:
+        fixture (dict): Fixture.
+        size (int): Number of symbols.
+
+    Returns (dict): Fixture listing at most size symbols.
+
+    """
+    symbols = list(fixture["funding_rates"])[:size]
+    return dict(
+        fixture,
+        markets={s: fixture["markets"][s] for s in symbols},
+        funding_rates={s: fixture["funding_rates"][s] for s in symbols},
+        histories={s: h for s, h in fixture["histories"].items() if s in symbols},
+    )
+
+
+def build_frarb(fixtures: dict, latency: float, history_store=None):
+    """
+    Build a FundingRateArbitrage whose pool serves fake clients replaying the fixtures.
+
+    Args:
+        fixtures (dict): Dict of exchange name and fixture.
+        latency (float): Seconds every request takes.
+        history_store (FundingRateHistoryStore): Local store of funding rate history.
+
+    Returns (FundingRateArbitrage): FundingRateArbitrage.
+
+    """
+    fr = FundingRateArbitrage(history_store=history_store)
+    fr.exchanges = list(fixtures)
+    for ex, fixture in fixtures.items():
+        fr.pool.register(
+            ex,
+            client=SyncFakeExchange.from_fixture(fixture, latency=latency),
+            async_client=FakeExchange.from_fixture(fixture, latency=latency),
+        )
+    return fr
+
+
+def entry_points(args) -> dict:
+    """
+    Get functions running every entry point on fixtures with a fresh FundingRateArbitrage (cold caches).
+
+    Args:
+        args (argparse.Namespace): Arguments.
+
+    Returns (dict): Dict of entry point name and function of fixtures.
+
+    """
+
+    def single(fixtures):
+        exchange = next(iter(fixtures))
+        with build_frarb({exchange: fixtures[exchange]}, args.latency) as fr:
+            fr.get_large_divergence_dataframe_single_exchange(exchange)
+
+    def multi(fixtures):
+        with build_frarb(fixtures, args.latency) as fr:
+            fr.get_large_divergence_dataframe_multi_exchanges()
+
+    def history(fixtures):
+        exchange = next(iter(fixtures))
+        symbols = list(fixtures[exchange]["histories"])[: args.history_symbols]
+        store = FundingRateHistoryStore(":memory:")
+        with build_frarb({exchange: fixtures[exchange]}, args.latency, store) as fr:
+            for symbol in symbols:
+                fr.sync_funding_rate_history(exchange, symbol, since=0)
+            fr.load_funding_rate_histories()
+        store.close()
+
+    def volatility(fixtures):
+        exchange = next(iter(fixtures))
+        symbols = list(fixtures[exchange]["histories"])[: args.history_symbols]
+        with build_frarb({exchange: fixtures[exchange]}, args.latency) as fr:
+            for symbol in symbols:
+                fr.get_funding_rate_volatility(exchange, symbol)
+
+    return {
+        "single": single,
+        "multi": multi,
+        "history": history,
+        "volatility": volatility,
+    }
+
+
+def measure(func, fixtures: dict, repeat: int) -> dict:
+    """
+    Measure the best wall time of repeated runs, then peak memory of one run under tracemalloc.
+
+    Args:
+        func (callable): Function of fixtures.
+        fixtures (dict): Dict of exchange name and fixture.
+        repeat (int): Number of timed runs.
+
+    Returns (dict): seconds and peak_bytes.
+
+    """
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func(fixtures)
+        times.append(time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    func(fixtures)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": min(times), "peak_bytes": peak}
+
+
+def compare(results: list, baseline: list) -> None:
+    """
+    Print the ratio of time and peak memory to a previous run.
+
+    Args:
+        results (list): Results of this run.
+        baseline (list): Results of a previous run.
+
+    Returns: None
+
+    """
+    previous = {(r["entry_point"], r["size"]): r for r in baseline}
+    for r in results:
+        base = previous.get((r["entry_point"], r["size"]))
+        if base is None:
+            continue
+        print(
+            f"{r['entry_point']:>10} {r['size']:>6}: "
+            f"time x{r['seconds'] / base['seconds']:5.2f}, "
+            f"peak memory x{r['peak_bytes'] / base['peak_bytes']:5.2f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 500, 2000])
+    parser.add_argument("--exchanges", type=int, default=len(EXCHANGES))
+    parser.add_argument("--latency", type=float, default=0.01, help="seconds")
+    parser.add_argument(
+        "--rate-limit", type=float, default=1, help="ccxt rateLimit [ms]"
+    )
+    parser.add_argument("--settlements", type=int, default=3 * 90)
+    parser.add_argument("--history-symbols", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument(
+        "--entry-points",
+        nargs="+",
+        default=["single", "multi", "history", "volatility"],
+    )
+    parser.add_argument("--fixtures", help="directory of recorded fixtures")
+    parser.add_argument("--output", help="JSON file of results")
+    parser.add_argument("--baseline", help="JSON file of a previous run")
+    args = parser.parse_args()
+
+    fixtures = load_fixtures(args)
+    funcs = entry_points(args)
+    results = []
+    for size in args.sizes:
+        sized = {ex: truncate(fixture, size) for ex, fixture in fixtures.items()}
+        for name in args.entry_points:
+            result = measure(funcs[name], sized, args.repeat)
+            result = {"entry_point": name, "size": size, **result}
+            results.append(result)
+            print(
+                f"{name:>10} {size:>6} symbols: {result['seconds'] * 1000:9.1f} ms, "
+                f"peak {result['peak_bytes'] / 2**20:7.2f} MiB"
+            )
+
+    if args.output is not None:
+        with open(args.output, "w") as f:
+            json.dump(
+                {
+                    "python": platform.python_version(),
+                    "latency": args.latency,
+                    "rate_limit": args.rate_limit,
+                    "exchanges": list(fixtures),
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+    if args.baseline is not None:
+        with open(args.baseline) as f:
+            compare(results, json.load(f)["results"])
@@ -1,9 +1,10 @@
 """
 An example of fetching funding rate
 """
-from funding_rate_arbitrage.frarb import FundingRateArbitrage
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     # fetch from all exchanges
     fr = FundingRateArbitrage()
     for ex in fr.get_exchanges():
@@ -1,9 +1,10 @@
 """
 An example of fetching funding rate history
 """
-from funding_rate_arbitrage.frarb import FundingRateArbitrage
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     # fetch from binance
     fr = FundingRateArbitrage()
     # figure funding rate history
@@ -1,9 +1,10 @@
 """
 An example of getting commission.
 """
-from funding_rate_arbitrage.frarb import FundingRateArbitrage
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     fr = FundingRateArbitrage()
     # binance futures maker commission with BNB
     print("binance futures maker commission with BNB")
@@ -1,17 +1,26 @@
 """
 An example of getting large divergence between multi exchange.
 """
-from funding_rate_arbitrage.frarb import FundingRateArbitrage
+
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     fr = FundingRateArbitrage()
     # Display Top 5 large funding rate divergence between multi exchange.
-    # print(fr.display_large_divergence_multi_exchange(display_num=5, sorted_by='divergence'))
+    print(
+        fr.display_large_divergence_multi_exchange(
+            display_num=5, sorted_by="divergence"
+        )
+    )
 
-    # TODO:　Errors occur when running consecutively.
-    # ccxt.base.errors.BadRequest: binance {"code":-1104,"msg":"Not all sent parameters were read; read '0' parameter(s) but was sent '1'."}
+    # Consecutive runs reuse the clients; a failing exchange is dropped from the scan instead of aborting it.
     # Display Top 5 large funding rate divergence between multi exchange sorted by revenue.
-    # print(fr.display_large_divergence_multi_exchange(display_num=5, sorted_by='revenue'))
+    print(
+        fr.display_large_divergence_multi_exchange(display_num=5, sorted_by="revenue")
+    )
+    # Requests, retries and errors of every exchange in the last scan.
+    print(fr.get_scan_report())
 
     # Display Top 5 large funding rate divergence between multi exchange.
     fr.display_one_by_one_multi_exchanges(display_num=5)
@@ -1,9 +1,10 @@
 """
 An example of displaying large divergence by single exchange.
 """
-from funding_rate_arbitrage.frarb import FundingRateArbitrage
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
 
 if __name__ == "__main__":
+    setup_logging()
     fr = FundingRateArbitrage()
     # Display Top 5 large funding rate divergence on binance.
     print(
@@ -0,0 +1,14 @@
+"""
+An example of scanning large divergence between multi exchange continuously.
+"""
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
+from funding_rate_arbitrage.scanner import LiveScanner
+
+if __name__ == "__main__":
+    setup_logging()
+    with FundingRateArbitrage() as fr:
+        # refresh every exchange each 5 minutes and keep the ranking up to date
+        scanner = LiveScanner(fr, interval=300)
+        while True:
+            scanner.run_forever(iterations=1)
+            print(scanner.top(display_num=5))
@@ -0,0 +1,34 @@
+"""
+An example of streaming funding rates over WebSocket and replaying the recorded messages offline.
+"""
+
+import time
+
+import ccxt.pro
+
+from funding_rate_arbitrage.frarb import FundingRateArbitrage, setup_logging
+from funding_rate_arbitrage.streaming import (FundingRateStream, JsonlRecorder,
+                                              ReplayServer)
+
+if __name__ == "__main__":
+    setup_logging()
+    # record 1 minute of okx funding rate messages
+    stream = FundingRateStream(
+        {"okx": ccxt.pro.okx()}, recorder=JsonlRecorder("okx_funding_rate.jsonl")
+    )
+    table = stream.start()
+    time.sleep(60)
+    stream.stop()
+    print(table.latency_report())
+
+    # replay the recording at 10x speed, divergence is computed without network calls
+    stream = FundingRateStream(
+        ReplayServer.from_file("okx_funding_rate.jsonl", speed=10).clients()
+    )
+    with FundingRateArbitrage() as fr:
+        fr.exchanges = ["okx"]
+        fr.rate_table = stream.start()
+        time.sleep(6)
+        print(fr.get_large_divergence_dataframe_multi_exchanges().head())
+        stream.stop()
+        print(fr.rate_table.latency_report())
@@ -0,0 +1,355 @@
+"""
+Alerts on funding rate, divergence and revenue changes of scan results
+"""
+
+import json
+import logging
+import math
+import sys
+import time
+from bisect import bisect_left, bisect_right, insort
+from typing import NamedTuple
+
+from funding_rate_arbitrage.frarb import DIVERGENCE_COLUMNS
+
+log = logging.getLogger("rich")
+
+# metric -> column of the large divergence DataFrame, funding rates are the exchange columns
+METRICS = {
+    "funding_rate": None,
+    "divergence": "Divergence [%]",
+    "revenue": "Revenue [/100 USDT]",
+}
+_COLUMN_METRICS = {c: m for m, c in METRICS.items() if c is not None}
+KINDS = ["above", "below", "change"]
+
+
+class AlertRule(NamedTuple):
+    """
+    Rule on a metric of a symbol (every symbol if None) in the units of the divergence DataFrame (%).
+    above fires when the value crosses above threshold, below when it crosses below threshold and
+    change when it moves by threshold or more between two updates.
+    exchange restricts funding_rate rules to an exchange (every exchange if None).
+    """
+
+    metric: str
+    kind: str
+    threshold: float
+    symbol: str = None
+    exchange: str = None
+
+
+class Alert(NamedTuple):
+    """
+    Alert of a rule. previous is NaN for the first value of the symbol.
+    """
+
+    rule_id: int
+    rule: AlertRule
+    symbol: str
+    exchange: str
+    previous: float
+    value: float
+    timestamp: float
+
+    def message(self) -> str:
+        """
+        Format the alert as a line.
+
+        Returns (str): Message.
+
+        """
+        rule = self.rule
+        target = f"{self.exchange} {self.symbol}" if self.exchange else self.symbol
+        if rule.kind == "change":
+            condition = (
+                f"moved by {self.value - self.previous:+.4f} (limit {rule.threshold})"
+            )
+        else:
+            condition = f"crossed {rule.kind} {rule.threshold}"
+        return f"{target} {rule.metric} {condition}: {self.previous:.4f} -> {self.value:.4f}"
+
+    def to_dict(self) -> dict:
+        """
+        Get the alert as a JSON serializable dict.
+
+        Returns (dict): Alert, NaN values are None.
+
+        """
+        return {
+            "rule_id": self.rule_id,
+            **self.rule._asdict(),
+            "symbol": self.symbol,
+            "exchange": self.exchange,
+            "previous": None if math.isnan(self.previous) else self.previous,
+            "value": self.value,
+            "timestamp": self.timestamp,
+            "message": self.message(),
+        }
+
+
+class StdoutSink:
+    """
+    Prints alert messages.
+    """
+
+    def __init__(self, stream=None):
+        """
+        Args:
+            stream (file): Text stream. sys.stdout if None.
+        """
+        self.stream = stream
+
+    def __call__(self, alert: Alert) -> None:
+        print(alert.message(), file=self.stream or sys.stdout, flush=True)
+
+
+class FileSink:
+    """
+    Appends alerts to a file as JSON lines.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path (str): Path of the file.
+        """
+        self.path = path
+
+    def __call__(self, alert: Alert) -> None:
+        with open(self.path, "a") as f:
+            f.write(json.dumps(alert.to_dict()) + "\n")
+
+
+class WebhookSink:
+    """
+    Webhook stub: keeps the JSON payloads of alerts and posts them with `post` when given
+    (e.g. requests.post), so that no request is sent unless a client is plugged in.
+    """
+
+    def __init__(self, url: str, post=None, timeout=5.0, max_payloads=1000):
+        """
+        Args:
+            url (str): URL of the webhook.
+            post (callable): Function of url, json and timeout keyword arguments sending a request.
+            timeout (float): Seconds before a request times out.
+            max_payloads (int): Number of latest payloads kept.
+        """
+        self.url = url
+        self.post = post
+        self.timeout = timeout
+        self.max_payloads = max_payloads
+        self.payloads = []
+
+    def __call__(self, alert: Alert) -> None:
+        payload = alert.to_dict()
+        self.payloads.append(payload)
+        del self.payloads[: -self.max_payloads]
+        if self.post is None:
+            log.debug(f"webhook {self.url}: {payload['message']}")
+            return
+        self.post(self.url, json=payload, timeout=self.timeout)
+
+
+class AlertEngine:
+    """
+    Evaluates alert rules on updates of scan results and notifies sinks.
+    Thresholds of every (metric, kind, symbol, exchange) are kept sorted, so that an update finds the
+    crossed rules of a changed value by bisection: O(changes x log rules) instead of checking every rule
+    against every row. Unchanged values are skipped.
+    Registering a rule twice returns the same rule, a crossing alerts once, and alerts of a
+    (rule, symbol, exchange) are suppressed for cooldown seconds after one was sent.
+    """
+
+    def __init__(self, sinks=None, cooldown=300.0, clock=time.time):
+        """
+        Args:
+            sinks (list): Callables of an Alert (StdoutSink, FileSink, WebhookSink, ...).
+                [StdoutSink()] if None.
+            cooldown (float): Seconds during which repeated alerts of a rule and symbol are suppressed.
+            clock (callable): Clock returning epoch seconds.
+        """
+        self.sinks = list(sinks) if sinks is not None else [StdoutSink()]
+        self.cooldown = cooldown
+        self.clock = clock
+        # rule id -> rule
+        self.rules = {}
+        # number of alerts suppressed by cooldown
+        self.suppressed = 0
+        self._rule_ids = {}
+        self._next_id = 0
+        # (metric, kind, symbol, exchange) -> sorted (threshold, rule id)
+        self._indexes = {}
+        # symbol -> (metric, exchange) -> latest value
+        self._values = {}
+        # (rule id, symbol, exchange) -> time of the latest alert sent
+        self._sent = {}
+
+    def add_rule(
+        self, metric: str, kind: str, threshold: float, symbol=None, exchange=None
+    ) -> int:
+        """
+        Register a rule (see AlertRule).
+
+        Args:
+            metric (str): funding_rate, divergence or revenue.
+            kind (str): above, below or change.
+            threshold (float): Threshold, or limit of change [%].
+            symbol (str): Perpetual contract pair. Every symbol if None.
+            exchange (str): Exchange of funding_rate rules. Every exchange if None.
+
+        Returns (int): Rule id.
+
+        """
+        if metric not in METRICS:
+            log.error(f"{metric} is not available.")
+            raise KeyError(metric)
+        if kind not in KINDS:
+            log.error(f"{kind} is not available.")
+            raise KeyError(kind)
+        if exchange is not None and metric != "funding_rate":
+            log.error(f"{metric} rules are not bound to an exchange.")
+            raise ValueError(exchange)
+        rule = AlertRule(metric, kind, float(threshold), symbol, exchange)
+        if rule in self._rule_ids:
+            return self._rule_ids[rule]
+        rule_id = self._next_id
+        self._next_id += 1
+        self.rules[rule_id] = rule
+        self._rule_ids[rule] = rule_id
+        insort(
+            self._indexes.setdefault((metric, kind, symbol, exchange), []),
+            (rule.threshold, rule_id),
+        )
+        return rule_id
+
+    def remove_rule(self, rule_id: int) -> None:
+        """
+        Unregister a rule.
+
+        Args:
+            rule_id (int): Rule id of add_rule.
+
+        Returns: None
+
+        """
+        rule = self.rules.pop(rule_id)
+        del self._rule_ids[rule]
+        index = self._indexes[(rule.metric, rule.kind, rule.symbol, rule.exchange)]
+        del index[bisect_left(index, (rule.threshold, rule_id))]
+
+    def update(self, rows: dict) -> list:
+        """
+        Evaluate rules on changed rows of the large divergence DataFrame and notify sinks.
+
+        Args:
+            rows (dict): Dict of perpetual contract pair and dict of column and value
+                (e.g. LiveScanner.rows or DataFrame.to_dict("index")).
+
+        Returns (list): Alerts sent.
+
+        """
+        now = self.clock()
+        sent = []
+        for symbol, row in rows.items():
+            # exchange columns come first, columns after the divergence columns
+            # (Slippage [%], ...) are not funding rates
+            rates = True
+            for column, value in row.items():
+                if column in DIVERGENCE_COLUMNS:
+                    rates = False
+                    if column not in _COLUMN_METRICS:
+                        continue
+                    metric, exchange = _COLUMN_METRICS[column], None
+                elif rates:
+                    metric, exchange = "funding_rate", column
+                else:
+                    continue
+                previous, fired = self._evaluate(metric, symbol, exchange, value)
+                for rule_id in fired:
+                    alert = Alert(
+                        rule_id=rule_id,
+                        rule=self.rules[rule_id],
+                        symbol=symbol,
+                        exchange=exchange,
+                        previous=previous,
+                        value=value,
+                        timestamp=now,
+                    )
+                    if self._notify(alert):
+                        sent.append(alert)
+        return sent
+
+    def update_dataframe(self, df) -> list:
+        """
+        Evaluate rules on a large divergence DataFrame (only changed values are evaluated).
+
+        Args:
+            df (pd.DataFrame): DataFrame of FundingRateArbitrage.get_large_divergence_dataframe_multi_exchanges.
+
+        Returns (list): Alerts sent.
+
+        """
+        return self.update(df.to_dict("index"))
+
+    def forget(self, symbol: str) -> None:
+        """
+        Forget the latest values of a symbol (e.g. delisted), so that its next value is a first value.
+
+        Args:
+            symbol (str): Perpetual contract pair.
+
+        Returns: None
+
+        """
+        self._values.pop(symbol, None)
+
+    def _evaluate(self, metric: str, symbol: str, exchange, value) -> tuple:
+        # previous value and ids of the fired rules
+        values = self._values.setdefault(symbol, {})
+        previous = values.get((metric, exchange), math.nan)
+        if value is None or math.isnan(value):
+            values.pop((metric, exchange), None)
+            return previous, []
+        if value == previous:
+            return previous, []
+        values[(metric, exchange)] = value
+        first = math.isnan(previous)
+        fired = []
+        scopes = [(symbol, exchange), (symbol, None), (None, exchange), (None, None)]
+        for scope in dict.fromkeys(scopes):
+            # crossed above: previous <= threshold < value
+            above = self._indexes.get((metric, "above", *scope))
+            if above and (first or value > previous):
+                lo = 0 if first else bisect_left(above, (previous,))
+                fired += [i for _, i in above[lo : bisect_left(above, (value,))]]
+            # crossed below: value < threshold <= previous
+            below = self._indexes.get((metric, "below", *scope))
+            if below and (first or value < previous):
+                hi = len(below) if first else bisect_right(below, (previous, math.inf))
+                fired += [
+                    i for _, i in below[bisect_right(below, (value, math.inf)) : hi]
+                ]
+            change = self._indexes.get((metric, "change", *scope))
+            if change and not first:
+                fired += [
+                    i
+                    for _, i in change[
+                        : bisect_right(change, (abs(value - previous), math.inf))
+                    ]
+                ]
+        return previous, fired
+
+    def _notify(self, alert: Alert) -> bool:
+        key = (alert.rule_id, alert.symbol, alert.exchange)
+        last = self._sent.get(key)
+        if last is not None and alert.timestamp - last < self.cooldown:
+            self.suppressed += 1
+            return False
+        self._sent[key] = alert.timestamp
+        for sink in self.sinks:
+            try:
+                sink(alert)
+            except Exception:
+                log.exception(f"failed to send an alert to {sink}.")
+        return True
@@ -0,0 +1,217 @@
+"""
+Per-history analytics of many (exchange, symbol) funding rate histories over a process pool
+"""
+
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from funding_rate_arbitrage.lazy import pd
+from funding_rate_arbitrage.stats import forward_fill
+
+ANALYTICS_COLUMNS = [
+    "count",
+    "mean",
+    "volatility",
+    "autocorrelation",
+    "half_life",
+    "decorrelation_lag",
+    "positive_share",
+    "regime",
+    "regime_switches",
+    "regime_duration",
+]
+
+
+def batch_analytics(
+    histories: pd.DataFrame,
+    workers=None,
+    max_lag=24,
+    regime_window=9,
+    regime_band=0.5,
+    shards_per_worker=4,
+) -> pd.DataFrame:
+    """
+    Compute analytics of every (exchange, symbol) history, sharded across a process pool.
+    Histories are copied once into shared memory, workers read them in place and only send back
+    one row of analytics per pair. Rates are ccxt raw rates (not %).
+
+    - count: number of settlements.
+    - mean, volatility: mean and standard deviation of funding rate (as get_funding_rate_volatility).
+    - autocorrelation: lag-1 autocorrelation of funding rate.
+    - half_life: settlements for a deviation from the mean to halve, from the lag-1 autocorrelation
+      (NaN unless it is in (0, 1)).
+    - decorrelation_lag: first lag up to max_lag with autocorrelation below 1/e (NaN if none).
+    - positive_share: share of settlements with a positive funding rate.
+    - regime: latest regime, 1 (paying longs), -1 (paying shorts) or 0 (undecided). The regime switches
+      when the rolling mean of regime_window settlements leaves a band of regime_band x volatility.
+    - regime_switches: number of switches between 1 and -1.
+    - regime_duration: settlements since the latest regime started.
+
+    Args:
+        histories (pd.DataFrame): timestamp [ms] and funding_rate columns indexed by (exchange, symbol)
+            (see FundingRateHistoryStore.load_histories).
+        workers (int): Number of processes. os.cpu_count() if None, computed in this process if 1.
+        max_lag (int): Largest lag of decorrelation_lag.
+        regime_window (int): Number of settlements of the rolling mean deciding regimes.
+        regime_band (float): Half width of the undecided band, in volatility.
+        shards_per_worker (int): Number of shards per process, to balance uneven shards.
+
+    Returns (pd.DataFrame): Analytics indexed by (exchange, symbol).
+
+    """
+    exchange_codes, exchanges = pd.factorize(histories.index.get_level_values(0))
+    symbol_codes, symbols = pd.factorize(histories.index.get_level_values(1))
+    timestamp = histories["timestamp"].to_numpy(dtype=np.int64)
+    order = np.lexsort((timestamp, symbol_codes, exchange_codes))
+    pair = exchange_codes[order] * (len(symbols) + 1) + symbol_codes[order]
+    starts = np.flatnonzero(np.r_[True, pair[1:] != pair[:-1]]) if len(pair) else pair
+    offsets = np.append(starts, len(pair)).astype(np.int64)
+    rates = histories["funding_rate"].to_numpy(dtype=np.float64)[order]
+
+    params = (max_lag, regime_window, regime_band)
+    workers = workers or os.cpu_count()
+    num_pairs = len(starts)
+    if workers == 1 or num_pairs == 0:
+        result = _analyze_range(rates, offsets, 0, num_pairs, params)
+    else:
+        result = np.empty((num_pairs, len(ANALYTICS_COLUMNS)))
+        blocks = [_share(rates), _share(offsets)]
+        try:
+            with ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_worker,
+                initargs=tuple((b.name, a.shape, a.dtype.str) for b, a in blocks),
+            ) as executor:
+                bounds = _shard_bounds(offsets, workers * shards_per_worker)
+                tasks = [(start, end, params) for start, end in zip(bounds, bounds[1:])]
+                for (start, end, _), rows in zip(
+                    tasks, executor.map(_run_worker, tasks)
+                ):
+                    result[start:end] = rows
+        finally:
+            for block, _ in blocks:
+                block.close()
+                block.unlink()
+
+    first = order[starts]
+    index = pd.MultiIndex.from_arrays(
+        [
+            [str(exchanges[c]) for c in exchange_codes[first]],
+            [str(symbols[c]) for c in symbol_codes[first]],
+        ],
+        names=["exchange", "symbol"],
+    )
+    df = pd.DataFrame(result, index=index, columns=ANALYTICS_COLUMNS)
+    return df.astype(
+        {
+            "count": np.int64,
+            "regime": np.int64,
+            "regime_switches": np.int64,
+            "regime_duration": np.int64,
+        }
+    )
+
+
+def analyze(rates: np.ndarray, max_lag=24, regime_window=9, regime_band=0.5) -> tuple:
+    """
+    Compute analytics of one funding rate history (see batch_analytics for the values).
+
+    Args:
+        rates (np.ndarray): Funding rates in settlement order.
+        max_lag (int): Largest lag of decorrelation_lag.
+        regime_window (int): Number of settlements of the rolling mean deciding regimes.
+        regime_band (float): Half width of the undecided band, in volatility.
+
+    Returns (tuple): Values of ANALYTICS_COLUMNS.
+
+    """
+    n = len(rates)
+    if n == 0:
+        return (0,) + (np.nan,) * 5 + (np.nan, 0, 0, 0)
+    mean = rates.mean()
+    volatility = rates.std()
+    centered = rates - mean
+    variance = centered @ centered
+    lags = np.arange(1, min(max_lag, n - 1) + 1)
+    if variance > 0 and len(lags):
+        acf = np.array([centered[:-lag] @ centered[lag:] for lag in lags]) / variance
+    else:
+        acf = np.full(len(lags), np.nan)
+    autocorrelation = acf[0] if len(acf) else np.nan
+    half_life = (
+        -np.log(2) / np.log(autocorrelation) if 0 < autocorrelation < 1 else np.nan
+    )
+    below = np.flatnonzero(acf < 1 / np.e)
+    decorrelation_lag = float(lags[below[0]]) if len(below) else np.nan
+
+    # rolling mean over the last regime_window settlements (fewer at the start)
+    cumsum = np.cumsum(np.r_[0.0, rates])
+    window_start = np.maximum(np.arange(n) - regime_window + 1, 0)
+    rolling_mean = (cumsum[1:] - cumsum[window_start]) / (
+        np.arange(1, n + 1) - window_start
+    )
+    band = regime_band * volatility
+    state = np.where(
+        rolling_mean > band, 1.0, np.where(rolling_mean < -band, -1.0, np.nan)
+    )
+    regimes = np.nan_to_num(forward_fill(state)).astype(np.int64)
+    decided = regimes[regimes != 0]
+    switches = int(np.count_nonzero(decided[1:] != decided[:-1]))
+    changes = np.flatnonzero(regimes[1:] != regimes[:-1])
+    duration = n - (changes[-1] + 1 if len(changes) else 0)
+    return (
+        n,
+        mean,
+        volatility,
+        autocorrelation,
+        half_life,
+        decorrelation_lag,
+        np.count_nonzero(rates > 0) / n,
+        regimes[-1],
+        switches,
+        duration,
+    )
+
+
+def _analyze_range(rates, offsets, start: int, end: int, params: tuple) -> np.ndarray:
+    rows = np.empty((end - start, len(ANALYTICS_COLUMNS)))
+    for i in range(start, end):
+        rows[i - start] = analyze(rates[offsets[i] : offsets[i + 1]], *params)
+    return rows
+
+
+def _shard_bounds(offsets: np.ndarray, num_shards: int) -> list:
+    # contiguous pair ranges with about the same number of records
+    num_pairs = len(offsets) - 1
+    targets = np.linspace(0, offsets[-1], num_shards + 1)[1:-1]
+    inner = np.searchsorted(offsets[:-1], targets)
+    return sorted(set([0, *inner.tolist(), num_pairs]))
+
+
+def _share(array: np.ndarray) -> tuple:
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[:] = array
+    return block, array
+
+
+_worker_blocks = []
+_worker_arrays = []
+
+
+def _init_worker(*specs) -> None:
+    for name, shape, dtype in specs:
+        block = shared_memory.SharedMemory(name=name)
+        # keep the block open while its array is in use
+        _worker_blocks.append(block)
+        _worker_arrays.append(np.ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def _run_worker(args: tuple) -> np.ndarray:
+    start, end, params = args
+    rates, offsets = _worker_arrays
+    return _analyze_range(rates, offsets, start, end, params)
@@ -0,0 +1,435 @@
+"""
+Compact columnar snapshots of multi CEX scan results and deltas between them
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from funding_rate_arbitrage.frarb import DIVERGENCE_COLUMNS
+from funding_rate_arbitrage.lazy import pd
+from funding_rate_arbitrage.settlement import HOUR_MS
+
+log = logging.getLogger("rich")
+
+# field names of DIVERGENCE_COLUMNS in Arrow tables
+METRIC_FIELDS = ["divergence", "commission", "revenue", "time_to_settlement"]
+# Time to Settlement [h] runs down between scans, moves within a minute of that are not changes
+SETTLEMENT_TOLERANCE = 1 / 60
+# ranks reported by diff_scans: one move near the top shifts the rank of every symbol below it
+DIFF_TOP = 10
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        log.error("pyarrow is required to export scan snapshots (pip install pyarrow).")
+        raise
+    return pyarrow
+
+
+def _ranks(values: np.ndarray, symbols: np.ndarray) -> np.ndarray:
+    # position of every value in descending order, NaN last (as sort_values), ties by symbol so that
+    # ranks do not depend on row order
+    keys = np.where(np.isnan(values), np.inf, -values.astype(np.float64))
+    order = np.lexsort((symbols.astype(str), keys))
+    ranks = np.empty(len(values), dtype=np.int32)
+    ranks[order] = np.arange(len(values))
+    return ranks
+
+
+def _same(a: np.ndarray, b: np.ndarray, tolerance: float) -> np.ndarray:
+    return (np.isnan(a) & np.isnan(b)) | (np.abs(a - b) <= tolerance)
+
+
+class ScanSnapshot(NamedTuple):
+    """
+    Large funding rate divergence DataFrame between multi CEX as compact arrays.
+    Rates and metrics are float32 in the units of the DataFrame (%), rows are in ranking order of sorted_by.
+    As an Arrow table there is one row per listed (symbol, exchange), with dictionary-encoded symbol and
+    exchange columns and the metrics of the symbol repeated, which Parquet stores as runs.
+    """
+
+    timestamp: int
+    sorted_by: str
+    symbols: np.ndarray
+    exchanges: list
+    rates: np.ndarray
+    metrics: np.ndarray
+    ranks: np.ndarray
+
+    @classmethod
+    def from_dataframe(
+        cls, df: pd.DataFrame, timestamp=None, sorted_by="Revenue [/100 USDT]"
+    ) -> ScanSnapshot:
+        """
+        Build from a large funding rate divergence DataFrame.
+
+        Args:
+            df (pd.DataFrame): DataFrame of FundingRateArbitrage.get_large_divergence_dataframe_multi_exchanges.
+            timestamp (int): Scan time [ms]. Now if None.
+            sorted_by (str): Column ranked (Revenue [/100 USDT], Divergence [%]).
+
+        Returns (ScanSnapshot): Snapshot.
+
+        """
+        if sorted_by not in DIVERGENCE_COLUMNS:
+            log.error(f"{sorted_by} is not available.")
+            raise KeyError(sorted_by)
+        if timestamp is None:
+            timestamp = int(time.time() * 1000)
+        num_exchanges = df.columns.get_loc("Divergence [%]")
+        metrics = df.reindex(columns=DIVERGENCE_COLUMNS).to_numpy(dtype=np.float32)
+        return cls._ranked(
+            int(timestamp),
+            sorted_by,
+            np.asarray(df.index, dtype=object),
+            [str(ex) for ex in df.columns[:num_exchanges]],
+            df.iloc[:, :num_exchanges].to_numpy(dtype=np.float32),
+            metrics,
+        )
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """
+        Convert to a large funding rate divergence DataFrame (float64, rows in ranking order).
+
+        Returns (pd.DataFrame): large funding rate divergence DataFrame.
+
+        """
+        df = pd.DataFrame(
+            self.rates.astype(np.float64), index=self.symbols, columns=self.exchanges
+        )
+        for i, column in enumerate(DIVERGENCE_COLUMNS):
+            df[column] = self.metrics[:, i].astype(np.float64)
+        return df
+
+    def take(self, positions) -> ScanSnapshot:
+        """
+        Get the rows at positions, keeping their ranks in the whole scan.
+
+        Args:
+            positions (array-like): Row positions.
+
+        Returns (ScanSnapshot): Snapshot of the rows.
+
+        """
+        return self._replace(
+            symbols=self.symbols[positions],
+            rates=self.rates[positions],
+            metrics=self.metrics[positions],
+            ranks=self.ranks[positions],
+        )
+
+    def to_arrow(self):
+        """
+        Convert to an Arrow table (requires pyarrow).
+        Columns: symbol and exchange (dictionary), funding_rate, divergence, commission, revenue,
+        time_to_settlement (float32) and rank (int32). Symbols without any listed exchange have one row
+        with null exchange. timestamp, sorted_by and exchanges are kept in the schema metadata.
+
+        Returns (pyarrow.Table): Table.
+
+        """
+        pa = _pyarrow()
+        cells = ~np.isnan(self.rates)
+        unlisted = ~cells.any(axis=1)
+        cells[unlisted, 0] = True
+        rows, columns = np.nonzero(cells)
+        symbol_codes, symbol_dictionary = pd.factorize(self.symbols)
+        arrays = {
+            "symbol": pa.DictionaryArray.from_arrays(
+                pa.array(symbol_codes[rows].astype(np.int32)),
+                pa.array(symbol_dictionary.astype(str), type=pa.string()),
+            ),
+            "exchange": pa.DictionaryArray.from_arrays(
+                pa.array(columns.astype(np.int32), mask=unlisted[rows]),
+                pa.array(self.exchanges, type=pa.string()),
+            ),
+            "funding_rate": pa.array(self.rates[rows, columns], type=pa.float32()),
+        }
+        for i, field in enumerate(METRIC_FIELDS):
+            arrays[field] = pa.array(self.metrics[rows, i], type=pa.float32())
+        arrays["rank"] = pa.array(self.ranks[rows], type=pa.int32())
+        table = pa.table(arrays)
+        return table.replace_schema_metadata(
+            {
+                "timestamp": str(self.timestamp),
+                "sorted_by": self.sorted_by,
+                "exchanges": json.dumps(self.exchanges),
+            }
+        )
+
+    @classmethod
+    def from_arrow(cls, table) -> ScanSnapshot:
+        """
+        Build from an Arrow table of to_arrow.
+
+        Args:
+            table (pyarrow.Table): Table.
+
+        Returns (ScanSnapshot): Snapshot.
+
+        """
+        metadata = {k.decode(): v.decode() for k, v in table.schema.metadata.items()}
+        exchanges = json.loads(metadata["exchanges"])
+        symbol = table.column("symbol").combine_chunks()
+        exchange = table.column("exchange").combine_chunks()
+        # one entry per symbol, metrics and rank are read from its first row
+        codes, first, symbol_codes = np.unique(
+            symbol.indices.to_numpy(), return_index=True, return_inverse=True
+        )
+        symbols = symbol.dictionary.to_numpy(zero_copy_only=False).astype(object)[codes]
+        exchange_codes = pd.Index(exchange.dictionary.to_pylist()).get_indexer(
+            exchanges
+        )
+        columns = np.full(len(exchange.dictionary), -1, dtype=np.int64)
+        columns[exchange_codes[exchange_codes >= 0]] = np.flatnonzero(
+            exchange_codes >= 0
+        )
+        columns = np.where(
+            exchange.is_valid().to_numpy(zero_copy_only=False),
+            columns[exchange.indices.fill_null(0).to_numpy()],
+            -1,
+        )
+        rates = np.full((len(symbols), len(exchanges)), np.nan, dtype=np.float32)
+        listed = columns >= 0
+        rates[symbol_codes[listed], columns[listed]] = table.column(
+            "funding_rate"
+        ).to_numpy()[listed]
+        metrics = np.column_stack(
+            [table.column(field).to_numpy()[first] for field in METRIC_FIELDS]
+        )
+        ranks = table.column("rank").to_numpy()[first]
+        order = np.argsort(ranks, kind="stable")
+        return cls(
+            int(metadata["timestamp"]),
+            metadata["sorted_by"],
+            symbols[order],
+            exchanges,
+            rates[order],
+            metrics.astype(np.float32).reshape(-1, len(METRIC_FIELDS))[order],
+            ranks.astype(np.int32)[order],
+        )
+
+    def write(self, path: str, compression="zstd") -> None:
+        """
+        Write as a Parquet file (requires pyarrow).
+
+        Args:
+            path (str): Path of the file.
+            compression (str): Parquet compression codec.
+
+        Returns: None
+
+        """
+        _pyarrow()
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, compression=compression)
+
+    @classmethod
+    def read(cls, path: str) -> ScanSnapshot:
+        """
+        Read a Parquet file of write (requires pyarrow).
+
+        Args:
+            path (str): Path of the file.
+
+        Returns (ScanSnapshot): Snapshot.
+
+        """
+        _pyarrow()
+        import pyarrow.parquet as pq
+
+        return cls.from_arrow(pq.read_table(path))
+
+    @classmethod
+    def _ranked(cls, timestamp, sorted_by, symbols, exchanges, rates, metrics):
+        ranks = _ranks(metrics[:, DIVERGENCE_COLUMNS.index(sorted_by)], symbols)
+        order = np.argsort(ranks)
+        return cls(
+            timestamp,
+            sorted_by,
+            symbols[order],
+            exchanges,
+            rates[order],
+            metrics[order],
+            ranks[order],
+        )
+
+
+class ScanDelta(NamedTuple):
+    """
+    Changes from a scan snapshot to the next one: rows of added or moved symbols (changed) and
+    removed symbols. base_timestamp is the scan time of the snapshot the delta applies to.
+    """
+
+    base_timestamp: int
+    changed: ScanSnapshot
+    removed: np.ndarray
+
+    def apply(self, base: ScanSnapshot) -> ScanSnapshot:
+        """
+        Apply the delta to the snapshot it was computed from.
+
+        Args:
+            base (ScanSnapshot): Former snapshot.
+
+        Returns (ScanSnapshot): Next snapshot. Ranks are recomputed from rows, and Time to Settlement
+            of unchanged rows runs down by the time between both scans.
+
+        """
+        changed = self.changed
+        drop = np.concatenate([self.removed, changed.symbols]).astype(object)
+        kept = ~pd.Index(base.symbols, dtype=object).isin(drop)
+        kept_metrics = base.metrics[kept].copy()
+        kept_metrics[:, 3] -= (changed.timestamp - base.timestamp) / HOUR_MS
+        columns = pd.Index(base.exchanges).get_indexer(changed.exchanges)
+        kept_rates = np.full(
+            (int(kept.sum()), len(changed.exchanges)), np.nan, dtype=np.float32
+        )
+        kept_rates[:, columns >= 0] = base.rates[kept][:, columns[columns >= 0]]
+        return ScanSnapshot._ranked(
+            changed.timestamp,
+            changed.sorted_by,
+            np.concatenate([base.symbols[kept], changed.symbols]).astype(object),
+            changed.exchanges,
+            np.vstack([kept_rates, changed.rates]),
+            np.vstack([kept_metrics, changed.metrics]),
+        )
+
+    def to_arrow(self):
+        """
+        Convert to an Arrow table of the changed rows (see ScanSnapshot.to_arrow), with base_timestamp
+        and removed symbols in the schema metadata (requires pyarrow).
+
+        Returns (pyarrow.Table): Table.
+
+        """
+        table = self.changed.to_arrow()
+        return table.replace_schema_metadata(
+            {
+                **{k.decode(): v.decode() for k, v in table.schema.metadata.items()},
+                "base_timestamp": str(self.base_timestamp),
+                "removed": json.dumps(self.removed.tolist()),
+            }
+        )
+
+    @classmethod
+    def from_arrow(cls, table) -> ScanDelta:
+        """
+        Build from an Arrow table of to_arrow.
+
+        Args:
+            table (pyarrow.Table): Table.
+
+        Returns (ScanDelta): Delta.
+
+        """
+        metadata = table.schema.metadata
+        return cls(
+            int(metadata[b"base_timestamp"]),
+            ScanSnapshot.from_arrow(table),
+            np.array(json.loads(metadata[b"removed"]), dtype=object),
+        )
+
+    def write(self, path: str, compression="zstd") -> None:
+        """
+        Write as a Parquet file (requires pyarrow).
+
+        Args:
+            path (str): Path of the file.
+            compression (str): Parquet compression codec.
+
+        Returns: None
+
+        """
+        _pyarrow()
+        import pyarrow.parquet as pq
+
+        pq.write_table(self.to_arrow(), path, compression=compression)
+
+    @classmethod
+    def read(cls, path: str) -> ScanDelta:
+        """
+        Read a Parquet file of write (requires pyarrow).
+
+        Args:
+            path (str): Path of the file.
+
+        Returns (ScanDelta): Delta.
+
+        """
+        _pyarrow()
+        import pyarrow.parquet as pq
+
+        return cls.from_arrow(pq.read_table(path))
+
+
+def diff_scans(
+    base: ScanSnapshot, new: ScanSnapshot, tolerance=0.0, top=DIFF_TOP
+) -> ScanDelta:
+    """
+    Get the symbols whose rates, metrics or ranking moved between two scan snapshots.
+    Symbols are aligned once with a hash index, then every comparison is a vectorized
+    array operation over the rows of the new snapshot.
+    Ranks are recomputed by ScanDelta.apply, so rank moves are only reported within the top ranks
+    (entering, leaving or moving in the displayed top), which keeps deltas as small as the moves.
+
+    Args:
+        base (ScanSnapshot): Former snapshot.
+        new (ScanSnapshot): Next snapshot.
+        tolerance (float): Largest move of a rate or metric [%] regarded as unchanged.
+        top (int): Only rank moves within the top ranks are reported. Every rank move if None,
+            which reports every symbol below a moved one.
+
+    Returns (ScanDelta): Added and moved rows of new, and removed symbols.
+
+    """
+    # object index: hashing str is faster than pyarrow-backed string comparison
+    symbols = pd.Index(base.symbols, dtype=object)
+    position = symbols.get_indexer(new.symbols)
+    present = position >= 0
+    columns = pd.Index(base.exchanges).get_indexer(new.exchanges)
+    base_rates = np.full(new.rates.shape, np.nan, dtype=np.float32)
+    base_rates[np.ix_(present, columns >= 0)] = base.rates[position[present]][
+        :, columns[columns >= 0]
+    ]
+    # rates on exchanges missing from the new scan moved too
+    dropped = np.setdiff1d(np.arange(len(base.exchanges)), columns[columns >= 0])
+    delisted = np.zeros(len(new.symbols), dtype=bool)
+    delisted[present] = ~np.isnan(base.rates[position[present]][:, dropped]).all(axis=1)
+
+    base_metrics = np.full(new.metrics.shape, np.nan, dtype=np.float32)
+    base_metrics[present] = base.metrics[position[present]]
+    base_metrics[:, 3] -= (new.timestamp - base.timestamp) / HOUR_MS
+    moved = (
+        ~present
+        | delisted
+        | ~_same(base_rates, new.rates, tolerance).all(axis=1)
+        | ~_same(base_metrics[:, :3], new.metrics[:, :3], tolerance).all(axis=1)
+        | ~_same(
+            base_metrics[:, 3],
+            new.metrics[:, 3],
+            max(tolerance, SETTLEMENT_TOLERANCE),
+        )
+    )
+    base_ranks = np.full(len(new.symbols), -1, dtype=np.int64)
+    base_ranks[present] = base.ranks[position[present]]
+    rank_moved = base_ranks != new.ranks
+    if top is not None:
+        rank_moved &= (base_ranks < top) | (new.ranks < top)
+    moved |= rank_moved & present
+
+    removed = ~symbols.isin(new.symbols)
+    return ScanDelta(
+        base.timestamp,
+        new.take(np.flatnonzero(moved)),
+        base.symbols[removed].astype(object),
+    )
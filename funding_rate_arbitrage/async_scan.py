@@ -0,0 +1,330 @@
+"""
+Concurrent funding rate scanning on multi CEX with ccxt.async_support
+"""
+
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from funding_rate_arbitrage.lazy import ccxt, ccxt_async
+from funding_rate_arbitrage.metrics import Instrumentation
+from funding_rate_arbitrage.resilience import CircuitOpen
+from funding_rate_arbitrage.settlement import settlement_from_ccxt
+
+log = logging.getLogger("rich")
+
+# Upper bound of requests in flight on a single exchange.
+MAX_CONCURRENCY = 20
+
+
+def concurrency_limit(ex, max_concurrency=MAX_CONCURRENCY) -> int:
+    """
+    Get the number of requests allowed in flight on the exchange.
+    ccxt rateLimit is the minimum interval between requests [ms], so the cap is the number
+    of requests the exchange accepts in one second.
+
+    Args:
+        ex (ccxt.async_support.Exchange): Exchange object.
+        max_concurrency (int): Upper bound of the cap.
+
+    Returns (int): Concurrency cap of the exchange.
+
+    """
+    rate_limit = getattr(ex, "rateLimit", None) or 1000
+    return max(1, min(max_concurrency, int(1000 / rate_limit)))
+
+
+async def fetch_funding_rates_async(
+    ex, symbols: list, bulk=True, chunk_size=100, semaphore=None, fetcher=None
+) -> dict:
+    """
+    Fetch funding rate structures of the given symbols concurrently.
+    Same request plan as FundingRateArbitrage.fetch_funding_rates, but chunks and
+    per-symbol requests run concurrently under the semaphore.
+
+    Args:
+        ex (ccxt.async_support.Exchange): Exchange object with markets loaded.
+        symbols (list): Symbols (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+        bulk (bool): Use the bulk endpoint (fetchFundingRates) when the exchange supports it.
+        chunk_size (int): Number of symbols per bulk request when the exchange requires symbols.
+        semaphore (asyncio.Semaphore): Concurrency cap of the exchange.
+        fetcher (ResilientFetcher): Sends requests with rate limiting and retries.
+            Symbols failing on network errors are then skipped and reported, and when the
+            exchange circuit opens, the symbols fetched so far are returned.
+
+    Returns (dict): Dict of symbol and ccxt funding rate structure.
+
+    """
+    if semaphore is None:
+        semaphore = asyncio.Semaphore(concurrency_limit(ex))
+
+    async def request(method, *args):
+        if fetcher is None:
+            return await getattr(ex, method)(*args)
+        return await fetcher.call(ex, method, *args)
+
+    # set when the exchange circuit opens: symbols not requested yet are skipped
+    stopped = asyncio.Event()
+
+    def circuit_opened(error):
+        if not stopped.is_set():
+            stopped.set()
+            log.error(
+                f"{ex.id}: dropped from the scan ({error!r}), keeping partial results."
+            )
+            fetcher.exchange_failed(ex.id, error)
+
+    async def one(symbol):
+        async with semaphore:
+            if stopped.is_set():
+                return {}
+            try:
+                return {symbol: await request("fetch_funding_rate", symbol)}
+            except CircuitOpen as e:
+                circuit_opened(e)
+                return {}
+            except ccxt.ExchangeError as e:
+                log.exception(f"{symbol} is not perp.")
+                error = e
+            except ccxt.NetworkError as e:
+                if fetcher is None:
+                    raise
+                log.error(f"{ex.id}: failed to fetch {symbol} ({e!r}).")
+                error = e
+        if fetcher is not None:
+            fetcher.symbol_failed(ex.id, symbol, error)
+        return {}
+
+    async def chunk(symbols_chunk):
+        async with semaphore:
+            if stopped.is_set():
+                return {}
+            try:
+                return await request("fetch_funding_rates", symbols_chunk)
+            except CircuitOpen as e:
+                circuit_opened(e)
+                return {}
+            except (ccxt.ExchangeError, ccxt.NetworkError) as e:
+                if isinstance(e, ccxt.NetworkError) and fetcher is None:
+                    raise
+                log.warning(f"{ex.id}: bulk request failed, fetching one by one.")
+        return await gather_dicts([one(s) for s in symbols_chunk])
+
+    if not (bulk and ex.has.get("fetchFundingRates")):
+        rates = await gather_dicts([one(s) for s in symbols])
+    else:
+        try:
+            async with semaphore:
+                rates = await request("fetch_funding_rates")
+        except ccxt.ExchangeError as e:
+            # symbols are required, or the request was rejected (BadRequest, ...)
+            if not isinstance(e, ccxt.ArgumentsRequired):
+                log.warning(
+                    f"{ex.id}: bulk request failed ({e!r}), fetching in chunks."
+                )
+            swaps = [s for s in symbols if ex.markets[s].get("swap", True)]
+            rates = await gather_dicts(
+                [
+                    chunk(swaps[i : i + chunk_size])
+                    for i in range(0, len(swaps), chunk_size)
+                ]
+            )
+    return {s: rates[s] for s in symbols if s in rates}
+
+
+async def gather_dicts(coros: list) -> dict:
+    """
+    Run coroutines concurrently and merge the dicts they return.
+
+    Args:
+        coros (list): Coroutines returning dict.
+
+    Returns (dict): Merged dict in the order of coroutines.
+
+    """
+    merged = {}
+    for d in await gather(coros):
+        merged.update(d)
+    return merged
+
+
+async def gather(coros: list) -> list:
+    """
+    Run coroutines concurrently. When one of them raises, the others are cancelled and
+    awaited before the error propagates, so that no task is left running or unretrieved.
+
+    Args:
+        coros (list): Coroutines.
+
+    Returns (list): Results in the order of coroutines.
+
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+async def fetch_all_funding_rate_async(
+    exchange,
+    bulk=True,
+    chunk_size=100,
+    pool=None,
+    details=False,
+    fetcher=None,
+    metrics=None,
+) -> dict:
+    """
+    Fetch funding rates on all perpetual contracts listed on the exchange concurrently.
+
+    Args:
+        exchange (str | ccxt.async_support.Exchange): Name of exchange (binance, bybit, ...) or an exchange object.
+        bulk (bool): Use the bulk endpoint (fetchFundingRates) when the exchange supports it.
+        chunk_size (int): Number of symbols per bulk request when the exchange requires symbols.
+        pool (ExchangePool): Pool providing the client and cached markets of named exchanges.
+        details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+        fetcher (ResilientFetcher): Sends requests with rate limiting and retries.
+        metrics (Instrumentation): Records wall time of markets and fetch stages.
+
+    Returns (dict): Dict of perpetual contract pair and funding rate.
+
+    """
+    pooled = isinstance(exchange, str) and pool is not None
+    own_client = isinstance(exchange, str) and pool is None
+    if pooled:
+        ex = pool.async_client(exchange)
+    else:
+        ex = getattr(ccxt_async, exchange)() if own_client else exchange
+    metrics = metrics or Instrumentation()
+    try:
+        log.info(f"fetching {ex.id}")
+        with metrics.stage("markets", ex.id):
+            if pooled:
+                info = await pool.load_markets_async(exchange, fetcher=fetcher)
+            elif fetcher is not None:
+                info = await fetcher.call(ex, "load_markets")
+            else:
+                info = await ex.load_markets()
+        perp = [p for p in info if info[p]["linear"]]
+        with metrics.stage("fetch", ex.id):
+            fr_d = await fetch_funding_rates_async(
+                ex, perp, bulk=bulk, chunk_size=chunk_size, fetcher=fetcher
+            )
+    finally:
+        if own_client:
+            await ex.close()
+    if details:
+        return {p: settlement_from_ccxt(fr) for p, fr in fr_d.items()}
+    return {p: fr["fundingRate"] for p, fr in fr_d.items()}
+
+
+async def scan_exchanges(
+    exchanges: list,
+    bulk=True,
+    chunk_size=100,
+    pool=None,
+    details=False,
+    fetcher=None,
+    metrics=None,
+) -> dict:
+    """
+    Fetch funding rates on all perpetual contracts listed on every exchange concurrently.
+
+    Args:
+        exchanges (list): Names of exchanges or exchange objects.
+        bulk (bool): Use the bulk endpoint (fetchFundingRates) when the exchange supports it.
+        chunk_size (int): Number of symbols per bulk request when the exchange requires symbols.
+        pool (ExchangePool): Pool providing the clients and cached markets of named exchanges.
+        details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+        fetcher (ResilientFetcher): Sends requests with rate limiting and retries. With a fetcher,
+            a failing exchange is dropped from the result and reported in fetcher.report.
+        metrics (Instrumentation): Records wall time of markets and fetch stages.
+
+    Returns (dict): Dict of exchange name and dict of perpetual contract pair and funding rate.
+
+    """
+    names = [ex if isinstance(ex, str) else ex.id for ex in exchanges]
+    if fetcher is not None:
+        fetcher.begin(names)
+
+    async def one(name, ex):
+        try:
+            return await fetch_all_funding_rate_async(
+                ex,
+                bulk=bulk,
+                chunk_size=chunk_size,
+                pool=pool,
+                details=details,
+                fetcher=fetcher,
+                metrics=metrics,
+            )
+        except (ccxt.BaseError, CircuitOpen) as e:
+            if fetcher is None:
+                raise
+            log.error(f"{name}: dropped from the scan ({e!r}).")
+            fetcher.exchange_failed(name, e)
+
+    results = await gather([one(n, ex) for n, ex in zip(names, exchanges)])
+    return {name: fr for name, fr in zip(names, results) if fr is not None}
+
+
+def run(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+    When an event loop is already running (Jupyter, ...), the coroutine runs on a new loop in a worker thread.
+
+    Args:
+        coro: Coroutine.
+
+    Returns: Result of the coroutine.
+
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+def scan(
+    exchanges: list,
+    bulk=True,
+    chunk_size=100,
+    pool=None,
+    details=False,
+    fetcher=None,
+    metrics=None,
+) -> dict:
+    """
+    Synchronous wrapper of scan_exchanges.
+    With a pool, the scan runs on the pool event loop so that its async clients are reused.
+
+    Args:
+        exchanges (list): Names of exchanges or exchange objects.
+        bulk (bool): Use the bulk endpoint (fetchFundingRates) when the exchange supports it.
+        chunk_size (int): Number of symbols per bulk request when the exchange requires symbols.
+        pool (ExchangePool): Pool providing the clients and cached markets of named exchanges.
+        details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+        fetcher (ResilientFetcher): Sends requests with rate limiting and retries.
+        metrics (Instrumentation): Records wall time of markets and fetch stages.
+
+    Returns (dict): Dict of exchange name and dict of perpetual contract pair and funding rate.
+
+    """
+    coro = scan_exchanges(
+        exchanges,
+        bulk=bulk,
+        chunk_size=chunk_size,
+        pool=pool,
+        details=details,
+        fetcher=fetcher,
+        metrics=metrics,
+    )
+    if pool is not None:
+        return pool.run(coro)
+    return run(coro)
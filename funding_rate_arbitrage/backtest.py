@@ -0,0 +1,232 @@
+"""
+Vectorized backtests of funding rate carry strategies over stored histories
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from funding_rate_arbitrage.commission import CommissionSchedule
+from funding_rate_arbitrage.lazy import pd
+from funding_rate_arbitrage.settlement import (
+    HOUR_MS,
+    normalize_rates,
+    settlement_grid,
+)
+from funding_rate_arbitrage.stats import forward_fill
+
+log = logging.getLogger("rich")
+
+RESULT_COLUMNS = ["Funding [%]", "Commission [%]", "PnL [%]", "Trades", "Exposure"]
+
+
+class Backtester:
+    """
+    Backtests entry/exit threshold rules on funding rate histories of many (exchange, symbol) pairs.
+    Histories are laid out once on a common settlement time grid as (exchange, symbol, time) arrays,
+    and every rule is evaluated on whole arrays, so symbols and exchanges cost no Python loop.
+
+    A position is opened at a settlement when the latest funding rate reaches entry and closed when it
+    falls below exit, and earns the funding of the following settlements while open.
+    Commission of both legs is paid on entry and on exit, positions still open at the end are closed.
+    Rates and thresholds are in % and compared after scaling to horizon [h].
+    """
+
+    def __init__(
+        self,
+        histories: pd.DataFrame,
+        commission_schedule=None,
+        taker=True,
+        by_token=False,
+        horizon=8.0,
+        resolution=HOUR_MS,
+    ):
+        """
+        Args:
+            histories (pd.DataFrame): timestamp [ms] and funding_rate columns indexed by (exchange, symbol)
+                (see FundingRateHistoryStore.load_histories).
+            commission_schedule (CommissionSchedule): Commission schedule. Default schedule if None.
+            taker (bool): Taker or maker commission.
+            by_token (bool): Commission paid by exchange token.
+            horizon (float): Horizon [h] rates are scaled to before comparing with thresholds.
+            resolution (int): Step of the settlement time grid [ms]. Settlement times are rounded to it,
+                so that jittered records (8:00:00.003, ...) of different pairs share a grid point.
+        """
+        exchange_codes, exchanges = pd.factorize(histories.index.get_level_values(0))
+        symbol_codes, symbols = pd.factorize(histories.index.get_level_values(1))
+        self.exchanges = [str(ex) for ex in exchanges]
+        self.symbols = [str(symbol) for symbol in symbols]
+        timestamp = histories["timestamp"].to_numpy(dtype=np.int64)
+        rate = histories["funding_rate"].to_numpy(dtype=np.float64) * 100
+        self.timestamps, time_codes = np.unique(
+            settlement_grid(timestamp, resolution), return_inverse=True
+        )
+
+        shape = (len(self.exchanges), len(self.symbols), len(self.timestamps))
+        # funding rate paid at each settlement, 0 between settlements
+        # (summed when settlements of a pair share a grid point)
+        self.settled = np.zeros(shape)
+        np.add.at(self.settled, (exchange_codes, symbol_codes, time_codes), rate)
+        # latest funding rate scaled to horizon, NaN before the first settlement
+        observed = np.full(shape, np.nan)
+        observed[exchange_codes, symbol_codes, time_codes] = normalize_rates(
+            rate, _intervals(exchange_codes, symbol_codes, timestamp), horizon
+        )
+        self.observed = forward_fill(observed)
+
+        schedule = commission_schedule or CommissionSchedule.default()
+        self.futures_commission, self.spot_commission = (
+            schedule.get_commissions(
+                self.exchanges, trade, taker=taker, by_token=by_token, default=np.nan
+            )
+            for trade in ["futures", "spot"]
+        )
+
+    def carry(self, entry_threshold: float, exit_threshold: float) -> pd.DataFrame:
+        """
+        Backtest single-exchange spot/perp carry: sell perp and buy spot on the same exchange.
+
+        Args:
+            entry_threshold (float): Funding rate [%] opening a position.
+            exit_threshold (float): Funding rate [%] below which the position is closed.
+
+        Returns (pd.DataFrame): Funding [%], Commission [%], PnL [%], Trades and Exposure
+            (share of time in position) indexed by (exchange, symbol).
+
+        """
+        position = _hysteresis(
+            self.observed >= entry_threshold, ~(self.observed >= exit_threshold)
+        )
+        round_trip = 2 * (self.futures_commission + self.spot_commission)
+        result = self._result(position, self.settled, round_trip[:, None])
+        index = pd.MultiIndex.from_product(
+            [self.exchanges, self.symbols], names=["exchange", "symbol"]
+        )
+        df = pd.DataFrame(
+            {c: v.ravel() for c, v in zip(RESULT_COLUMNS, result)}, index=index
+        )
+        return df[self._listed().ravel()]
+
+    def cross(self, entry_threshold: float, exit_threshold: float) -> pd.DataFrame:
+        """
+        Backtest cross-exchange perp/perp carry: sell perp on one exchange and buy perp on another.
+        Every ordered pair of exchanges is evaluated on the funding rate spread of the two legs.
+
+        Args:
+            entry_threshold (float): Funding rate spread [%] opening a position.
+            exit_threshold (float): Funding rate spread [%] below which the position is closed.
+
+        Returns (pd.DataFrame): Funding [%], Commission [%], PnL [%], Trades and Exposure
+            indexed by (symbol, short exchange, long exchange).
+
+        """
+        listed = self._listed()
+        frames = []
+        for short, long in itertools.permutations(range(len(self.exchanges)), 2):
+            both = listed[short] & listed[long]
+            if not both.any():
+                continue
+            spread = self.observed[short, both] - self.observed[long, both]
+            position = _hysteresis(
+                spread >= entry_threshold, ~(spread >= exit_threshold)
+            )
+            round_trip = 2 * (
+                self.futures_commission[short] + self.futures_commission[long]
+            )
+            result = self._result(
+                position,
+                self.settled[short, both] - self.settled[long, both],
+                round_trip,
+            )
+            symbols = np.array(self.symbols, dtype=object)[both]
+            index = pd.MultiIndex.from_arrays(
+                [
+                    symbols,
+                    [self.exchanges[short]] * len(symbols),
+                    [self.exchanges[long]] * len(symbols),
+                ],
+                names=["symbol", "short", "long"],
+            )
+            frames.append(pd.DataFrame(dict(zip(RESULT_COLUMNS, result)), index=index))
+        if not frames:
+            return pd.DataFrame(columns=RESULT_COLUMNS)
+        return pd.concat(frames)
+
+    def sweep(self, grid: list, strategy="carry", workers=None) -> pd.DataFrame:
+        """
+        Backtest a grid of thresholds in parallel over a process pool.
+
+        Args:
+            grid (list): List of (entry_threshold, exit_threshold) [%].
+            strategy (str): "carry" or "cross".
+            workers (int): Number of processes. os.cpu_count() if None.
+
+        Returns (pd.DataFrame): Results of every threshold with entry and exit index levels prepended.
+
+        """
+        if strategy not in ("carry", "cross"):
+            log.error(f"{strategy} is not available.")
+            raise KeyError(strategy)
+        grid = [tuple(thresholds) for thresholds in grid]
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(self,)
+        ) as executor:
+            results = list(
+                executor.map(_run_worker, [(strategy,) + params for params in grid])
+            )
+        return pd.concat(results, keys=grid, names=["entry", "exit"])
+
+    def _listed(self) -> np.ndarray:
+        return ~np.isnan(self.observed).all(axis=2)
+
+    @staticmethod
+    def _result(position: np.ndarray, settled: np.ndarray, round_trip) -> tuple:
+        # a position decided at a settlement earns the funding of the next one
+        held = np.zeros_like(position)
+        held[..., 1:] = position[..., :-1]
+        funding = (held * settled).sum(axis=-1)
+        entries = (position & ~held).sum(axis=-1)
+        commission = entries * round_trip
+        exposure = held.mean(axis=-1) if held.shape[-1] else np.zeros(held.shape[:-1])
+        return funding, commission, funding - commission, entries, exposure
+
+
+def _intervals(exchange_codes, symbol_codes, timestamp) -> np.ndarray:
+    # settlement interval of every record, from the previous settlement of the pair
+    # (the next one for the first record)
+    order = np.lexsort((timestamp, symbol_codes, exchange_codes))
+    group = exchange_codes[order] * (symbol_codes.max() + 1) + symbol_codes[order]
+    t = timestamp[order].astype(np.float64)
+    same = np.r_[False, group[1:] == group[:-1]]
+    interval = np.full(len(t), np.nan)
+    interval[same] = np.diff(t)[same[1:]]
+    first = np.flatnonzero(~same)
+    has_next = first + 1 < len(t)
+    has_next[has_next] = same[first[has_next] + 1]
+    interval[first[has_next]] = interval[first[has_next] + 1]
+    result = np.empty(len(t))
+    result[order] = interval
+    return result
+
+
+def _hysteresis(enter: np.ndarray, leave: np.ndarray) -> np.ndarray:
+    # 1 on enter, 0 on leave, previous state otherwise
+    state = np.where(enter, 1.0, np.where(leave, 0.0, np.nan))
+    return np.nan_to_num(forward_fill(state)).astype(bool)
+
+
+_worker_backtester = None
+
+
+def _init_worker(backtester: Backtester) -> None:
+    global _worker_backtester
+    _worker_backtester = backtester
+
+
+def _run_worker(args: tuple) -> pd.DataFrame:
+    strategy, entry_threshold, exit_threshold = args
+    return getattr(_worker_backtester, strategy)(entry_threshold, exit_threshold)
@@ -0,0 +1,209 @@
+"""
+Batch rendering of funding rate history charts to image files
+"""
+
+import json
+import logging
+import os
+import re
+
+import numpy as np
+
+from funding_rate_arbitrage.history import FundingRateHistory
+
+log = logging.getLogger("rich")
+
+DAY_MS = 24 * 60 * 60 * 1000
+MANIFEST = "charts.json"
+
+
+def lttb(x, y, max_points: int) -> np.ndarray:
+    """
+    Downsample a series with Largest-Triangle-Three-Buckets.
+    First and last points are kept, and every bucket in between keeps the point forming the largest
+    triangle with the previous kept point and the average of the next bucket, so spikes survive.
+
+    Args:
+        x (array-like): Increasing x values.
+        y (array-like): y values.
+        max_points (int): Number of points kept (every point if < 3 or >= len(x)).
+
+    Returns (np.ndarray): Positions of the kept points.
+
+    """
+    n = len(x)
+    if max_points >= n or max_points < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # bounds of max_points - 2 buckets over the inner points
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    edges[-1] = n - 1
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[a] - next_x) * (y[start:end] - y[a])
+            - (x[a] - x[start:end]) * (next_y - y[a])
+        )
+        a = start + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+class ChartRenderer:
+    """
+    Renders funding rate history charts of many symbols to PNG/SVG files without a display.
+    Draws with the non-interactive Agg canvas on one figure reused for every chart (only line data,
+    limits and title change), downsamples long histories with LTTB, and skips charts whose
+    (exchange, symbol, last timestamp) is unchanged since they were rendered.
+    """
+
+    def __init__(
+        self, directory: str, fmt="png", max_points=2000, figsize=(8, 4.5), dpi=100
+    ):
+        """
+        Args:
+            directory (str): Directory of chart files and of the cache manifest.
+            fmt (str): png or svg.
+            max_points (int): Number of points drawn per chart (LTTB above).
+            figsize (tuple): Figure size [inch].
+            dpi (int): Resolution of png files.
+        """
+        if fmt not in ("png", "svg"):
+            log.error(f"{fmt} is not available.")
+            raise KeyError(fmt)
+        self.directory = directory
+        self.fmt = fmt
+        self.max_points = max_points
+        self.figsize = figsize
+        self.dpi = dpi
+        os.makedirs(directory, exist_ok=True)
+        self._manifest_path = os.path.join(directory, MANIFEST)
+        # chart file name -> last settlement time [ms] of the rendered history
+        self.manifest = {}
+        if os.path.exists(self._manifest_path):
+            with open(self._manifest_path) as f:
+                self.manifest = json.load(f)
+        self._figure = None
+
+    def render(self, history: FundingRateHistory, force=False):
+        """
+        Render the chart of a history unless it is cached.
+
+        Args:
+            history (FundingRateHistory): Funding rate history.
+            force (bool): Render even if cached.
+
+        Returns (str | None): Path of the chart, None if the history is empty.
+
+        """
+        path = self._render(history, force)
+        self.save()
+        return path
+
+    def render_many(self, histories, force=False) -> dict:
+        """
+        Render charts of many histories, skipping cached ones.
+
+        Args:
+            histories (iterable): FundingRateHistory of every chart.
+            force (bool): Render even if cached.
+
+        Returns (dict): Dict of (exchange, symbol) and path of the rendered charts (cached ones excluded).
+
+        """
+        paths = {}
+        try:
+            for history in histories:
+                if len(history) == 0 or not force and self._cached(history):
+                    continue
+                paths[(history.exchange, history.symbol)] = self._render(
+                    history, force=True
+                )
+        finally:
+            self.save()
+        return paths
+
+    def cached(self, exchange: str, symbol: str, last_timestamp) -> bool:
+        """
+        Check whether the chart of a history is rendered up to its last settlement.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            last_timestamp (int): Last settlement time of the history [ms].
+
+        Returns (bool): Cached.
+
+        """
+        name = self._file_name(exchange, symbol)
+        return (
+            last_timestamp is not None
+            and self.manifest.get(name) == int(last_timestamp)
+            and os.path.exists(os.path.join(self.directory, name))
+        )
+
+    def save(self) -> None:
+        """
+        Write the cache manifest.
+
+        Returns: None
+
+        """
+        tmp = f"{self._manifest_path}.tmp-{os.getpid()}"
+        with open(tmp, "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(tmp, self._manifest_path)
+
+    def _render(self, history: FundingRateHistory, force: bool):
+        if len(history) == 0:
+            return None
+        name = self._file_name(history.exchange, history.symbol)
+        path = os.path.join(self.directory, name)
+        if not force and self._cached(history):
+            return path
+        figure, ax, line, average = self._figure or self._new_figure()
+        kept = lttb(history.timestamps, history.rates, self.max_points)
+        # matplotlib dates are days since 1970-01-01
+        days = history.timestamps[kept] / DAY_MS
+        rates = history.rates[kept] * 100
+        mean = history.rates.mean() * 100
+        line.set_data(days, rates)
+        average.set_data([days[0], days[-1]], [mean, mean])
+        ax.set_title(f"Funding rate history {history.exchange} {history.symbol}")
+        ax.relim()
+        ax.autoscale_view()
+        figure.savefig(path, format=self.fmt, dpi=self.dpi)
+        self.manifest[name] = int(history.timestamps[-1])
+        return path
+
+    def _new_figure(self) -> tuple:
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        figure = Figure(figsize=self.figsize)
+        FigureCanvasAgg(figure)
+        ax = figure.add_subplot()
+        (line,) = ax.plot([], [], label="funding rate")
+        (average,) = ax.plot([], [], "r-.", label="average")
+        ax.xaxis_date()
+        ax.set_xlabel("timestamp")
+        ax.set_ylabel("Funding rate [%]")
+        ax.tick_params(labelrotation=45)
+        ax.legend()
+        # fixed margins: a layout engine would lay out (draw) every chart twice
+        figure.subplots_adjust(left=0.1, right=0.97, bottom=0.25, top=0.92)
+        self._figure = (figure, ax, line, average)
+        return self._figure
+
+    def _cached(self, history: FundingRateHistory) -> bool:
+        return self.cached(history.exchange, history.symbol, history.timestamps[-1])
+
+    def _file_name(self, exchange: str, symbol: str) -> str:
+        return re.sub(r"[^\w.-]", "_", f"{exchange}_{symbol}.{self.fmt}")
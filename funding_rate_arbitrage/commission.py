@@ -0,0 +1,230 @@
+"""
+Commission schedule of CEX
+"""
+
+import json
+import logging
+
+import numpy as np
+from numpy import ndarray
+
+log = logging.getLogger("rich")
+
+# Commission [%] per exchange and trade.
+# A number applies to taker and maker with and without exchange tokens. A dict gives "taker" and "maker",
+# and optionally "taker_by_token" and "maker_by_token" (same as without tokens when omitted).
+DEFAULT_SCHEDULE = {
+    # https://www.binance.com/en/fee/schedule
+    "binance": {
+        "spot": {
+            "taker": 0.1,
+            "maker": 0.1,
+            "taker_by_token": 0.075,
+            "maker_by_token": 0.075,
+        },
+        "futures": {
+            "taker": 0.04,
+            "maker": 0.02,
+            "taker_by_token": 0.036,
+            "maker_by_token": 0.018,
+        },
+        "options": 0.02,
+    },
+    # https://www.bybit.com/ja-JP/help-center/bybitHC_Article?id=360039261154&language=ja
+    "bybit": {
+        "spot": 0.1,
+        "futures": {"taker": 0.06, "maker": 0.01},
+        "options": 0.03,
+    },
+    # https://www.okx.com/fees
+    "okx": {
+        "spot": {"taker": 0.1, "maker": 0.08},
+        "futures": {"taker": 0.05, "maker": 0.02},
+        "options": {"taker": 0.03, "maker": 0.02},
+    },
+    # https://www.bitget.com/ja/rate/
+    "bitget": {
+        "spot": {
+            "taker": 0.1,
+            "maker": 0.1,
+            "taker_by_token": 0.08,
+            "maker_by_token": 0.08,
+        },
+        "futures": {"taker": 0.051, "maker": 0.017},
+    },
+    # https://www.gate.io/ja/fee
+    "gate": {
+        "spot": {
+            "taker": 0.2,
+            "maker": 0.2,
+            "taker_by_token": 0.15,
+            "maker_by_token": 0.15,
+        },
+        "futures": {"taker": 0.05, "maker": 0.015},
+    },
+    # https://www.coinex.zone/fees?type=spot&market=normal
+    "coinex": {
+        "spot": {
+            "taker": 0.2,
+            "maker": 0.2,
+            "taker_by_token": 0.16,
+            "maker_by_token": 0.16,
+        },
+        "futures": {"taker": 0.05, "maker": 0.03},
+    },
+}
+
+TRADES = ["spot", "futures", "options"]
+FEE_KEYS = ["taker", "maker", "taker_by_token", "maker_by_token"]
+
+
+class CommissionSchedule:
+    """
+    Commission schedule compiled into a dense table indexed by (exchange, trade, taker, by_token).
+    Trades not available on an exchange are NaN in the table.
+    """
+
+    def __init__(self, schedule: dict):
+        """
+        Args:
+            schedule (dict): Dict of exchange name and dict of trade and commission (see DEFAULT_SCHEDULE).
+        """
+        self.schedule = schedule
+        self.exchanges = list(schedule)
+        self.trades = list(TRADES)
+        for trades in schedule.values():
+            self.trades += [t for t in trades if t not in self.trades]
+        self._exchange_index = {ex: i for i, ex in enumerate(self.exchanges)}
+        self._trade_index = {t: i for i, t in enumerate(self.trades)}
+
+        self.table = np.full((len(self.exchanges), len(self.trades), 2, 2), np.nan)
+        self._lookup = {}
+        for ex, trades in schedule.items():
+            for trade, fee in trades.items():
+                taker, maker, taker_by_token, maker_by_token = self._parse_fee(
+                    ex, trade, fee
+                )
+                cells = {
+                    (True, False): taker,
+                    (False, False): maker,
+                    (True, True): taker_by_token,
+                    (False, True): maker_by_token,
+                }
+                for (is_taker, by_token), value in cells.items():
+                    self.table[
+                        self._exchange_index[ex],
+                        self._trade_index[trade],
+                        int(is_taker),
+                        int(by_token),
+                    ] = value
+                    self._lookup[(ex, trade, is_taker, by_token)] = value
+
+    @classmethod
+    def default(cls) -> "CommissionSchedule":
+        """
+        Get commission schedule of the supported exchanges.
+
+        Returns (CommissionSchedule): Default commission schedule.
+
+        """
+        return cls(DEFAULT_SCHEDULE)
+
+    @classmethod
+    def from_file(cls, path: str) -> "CommissionSchedule":
+        """
+        Load commission schedule from JSON or YAML (.yaml, .yml, requires PyYAML) file.
+
+        Args:
+            path (str): Path of the schedule file.
+
+        Returns (CommissionSchedule): Commission schedule.
+
+        """
+        with open(path) as f:
+            if str(path).endswith((".yaml", ".yml")):
+                try:
+                    import yaml
+                except ImportError:
+                    log.error("PyYAML is required to load YAML commission schedule.")
+                    raise
+                return cls(yaml.safe_load(f))
+            return cls(json.load(f))
+
+    def get(self, exchange: str, trade: str, taker=True, by_token=False) -> float:
+        """
+        Get commission.
+        Args:
+            exchange (str): Name of exchanges (binance, bybit, ...)
+            trade (str): Spot Trade or Futures Trade
+            taker (bool): is Taker or is Maker
+            by_token (bool): Pay with exchange tokens (BNB, CET, ...)
+
+        Returns (float): Commission.
+
+        """
+        try:
+            return self._lookup[(exchange, trade, bool(taker), bool(by_token))]
+        except KeyError:
+            log.error(f"{trade} is not available on {exchange}.")
+            raise
+
+    def get_commissions(
+        self, exchanges, trades, taker=True, by_token=False, default=None
+    ) -> ndarray:
+        """
+        Get commissions of many (exchange, trade) pairs at once.
+        Arguments are broadcast against each other.
+        Args:
+            exchanges (str | list): Names of exchanges (binance, bybit, ...)
+            trades (str | list): Spot Trade or Futures Trade
+            taker (bool | list): is Taker or is Maker
+            by_token (bool | list): Pay with exchange tokens (BNB, CET, ...)
+            default (float): Commission of trades not available on the exchange. Raise KeyError if None.
+
+        Returns (ndarray): Commissions.
+
+        """
+        exchange_index = self._index(self._exchange_index, exchanges, "exchange")
+        trade_index = self._index(self._trade_index, trades, "trade")
+        commissions = self.table[
+            exchange_index,
+            trade_index,
+            np.asarray(taker, dtype=int),
+            np.asarray(by_token, dtype=int),
+        ]
+        missing = np.isnan(commissions)
+        if missing.any():
+            if default is None:
+                ex = np.broadcast_to(np.asarray(exchanges, dtype=object), missing.shape)
+                trade = np.broadcast_to(np.asarray(trades, dtype=object), missing.shape)
+                log.error(f"{trade[missing][0]} is not available on {ex[missing][0]}.")
+                raise KeyError((ex[missing][0], trade[missing][0]))
+            commissions = np.where(missing, default, commissions)
+        return commissions
+
+    @staticmethod
+    def _index(index: dict, names, kind: str) -> ndarray:
+        try:
+            if isinstance(names, str):
+                return np.asarray(index[names])
+            return np.array([index[n] for n in names], dtype=int)
+        except KeyError as e:
+            log.error(f"{e.args[0]} is not an available {kind}.")
+            raise
+
+    @staticmethod
+    def _parse_fee(exchange: str, trade: str, fee) -> tuple:
+        if not isinstance(fee, dict):
+            return fee, fee, fee, fee
+        unknown = set(fee) - set(FEE_KEYS)
+        if unknown or "taker" not in fee or "maker" not in fee:
+            raise ValueError(
+                f"Invalid commission of {trade} on {exchange}: {fee}. "
+                f"Give a number or a dict with taker and maker (and optionally by_token) keys."
+            )
+        return (
+            fee["taker"],
+            fee["maker"],
+            fee.get("taker_by_token", fee["taker"]),
+            fee.get("maker_by_token", fee["maker"]),
+        )
@@ -0,0 +1,180 @@
+"""
+Order book depth and slippage of arbitrage legs
+"""
+
+import asyncio
+import logging
+import time
+
+import numpy as np
+
+from funding_rate_arbitrage.async_scan import concurrency_limit, gather_dicts
+from funding_rate_arbitrage.lazy import ccxt
+
+log = logging.getLogger("rich")
+
+# Number of price levels per order book
+ORDER_BOOK_LIMIT = 50
+
+
+def vwap_slippage(book: dict, side: str, notional: float, contract_size=1.0) -> float:
+    """
+    Get slippage of a market order from the mid price.
+
+    Args:
+        book (dict): ccxt order book.
+        side (str): "buy" walks the asks, "sell" walks the bids.
+        notional (float): Notional of the order [quote currency].
+        contract_size (float): Base currency per contract of book amounts.
+
+    Returns (float): VWAP slippage from mid price [%], NaN if the book is thinner than the notional.
+
+    """
+    bids, asks = book["bids"], book["asks"]
+    if not bids or not asks:
+        return np.nan
+    mid = (bids[0][0] + asks[0][0]) / 2
+    levels = np.array([level[:2] for level in (asks if side == "buy" else bids)])
+    price, amount = levels[:, 0], levels[:, 1] * contract_size
+    cost = np.cumsum(price * amount)
+    # first level where the order is filled
+    last = np.searchsorted(cost, notional)
+    if last == len(cost):
+        return np.nan
+    filled_cost = cost[last - 1] if last else 0.0
+    filled_amount = amount[:last].sum() + (notional - filled_cost) / price[last]
+    vwap = notional / filled_amount
+    return abs(vwap - mid) / mid * 100
+
+
+class DepthEstimator:
+    """
+    Estimates slippage of arbitrage legs from order books.
+    Books are fetched concurrently on the pool clients, batched per exchange (fetchOrderBooks
+    when the exchange supports it), and cached for ttl seconds.
+    """
+
+    def __init__(
+        self,
+        pool,
+        notional=1000.0,
+        top_k=20,
+        ttl=10.0,
+        limit=ORDER_BOOK_LIMIT,
+        clock=time.monotonic,
+    ):
+        """
+        Args:
+            pool (ExchangePool): Pool providing the async clients.
+            notional (float): Notional of every leg [USDT].
+            top_k (int): Number of candidates with the largest revenue to estimate.
+            ttl (float): Seconds before a cached order book is refetched.
+            limit (int): Number of price levels per order book.
+            clock (callable): Clock returning seconds.
+        """
+        self.pool = pool
+        self.notional = notional
+        self.top_k = top_k
+        self.ttl = ttl
+        self.limit = limit
+        self.clock = clock
+        # (exchange, symbol) -> (fetched_at, order book, contract size)
+        self._books = {}
+
+    def slippage(self, legs: list) -> np.ndarray:
+        """
+        Get slippage of market orders of self.notional.
+
+        Args:
+            legs (list): Legs (exchange, symbol, side), side is "buy" or "sell".
+
+        Returns (np.ndarray): VWAP slippage from mid price [%] of every leg, NaN if unknown.
+
+        """
+        return self.estimate(legs)[0]
+
+    def estimate(self, legs: list) -> tuple:
+        """
+        Get slippage of market orders of self.notional and whether their order books were fetched.
+
+        Args:
+            legs (list): Legs (exchange, symbol, side), side is "buy" or "sell".
+
+        Returns (tuple): VWAP slippage from mid price [%] of every leg (NaN if the book is thinner
+            than the notional or failed to fetch), and bool array of legs whose book was fetched.
+
+        """
+        books = self.fetch_order_books({(ex, symbol) for ex, symbol, _ in legs})
+        slippage = np.full(len(legs), np.nan)
+        fetched = np.zeros(len(legs), dtype=bool)
+        for i, (ex, symbol, side) in enumerate(legs):
+            if (ex, symbol) in books:
+                book, contract_size = books[(ex, symbol)]
+                slippage[i] = vwap_slippage(book, side, self.notional, contract_size)
+                fetched[i] = True
+        return slippage, fetched
+
+    def fetch_order_books(self, keys: set) -> dict:
+        """
+        Get order books, fetching the ones missing or older than ttl.
+
+        Args:
+            keys (set): (exchange, symbol) of order books.
+
+        Returns (dict): Dict of (exchange, symbol) and (order book, contract size).
+            Books failing to fetch are missing.
+
+        """
+        now = self.clock()
+        missing = {}
+        for ex, symbol in keys:
+            cached = self._books.get((ex, symbol))
+            if cached is None or now - cached[0] > self.ttl:
+                missing.setdefault(ex, []).append(symbol)
+        if missing:
+            fetched = self.pool.run(self._fetch_all(missing))
+            for key, (book, contract_size) in fetched.items():
+                self._books[key] = (now, book, contract_size)
+        return {
+            key: self._books[key][1:]
+            for key in keys
+            if key in self._books and now - self._books[key][0] <= self.ttl
+        }
+
+    async def _fetch_all(self, missing: dict) -> dict:
+        return await gather_dicts(
+            [self._fetch_exchange(ex, symbols) for ex, symbols in missing.items()]
+        )
+
+    async def _fetch_exchange(self, exchange: str, symbols: list) -> dict:
+        ex = self.pool.async_client(exchange)
+        try:
+            markets = await self.pool.load_markets_async(exchange)
+        except ccxt.BaseError as e:
+            log.error(
+                f"{exchange}: failed to load markets, order books skipped ({e!r})."
+            )
+            return {}
+        symbols = [s for s in symbols if s in markets]
+        books = {}
+        if ex.has.get("fetchOrderBooks"):
+            try:
+                books = await ex.fetch_order_books(symbols, self.limit)
+            except ccxt.BaseError:
+                log.warning(f"{exchange}: bulk order book request failed.")
+        semaphore = asyncio.Semaphore(concurrency_limit(ex))
+
+        async def one(symbol):
+            async with semaphore:
+                try:
+                    return {symbol: await ex.fetch_order_book(symbol, self.limit)}
+                except ccxt.BaseError:
+                    log.warning(f"{exchange}: failed to fetch {symbol} order book.")
+                    return {}
+
+        books.update(await gather_dicts([one(s) for s in symbols if s not in books]))
+        return {
+            (exchange, s): (book, markets[s].get("contractSize") or 1.0)
+            for s, book in books.items()
+            if s in markets
+        }
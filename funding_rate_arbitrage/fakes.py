@@ -0,0 +1,284 @@
+"""
+Fake CEX for offline tests and benchmarks of the fetch layer
+"""
+
+import asyncio
+import bisect
+import json
+import random
+import time
+from collections import Counter
+
+from ccxt import BadSymbol, RequestTimeout
+
+from funding_rate_arbitrage.settlement import DEFAULT_INTERVAL_MS
+
+
+class FakeExchange:
+    """
+    ccxt.async_support-like exchange serving linear perpetuals, funding rates and funding rate histories,
+    either synthetic or replayed from a fixture (see from_fixture and record_fixture).
+    Faults are injected per method, either as a script of errors raised by successive calls
+    or at random with failure_rate.
+    """
+
+    def __init__(
+        self,
+        id="fake",
+        num_symbols=100,
+        bulk=True,
+        latency=0.0,
+        faults=None,
+        failure_rate=0.0,
+        failure=RequestTimeout,
+        rate_limit=50,
+        seed=0,
+    ):
+        """
+        Args:
+            id (str): Exchange id.
+            num_symbols (int): Number of perpetual contracts.
+            bulk (bool): Support fetchFundingRates.
+            latency (float): Seconds every request takes.
+            faults (dict): Dict of method name and list of errors raised by its successive calls
+                (None for a successful call), e.g. {"fetch_funding_rates": [RequestTimeout("..."), None]}.
+            failure_rate (float): Probability of any request raising failure.
+            failure (type): Error class raised at failure_rate.
+            rate_limit (float): ccxt rateLimit [ms].
+            seed (int): Random seed of rates and failures.
+        """
+        self.id = id
+        self.has = {"fetchFundingRates": bulk}
+        self.rateLimit = rate_limit
+        self.latency = latency
+        self.faults = {
+            method: list(errors) for method, errors in (faults or {}).items()
+        }
+        self.failure_rate = failure_rate
+        self.failure = failure
+        self.calls = Counter()
+        self._random = random.Random(seed)
+        self.markets = {
+            f"S{i}/USDT:USDT": {
+                "id": f"S{i}USDT",
+                "symbol": f"S{i}/USDT:USDT",
+                "base": f"S{i}",
+                "quote": "USDT",
+                "settle": "USDT",
+                "linear": True,
+                "swap": True,
+                "contractSize": 1.0,
+            }
+            for i in range(num_symbols)
+        }
+        self.currencies = {}
+        self.funding_rates = {
+            s: {
+                "symbol": s,
+                "fundingRate": self._random.gauss(0.0001, 0.0003),
+                "timestamp": None,
+                "fundingTimestamp": None,
+                "nextFundingTimestamp": None,
+                "interval": "8h",
+            }
+            for s in self.markets
+        }
+        # symbol -> ccxt funding rate history structures sorted by timestamp
+        self.histories = {}
+        self.history_limit = 200
+
+    @classmethod
+    def from_fixture(cls, fixture, **kwargs):
+        """
+        Build an exchange replaying the responses of a fixture.
+
+        Args:
+            fixture (dict | str): Fixture (see record_fixture) or path of a fixture JSON file.
+            kwargs: Arguments of the constructor (latency, faults, rate_limit, ...).
+                rate_limit defaults to the recorded rateLimit.
+
+        Returns (FakeExchange): Exchange object.
+
+        """
+        if isinstance(fixture, str):
+            with open(fixture) as f:
+                fixture = json.load(f)
+        kwargs.setdefault("rate_limit", fixture.get("rateLimit", 50))
+        ex = cls(id=fixture["id"], num_symbols=0, bulk=fixture["bulk"], **kwargs)
+        ex.markets = fixture["markets"]
+        ex.funding_rates = fixture["funding_rates"]
+        ex.histories = fixture.get("histories", {})
+        ex.history_limit = fixture.get("history_limit", ex.history_limit)
+        return ex
+
+    async def load_markets(self, reload=False, params={}):
+        await self._request("load_markets")
+        return self.markets
+
+    def set_markets(self, markets, currencies=None):
+        self.markets = dict(markets)
+        self.currencies = currencies or {}
+        return self.markets
+
+    async def fetch_funding_rate(self, symbol: str, params={}) -> dict:
+        await self._request("fetch_funding_rate")
+        return self._funding_rate(symbol)
+
+    async def fetch_funding_rates(self, symbols=None, params={}) -> dict:
+        await self._request("fetch_funding_rates")
+        return {s: self._funding_rate(s) for s in symbols or self.funding_rates}
+
+    async def fetch_funding_rate_history(
+        self, symbol=None, since=None, limit=None, params={}
+    ) -> list:
+        await self._request("fetch_funding_rate_history")
+        return self._history_page(symbol, since, limit)
+
+    async def close(self):
+        pass
+
+    async def _request(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self._raise_fault(method)
+
+    def _raise_fault(self, method: str) -> None:
+        script = self.faults.get(method)
+        error = script.pop(0) if script else None
+        if error is None and self._random.random() < self.failure_rate:
+            error = self.failure(f"{self.id} {method}: injected failure")
+        if error is not None:
+            raise error
+
+    def _funding_rate(self, symbol: str) -> dict:
+        if symbol not in self.funding_rates:
+            raise BadSymbol(f"{self.id} does not have market symbol {symbol}")
+        return dict(self.funding_rates[symbol])
+
+    def _history_page(self, symbol: str, since, limit) -> list:
+        # latest page without since, like most exchanges
+        if symbol not in self.markets:
+            raise BadSymbol(f"{self.id} does not have market symbol {symbol}")
+        records = self.histories.get(symbol, [])
+        limit = limit or self.history_limit
+        if since is None:
+            return records[-limit:]
+        start = bisect.bisect_left([r["timestamp"] for r in records], since)
+        return records[start : start + limit]
+
+
+class SyncFakeExchange(FakeExchange):
+    """
+    ccxt-like (sync) version of FakeExchange, for the single-exchange and history entry points.
+    """
+
+    def load_markets(self, reload=False, params={}):
+        self._request("load_markets")
+        return self.markets
+
+    def fetch_funding_rate(self, symbol: str, params={}) -> dict:
+        self._request("fetch_funding_rate")
+        return self._funding_rate(symbol)
+
+    def fetch_funding_rates(self, symbols=None, params={}) -> dict:
+        self._request("fetch_funding_rates")
+        return {s: self._funding_rate(s) for s in symbols or self.funding_rates}
+
+    def fetch_funding_rate_history(
+        self, symbol=None, since=None, limit=None, params={}
+    ) -> list:
+        self._request("fetch_funding_rate_history")
+        return self._history_page(symbol, since, limit)
+
+    def close(self):
+        pass
+
+    def _request(self, method: str) -> None:
+        self.calls[method] += 1
+        if self.latency:
+            time.sleep(self.latency)
+        self._raise_fault(method)
+
+
+def record_fixture(ex, path=None, symbols=None, history_symbols=(), history_limit=None):
+    """
+    Record markets, funding rates and funding rate histories of a live (sync) exchange as a fixture.
+
+    Args:
+        ex (ccxt.Exchange): Exchange object.
+        path (str): Path of the fixture JSON file. Not written if None.
+        symbols (list): Symbols of funding rates. All linear perpetuals if None.
+        history_symbols (list): Symbols whose latest funding rate history page is recorded.
+        history_limit (int): Number of records per history request. The exchange default if None.
+
+    Returns (dict): Fixture.
+
+    """
+    markets = ex.load_markets()
+    if symbols is None:
+        symbols = [s for s in markets if markets[s].get("linear")]
+    bulk = bool(ex.has.get("fetchFundingRates"))
+    if bulk:
+        funding_rates = ex.fetch_funding_rates(symbols)
+    else:
+        funding_rates = {s: ex.fetch_funding_rate(s) for s in symbols}
+    histories = {
+        s: ex.fetch_funding_rate_history(symbol=s, limit=history_limit)
+        for s in history_symbols
+    }
+    fixture = {
+        "id": ex.id,
+        "bulk": bulk,
+        "rateLimit": ex.rateLimit,
+        "markets": {s: markets[s] for s in symbols},
+        "funding_rates": {s: funding_rates[s] for s in symbols if s in funding_rates},
+        "histories": histories,
+    }
+    if history_limit is not None:
+        fixture["history_limit"] = history_limit
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump(fixture, f, default=str)
+    return fixture
+
+
+def synthetic_fixture(
+    id="binance", num_symbols=100, num_settlements=0, bulk=True, rate_limit=50, seed=0
+) -> dict:
+    """
+    Generate a fixture in the format of record_fixture with 8-hourly funding rate histories.
+
+    Args:
+        id (str): Exchange id.
+        num_symbols (int): Number of perpetual contracts.
+        num_settlements (int): Number of funding rate history records per symbol.
+        bulk (bool): Support fetchFundingRates.
+        rate_limit (float): ccxt rateLimit [ms].
+        seed (int): Random seed.
+
+    Returns (dict): Fixture.
+
+    """
+    ex = FakeExchange(id=id, num_symbols=num_symbols, bulk=bulk, seed=seed)
+    rng = random.Random(seed)
+    start = 1_672_531_200_000
+    histories = {
+        s: [
+            {
+                "symbol": s,
+                "fundingRate": rng.gauss(0.0001, 0.0003),
+                "timestamp": start + i * DEFAULT_INTERVAL_MS,
+            }
+            for i in range(num_settlements)
+        ]
+        for s in ex.markets
+    }
+    return {
+        "id": id,
+        "bulk": bulk,
+        "rateLimit": rate_limit,
+        "markets": ex.markets,
+        "funding_rates": ex.funding_rates,
+        "histories": histories if num_settlements else {},
+    }
@@ -1,60 +1,298 @@
 """
 Main class of funding-rate-arbitrage
 """
+
+from __future__ import annotations
+
+import functools
 import logging
-from datetime import datetime
+import time
+import types
 
-import ccxt
-import matplotlib.pyplot as plt
 import numpy as np
-import pandas as pd
-from ccxt import ExchangeError
 from numpy import ndarray
-from rich import print
-from rich.logging import RichHandler
-
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(message)s",
-    datefmt="[%X]",
-    handlers=[RichHandler(rich_tracebacks=True)],
+
+from funding_rate_arbitrage import async_scan
+from funding_rate_arbitrage.analytics import batch_analytics
+from funding_rate_arbitrage.backtest import Backtester
+from funding_rate_arbitrage.charts import ChartRenderer
+from funding_rate_arbitrage.commission import CommissionSchedule
+from funding_rate_arbitrage.history import FundingRateHistory, to_milliseconds
+from funding_rate_arbitrage.instruments import InstrumentIndex
+from funding_rate_arbitrage.lazy import ccxt, pd
+from funding_rate_arbitrage.metrics import Instrumentation, MetricsReport
+from funding_rate_arbitrage.pool import ExchangePool
+from funding_rate_arbitrage.ranking import (
+    multi_exchange_lines,
+    multi_exchange_opportunities,
+    single_exchange_lines,
+    single_exchange_opportunities,
+    top_rows,
 )
+from funding_rate_arbitrage.resilience import CircuitOpen, ResilientFetcher
+from funding_rate_arbitrage.settlement import (
+    HOUR_MS,
+    next_settlement,
+    normalize_rates,
+    settlement_from_ccxt,
+)
+from funding_rate_arbitrage.stats import rolling_statistics
+
 log = logging.getLogger("rich")
 
 
+def setup_logging(level=logging.INFO) -> None:
+    """
+    Log to the console with rich. Logging is not configured on import, call this from scripts.
+
+    Args:
+        level (int): Logging level.
+
+    Returns: None
+
+    """
+    from rich.logging import RichHandler
+
+    logging.basicConfig(
+        level=level,
+        format="%(message)s",
+        datefmt="[%X]",
+        handlers=[RichHandler(rich_tracebacks=True)],
+    )
+
+
+DIVERGENCE_COLUMNS = [
+    "Divergence [%]",
+    "Commission [%]",
+    "Revenue [/100 USDT]",
+    "Time to Settlement [h]",
+]
+
+
+# commission schedule of class-level calls (FundingRateArbitrage.get_commission(...))
+DEFAULT_COMMISSION_SCHEDULE = CommissionSchedule.default()
+
+
+class hybridmethod:
+    """
+    Method called on an instance, or on the class like the former static methods.
+    Called on the class, it runs on a transient instance (default settings, closed after the call).
+    """
+
+    def __init__(self, func):
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __get__(self, obj, cls=None):
+        if obj is not None:
+            return types.MethodType(self.func, obj)
+
+        @functools.wraps(self.func)
+        def transient(*args, **kwargs):
+            with cls(commission_schedule=DEFAULT_COMMISSION_SCHEDULE) as fr:
+                return self.func(fr, *args, **kwargs)
+
+        return transient
+
+
 class FundingRateArbitrage:
-    def __init__(self):
+    def __init__(self, market_ttl=3600, commission_schedule=None, history_store=None):
+        """
+        Args:
+            market_ttl (float): Seconds before cached markets of an exchange are reloaded.
+            commission_schedule (CommissionSchedule): Commission schedule. Default schedule if None.
+            history_store (FundingRateHistoryStore): Local store serving funding rate history.
+        """
         self.exchanges = ["binance", "bybit", "okx", "bitget", "gate", "coinex"]
         # commission
         self.is_taker = True
         self.by_token = False
+        self.commission_schedule = commission_schedule or CommissionSchedule.default()
+        # stage wall time, requests, bytes and retries, disabled until self.metrics.enable()
+        self.metrics = Instrumentation()
+        # long-lived exchange clients
+        self.pool = ExchangePool(
+            market_ttl=market_ttl, on_client=self.metrics.instrument
+        )
+        # rate limiting, retries and circuit breaking of funding rate requests
+        self.fetcher = ResilientFetcher(on_retry=self.metrics.count_retry)
+        # funding rate history
+        self.history_store = history_store
+        # join multi CEX on canonical instruments (1000PEPE/USDT:USDT -> PEPE/USDT:USDT, ...)
+        self.normalize_symbols = False
+        self.merge_stablecoins = False
+        self.instrument_index = None
+        self._instrument_index_key = None
+        # latest funding rates fed by a FundingRateStream, read instead of REST when set
+        self.rate_table = None
+        # compare funding rates accrued over this horizon [h] instead of per settlement
+        self.funding_horizon = None
+        # DepthEstimator folding order book slippage of the top candidates into revenue
+        self.depth = None
+        # SnapshotCache sharing funding rates between processes, read with max_age
+        self.snapshot_cache = None
 
-    @staticmethod
-    def fetch_all_funding_rate(exchange: str) -> dict:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close exchange clients and release their HTTP sessions.
+
+        Returns: None
+
+        """
+        self.pool.close()
+
+    @hybridmethod
+    def fetch_all_funding_rate(
+        self, exchange, bulk=True, chunk_size=100, details=False, max_age=None
+    ) -> dict:
         """
         Fetch funding rates on all perpetual contracts listed on the exchange.
+        Called on the class, a transient client is created and closed after the call.
+        With self.snapshot_cache, fetched funding rates are written as a snapshot, and a snapshot
+        younger than max_age is read instead of requesting the exchange.
 
         Args:
-            exchange (str): Name of exchange (binance, bybit, ...)
+            exchange (str | ccxt.Exchange): Name of exchange (binance, bybit, ...) or an exchange object.
+            bulk (bool): Use the bulk endpoint (fetchFundingRates) when the exchange supports it.
+            chunk_size (int): Number of symbols per bulk request when the exchange requires symbols.
+            details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+            max_age (float): Maximum age [s] of a cached snapshot. Always fetch if None.
 
         Returns (dict): Dict of perpetual contract pair and funding rate.
 
         """
-        ex = getattr(ccxt, exchange)()
-        info = ex.load_markets()
+        if isinstance(exchange, str) and self._streamed(exchange):
+            return self.rate_table.get(exchange, details=details)
+        if isinstance(exchange, str):
+            snapshot = self._cached_snapshot(exchange, max_age)
+            if snapshot is not None:
+                return snapshot.to_dict(details=details)
+        ex = self.pool.get(exchange) if isinstance(exchange, str) else exchange
+        self.fetcher.begin([ex.id])
+        with self.metrics.stage("markets", ex.id):
+            if isinstance(exchange, str):
+                info = self.pool.load_markets(exchange, fetcher=self.fetcher)
+            else:
+                info = self.fetcher.call_sync(ex, "load_markets")
         perp = [p for p in info if info[p]["linear"]]
+        with self.metrics.stage("fetch", ex.id):
+            fr_d = FundingRateArbitrage.fetch_funding_rates(
+                ex, perp, bulk=bulk, chunk_size=chunk_size, fetcher=self.fetcher
+            )
+        # a snapshot of the symbols fetched before the circuit opened would hide the others
+        if self.snapshot_cache is not None and not self.fetcher.report[ex.id].dropped:
+            self.snapshot_cache.write(
+                ex.id, {p: settlement_from_ccxt(fr) for p, fr in fr_d.items()}
+            )
+        if details:
+            return {p: settlement_from_ccxt(fr) for p, fr in fr_d.items()}
+        return {p: fr["fundingRate"] for p, fr in fr_d.items()}
+
+    @staticmethod
+    def fetch_funding_rates(
+        ex, symbols: list, bulk=True, chunk_size=100, fetcher=None
+    ) -> dict:
+        """
+        Fetch funding rate structures of the given symbols with as few requests as possible.
+        The bulk endpoint is called once without symbols, or in chunks of symbols when the
+        exchange requires them. Exchanges without a bulk endpoint are fetched symbol by symbol.
+
+        Args:
+            ex (ccxt.Exchange): Exchange object with markets loaded.
+            symbols (list): Symbols (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            bulk (bool): Use the bulk endpoint (fetchFundingRates) when the exchange supports it.
+            chunk_size (int): Number of symbols per bulk request when the exchange requires symbols.
+            fetcher (ResilientFetcher): Sends requests with rate limiting and retries.
+                Symbols failing on network errors are then skipped and reported, and when the
+                exchange circuit opens, the symbols fetched so far are returned.
+
+        Returns (dict): Dict of symbol and ccxt funding rate structure.
+
+        """
+        if not (bulk and ex.has.get("fetchFundingRates")):
+            return FundingRateArbitrage._fetch_funding_rates_one_by_one(
+                ex, symbols, fetcher
+            )
+
+        try:
+            rates = FundingRateArbitrage._request(ex, fetcher, "fetch_funding_rates")
+        except ccxt.ExchangeError as e:
+            # symbols are required, or the request was rejected (BadRequest, ...)
+            if not isinstance(e, ccxt.ArgumentsRequired):
+                log.warning(
+                    f"{ex.id}: bulk request failed ({e!r}), fetching in chunks."
+                )
+            rates = {}
+            swaps = [s for s in symbols if ex.markets[s].get("swap", True)]
+            for i in range(0, len(swaps), chunk_size):
+                chunk = swaps[i : i + chunk_size]
+                try:
+                    rates.update(
+                        FundingRateArbitrage._request(
+                            ex, fetcher, "fetch_funding_rates", chunk
+                        )
+                    )
+                except CircuitOpen as e:
+                    FundingRateArbitrage._circuit_opened(ex, fetcher, e)
+                    break
+                except (ccxt.ExchangeError, ccxt.NetworkError) as e:
+                    if isinstance(e, ccxt.NetworkError) and fetcher is None:
+                        raise
+                    log.warning(f"{ex.id}: bulk request failed, fetching one by one.")
+                    rates.update(
+                        FundingRateArbitrage._fetch_funding_rates_one_by_one(
+                            ex, chunk, fetcher
+                        )
+                    )
+        return {s: rates[s] for s in symbols if s in rates}
+
+    @staticmethod
+    def _fetch_funding_rates_one_by_one(ex, symbols: list, fetcher=None) -> dict:
         fr_d = {}
-        for p in perp:
+        for p in symbols:
             try:
-                fr_d[p] = ex.fetch_funding_rate(p)["fundingRate"]
-            except ExchangeError:
+                fr_d[p] = FundingRateArbitrage._request(
+                    ex, fetcher, "fetch_funding_rate", p
+                )
+            except ccxt.ExchangeError as e:
                 log.exception(f"{p} is not perp.")
+                if fetcher is not None:
+                    fetcher.symbol_failed(ex.id, p, e)
+            except ccxt.NetworkError as e:
+                if fetcher is None:
+                    raise
+                log.error(f"{ex.id}: failed to fetch {p} ({e!r}).")
+                fetcher.symbol_failed(ex.id, p, e)
+            except CircuitOpen as e:
+                FundingRateArbitrage._circuit_opened(ex, fetcher, e)
+                break
         return fr_d
 
     @staticmethod
-    def fetch_funding_rate_history(exchange: str, symbol: str) -> tuple:
+    def _circuit_opened(ex, fetcher, error: CircuitOpen) -> None:
+        if not fetcher.report[ex.id].dropped:
+            log.error(
+                f"{ex.id}: dropped from the scan ({error!r}), keeping partial results."
+            )
+            fetcher.exchange_failed(ex.id, error)
+
+    @staticmethod
+    def _request(ex, fetcher, method: str, *args):
+        if fetcher is None:
+            return getattr(ex, method)(*args)
+        return fetcher.call_sync(ex, method, *args)
+
+    @hybridmethod
+    def fetch_funding_rate_history(self, exchange: str, symbol: str) -> tuple:
         """
         Fetch funding rates on perpetual contracts listed on the exchange.
+        Called on the class, a transient client is created and closed after the call.
 
         Args:
             exchange (str): Name of exchange (binance, bybit, ...)
@@ -63,13 +301,115 @@ class FundingRateArbitrage:
         Returns (tuple): settlement time, funding rate.
 
         """
-        ex = getattr(ccxt, exchange)()
-        funding_history_dict = ex.fetch_funding_rate_history(symbol=symbol)
-        funding_time = [
-            datetime.fromtimestamp(d["timestamp"] * 0.001) for d in funding_history_dict
-        ]
-        funding_rate = [d["fundingRate"] * 100 for d in funding_history_dict]
-        return funding_time, funding_rate
+        return self.fetch_funding_rate_history_columns(
+            exchange=exchange, symbol=symbol
+        ).to_tuple()
+
+    def fetch_funding_rate_history_columns(
+        self, exchange: str, symbol: str
+    ) -> FundingRateHistory:
+        """
+        Fetch funding rates on perpetual contracts listed on the exchange as typed columns.
+        With a history store, the stored history is read from disk and the exchange is
+        only requested when nothing is stored yet (see sync_funding_rate_history).
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+
+        Returns (FundingRateHistory): settlement time [ms] and funding rate arrays.
+
+        """
+        if self.history_store is not None:
+            if self.history_store.last_timestamp(exchange, symbol) is None:
+                self.sync_funding_rate_history(exchange=exchange, symbol=symbol)
+            return self.history_store.read_history(exchange, symbol)
+        ex = self.pool.get(exchange)
+        self.pool.load_markets(exchange)
+        return FundingRateHistory.from_records(
+            exchange, symbol, ex.fetch_funding_rate_history(symbol=symbol)
+        )
+
+    def load_funding_rate_histories(
+        self, keys=None, since=None, until=None
+    ) -> pd.DataFrame:
+        """
+        Load stored funding rate histories of many (exchange, symbol) pairs into one DataFrame.
+
+        Args:
+            keys (list): List of (exchange, symbol). All stored pairs if None.
+            since (datetime | int): Earliest settlement time [ms] (inclusive).
+            until (datetime | int): Latest settlement time [ms] (exclusive).
+
+        Returns (pd.DataFrame): timestamp [ms] and funding_rate columns indexed by (exchange, symbol).
+
+        """
+        if self.history_store is None:
+            log.error("history_store is not set.")
+            raise ValueError("history_store is not set.")
+        return self.history_store.load_histories(
+            keys=keys,
+            since=None if since is None else to_milliseconds(since),
+            until=None if until is None else to_milliseconds(until),
+        )
+
+    def sync_funding_rate_history(
+        self, exchange: str, symbol: str, since=None, limit=None
+    ) -> int:
+        """
+        Fetch funding rates newer than the latest stored record into the history store.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (int): Settlement time [ms] to start from when nothing is stored yet.
+            limit (int): Number of records per request. The exchange default if None.
+
+        Returns (int): Number of new records.
+
+        """
+        if self.history_store is None:
+            log.error("history_store is not set.")
+            raise ValueError("history_store is not set.")
+        ex = self.pool.get(exchange)
+        self.pool.load_markets(exchange)
+        return self.history_store.sync(
+            ex, exchange=exchange, symbol=symbol, since=since, limit=limit
+        )
+
+    def backfill_funding_rate_history(
+        self, exchange: str, symbols: list, since, until=None, limit=None, workers=4
+    ):
+        """
+        Fetch the full funding rate history of symbols in a date range into the history store.
+        Symbols run in parallel under the request budget of the exchange, and an interrupted
+        backfill resumes when called again with the same `since`.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbols (list): Symbols (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (datetime | int): Start of the range [ms] (inclusive).
+            until (datetime | int): End of the range [ms] (exclusive). Now if None.
+            limit (int): Number of records per request. The exchange default if None.
+            workers (int): Number of symbols fetched in parallel.
+
+        Returns (BackfillResult): Number of records per symbol, failed symbols and throughput.
+
+        """
+        if self.history_store is None:
+            log.error("history_store is not set.")
+            raise ValueError("history_store is not set.")
+        ex = self.pool.get(exchange)
+        self.pool.load_markets(exchange)
+        return self.history_store.backfill(
+            ex,
+            exchange=exchange,
+            symbols=symbols,
+            since=since,
+            until=until,
+            limit=limit,
+            workers=workers,
+        )
 
     def figure_funding_rate_history(self, exchange: str, symbol: str) -> None:
         """
@@ -82,14 +422,18 @@ class FundingRateArbitrage:
         Returns: None
 
         """
-        funding_time, funding_rate = self.fetch_funding_rate_history(
+        history = self.fetch_funding_rate_history_columns(
             exchange=exchange, symbol=symbol
         )
+        import matplotlib.pyplot as plt
+
+        funding_time = history.datetimes
+        funding_rate = history.rates * 100
         plt.plot(funding_time, funding_rate, label="funding rate")
         plt.hlines(
             xmin=funding_time[0],
             xmax=funding_time[-1],
-            y=sum(funding_rate) / len(funding_rate),
+            y=funding_rate.mean(),
             label="average",
             colors="r",
             linestyles="-.",
@@ -103,6 +447,47 @@ class FundingRateArbitrage:
         plt.tight_layout()
         plt.show()
 
+    def render_funding_rate_histories(
+        self, directory: str, keys=None, fmt="png", max_points=2000, force=False
+    ) -> dict:
+        """
+        Render funding rate history charts of many (exchange, symbol) pairs to files without a display.
+        Charts whose history has no new settlement since they were rendered are skipped; with a history
+        store, their history is not even read (see ChartRenderer).
+
+        Args:
+            directory (str): Directory of chart files.
+            keys (list): List of (exchange, symbol). All stored pairs if None.
+            fmt (str): png or svg.
+            max_points (int): Number of points drawn per chart (LTTB downsampling above).
+            force (bool): Render even if cached.
+
+        Returns (dict): Dict of (exchange, symbol) and path of the rendered charts.
+
+        """
+        if keys is None:
+            if self.history_store is None:
+                log.error("keys are required without history_store.")
+                raise ValueError("keys")
+            keys = self.history_store.keys()
+        renderer = ChartRenderer(directory, fmt=fmt, max_points=max_points)
+
+        def histories():
+            for exchange, symbol in keys:
+                if (
+                    not force
+                    and self.history_store is not None
+                    and renderer.cached(
+                        exchange,
+                        symbol,
+                        self.history_store.last_timestamp(exchange, symbol),
+                    )
+                ):
+                    continue
+                yield self.fetch_funding_rate_history_columns(exchange, symbol)
+
+        return renderer.render_many(histories(), force=force)
+
     def get_funding_rate_volatility(self, exchange: str, symbol: str) -> ndarray:
         """
         Get funding rate standard deviation volatility on all perpetual contracts listed on the exchange.
@@ -114,10 +499,92 @@ class FundingRateArbitrage:
         Returns: Funding rate standard deviation volatility.
 
         """
-        _, funding_rate = self.fetch_funding_rate_history(
+        history = self.fetch_funding_rate_history_columns(
             exchange=exchange, symbol=symbol
         )
-        return np.std(funding_rate)
+        return np.std(history.rates * 100)
+
+    def backtest(
+        self, keys=None, since=None, until=None, horizon=8.0, resolution=HOUR_MS
+    ) -> Backtester:
+        """
+        Get a backtester of funding rate carry strategies over stored funding rate histories.
+        Commissions follow self.commission_schedule, self.is_taker and self.by_token.
+
+        Args:
+            keys (list): List of (exchange, symbol). All stored pairs if None.
+            since (datetime | int): Earliest settlement time [ms] (inclusive).
+            until (datetime | int): Latest settlement time [ms] (exclusive).
+            horizon (float): Horizon [h] rates are scaled to before comparing with thresholds.
+            resolution (int): Step of the settlement time grid [ms].
+
+        Returns (Backtester): Backtester (carry, cross, sweep).
+
+        """
+        return Backtester(
+            self.load_funding_rate_histories(keys=keys, since=since, until=until),
+            commission_schedule=self.commission_schedule,
+            taker=self.is_taker,
+            by_token=self.by_token,
+            horizon=horizon,
+            resolution=resolution,
+        )
+
+    def get_funding_rate_analytics(
+        self,
+        keys=None,
+        since=None,
+        until=None,
+        workers=None,
+        max_lag=24,
+        regime_window=9,
+        regime_band=0.5,
+    ) -> pd.DataFrame:
+        """
+        Get volatility, autocorrelation and regimes of stored histories, computed over a process pool.
+        See analytics.batch_analytics for the columns.
+
+        Args:
+            keys (list): List of (exchange, symbol). All stored pairs if None.
+            since (datetime | int): Earliest settlement time [ms] (inclusive).
+            until (datetime | int): Latest settlement time [ms] (exclusive).
+            workers (int): Number of processes. os.cpu_count() if None.
+            max_lag (int): Largest lag of decorrelation_lag.
+            regime_window (int): Number of settlements of the rolling mean deciding regimes.
+            regime_band (float): Half width of the undecided band, in volatility.
+
+        Returns (pd.DataFrame): Analytics indexed by (exchange, symbol).
+
+        """
+        return batch_analytics(
+            self.load_funding_rate_histories(keys=keys, since=since, until=until),
+            workers=workers,
+            max_lag=max_lag,
+            regime_window=regime_window,
+            regime_band=regime_band,
+        )
+
+    def get_funding_rate_statistics(
+        self, keys=None, window=90, min_periods=2
+    ) -> pd.DataFrame:
+        """
+        Get rolling funding rate statistics at the latest settlement of stored histories.
+        All pairs are computed at once, see stats.rolling_statistics for the columns.
+
+        Args:
+            keys (list): List of (exchange, symbol). All stored pairs if None.
+            window (int): Number of settlements in a window.
+            min_periods (int): Minimum number of settlements to compute statistics (NaN below).
+
+        Returns (pd.DataFrame): Statistics indexed by (exchange, symbol).
+
+        """
+        stats = rolling_statistics(
+            self.load_funding_rate_histories(keys=keys),
+            window=window,
+            min_periods=min_periods,
+        )
+        return stats.groupby(level=[0, 1], sort=False, observed=True).tail(1)
 
     def display_large_divergence_single_exchange(
         self, exchange: str, minus=False, display_num=10
@@ -132,13 +599,11 @@ class FundingRateArbitrage:
         Returns (pd.DataFrame): DataFrame sorted by large funding rate divergence.
 
         """
-        return (
-            self.get_large_divergence_dataframe_single_exchange(
-                exchange=exchange, minus=minus
-            )
-            .sort_values(by="Funding Rate [%]", ascending=minus)
-            .head(display_num)
+        df = self.get_large_divergence_dataframe_single_exchange(
+            exchange=exchange, minus=minus
         )
+        with self.metrics.stage("sort"):
+            return top_rows(df, "Funding Rate [%]", display_num, ascending=minus)
 
     def display_large_divergence_multi_exchange(
         self, display_num=10, sorted_by="revenue"
@@ -161,152 +626,431 @@ class FundingRateArbitrage:
             log.error(f"{sorted_by} is not available.")
             raise KeyError
 
-        return (
-            self.get_large_divergence_dataframe_multi_exchanges()
-            .sort_values(by=sorted_by, ascending=False)
-            .head(display_num)
-        )
+        df = self.get_large_divergence_dataframe_multi_exchanges()
+        with self.metrics.stage("sort"):
+            return top_rows(df, sorted_by, display_num)
 
     def get_large_divergence_dataframe_single_exchange(
-        self, exchange: str, minus=False
+        self, exchange: str, minus=False, max_age=None
     ):
         """
         Get large funding rate divergence on single CEX.
         Args:
             exchange (str): Name of exchange (binance, bybit, ...)
             minus (bool): Sorted by minus FR or plus FR.
+            max_age (float): Maximum age [s] of a snapshot read from self.snapshot_cache. Always fetch if None.
 
         Returns (pd.DataFrame): large funding rate divergence DataFrame.
 
         """
-        fr = self.fetch_all_funding_rate(exchange=exchange)
+        fr = self.fetch_all_funding_rate(exchange=exchange, max_age=max_age)
         columns = ["Funding Rate [%]", "Commission [%]", "Revenue [/100 USDT]"]
         sr_fr = pd.Series(list(fr.values())) * 100
         # TODO: Check perp or spot or options exists on CEX.
-        if minus:
-            cm = (
-                self.get_commission(
-                    exchange=exchange,
-                    trade="futures",
-                    taker=self.is_taker,
-                    by_token=self.by_token,
+        with self.metrics.stage("commission", exchange):
+            if minus:
+                cm = (
+                    self.get_commission(
+                        exchange=exchange,
+                        trade="futures",
+                        taker=self.is_taker,
+                        by_token=self.by_token,
+                    )
+                    + self.get_commission(
+                        exchange=exchange,
+                        trade="options",
+                        taker=self.is_taker,
+                        by_token=self.by_token,
+                    )
+                    + self.get_commission(
+                        exchange=exchange,
+                        trade="spot",
+                        taker=self.is_taker,
+                        by_token=self.by_token,
+                    )
                 )
-                + self.get_commission(
+                sr_cm = pd.Series([cm * 2 for i in range(len(sr_fr))])
+                sr_rv = abs(sr_fr) - sr_cm
+            else:
+                cm = self.get_commission(
                     exchange=exchange,
-                    trade="options",
+                    trade="futures",
                     taker=self.is_taker,
                     by_token=self.by_token,
-                )
-                + self.get_commission(
+                ) + self.get_commission(
                     exchange=exchange,
                     trade="spot",
                     taker=self.is_taker,
                     by_token=self.by_token,
                 )
-            )
-            sr_cm = pd.Series([cm * 2 for i in range(len(sr_fr))])
-            sr_rv = abs(sr_fr) - sr_cm
-        else:
-            cm = self.get_commission(
-                exchange=exchange,
-                trade="futures",
-                taker=self.is_taker,
-                by_token=self.by_token,
-            ) + self.get_commission(
-                exchange=exchange,
-                trade="spot",
-                taker=self.is_taker,
-                by_token=self.by_token,
-            )
-            sr_cm = pd.Series([cm * 2 for i in range(len(sr_fr))])
-            sr_rv = sr_fr - sr_cm
+                sr_cm = pd.Series([cm * 2 for i in range(len(sr_fr))])
+                sr_rv = sr_fr - sr_cm
 
-        df = pd.concat([sr_fr, sr_cm, sr_rv], axis=1)
-        df.index = list(fr.keys())
-        df.columns = columns
+        with self.metrics.stage("build", exchange):
+            df = pd.concat([sr_fr, sr_cm, sr_rv], axis=1)
+            df.index = list(fr.keys())
+            df.columns = columns
+        if self.depth is not None:
+
+            def legs(symbol):
+                if minus:
+                    # options leg is not estimated
+                    return [(exchange, symbol, "buy")]
+                return [
+                    (exchange, symbol, "sell"),
+                    (exchange, symbol.split(":")[0], "buy"),
+                ]
+
+            with self.metrics.stage("depth", exchange):
+                df = self._fold_slippage(df, legs)
         return df
 
-    def get_large_divergence_dataframe_multi_exchanges(self):
+    def fetch_all_funding_rate_multi_exchanges(
+        self, details=False, max_age=None
+    ) -> dict:
         """
-        Get large funding rate divergence between multi CEX.
+        Fetch funding rates on all perpetual contracts listed on multi CEX concurrently.
         "multi CEX" refers to self.exchanges.
-        Returns (pd.DataFrame): large funding rate divergence DataFrame.
+        Exchanges are fetched at the same time, so the scan takes as long as the slowest exchange.
+        Exchanges fed by self.rate_table are read from the table without network calls, and so are
+        exchanges with a snapshot younger than max_age in self.snapshot_cache.
+        An exchange failing (network errors after retries, open circuit, ...) is dropped from the
+        result and the others are kept, see get_scan_report.
+        Args:
+            details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+            max_age (float): Maximum age [s] of cached snapshots. Always fetch if None.
+
+        Returns (dict): Dict of exchange name and dict of perpetual contract pair and funding rate.
 
         """
-        df = pd.DataFrame()
+        streamed = [ex for ex in self.exchanges if self._streamed(ex)]
+        snapshots = {}
         for ex in self.exchanges:
-            log.info(f"fetching {ex}")
-            fr = self.fetch_all_funding_rate(exchange=ex)
-            df_ex = pd.DataFrame(fr.values(), index=list(fr.keys()), columns=[ex]).T
-            df = pd.concat([df, df_ex])
-        df = df.T * 100
-
-        diff_d = {}
-        for i, data in df.iterrows():
-            diff = data.max() - data.min()
-            diff_d[i] = diff
-
-        df_diff = pd.DataFrame(
-            diff_d.values(), index=list(diff_d.keys()), columns=["Divergence [%]"]
-        ).T
-        df = pd.concat([df.T, df_diff]).T
-
-        comm_list = []
-        for i in df.index:
-            max_fr_exchange = df.loc[i][:-1].idxmax()
-            min_fr_exchange = df.loc[i][:-1].idxmin()
-            max_fr = df.loc[i][:-1].max()
-            min_fr = df.loc[i][:-1].min()
-            # TODO: Check perp or spot or options exists on CEX.
-            if max_fr >= 0 and min_fr >= 0:
-                min_commission = self.get_commission(
-                    exchange=min_fr_exchange, trade="spot"
-                )
-                max_commission = self.get_commission(
-                    exchange=max_fr_exchange, trade="futures"
-                )
-            elif max_fr >= 0 > min_fr:
-                max_commission = self.get_commission(
-                    exchange=max_fr_exchange, trade="futures"
+            snapshot = None if ex in streamed else self._cached_snapshot(ex, max_age)
+            if snapshot is not None:
+                snapshots[ex] = snapshot
+        polled = [
+            ex for ex in self.exchanges if ex not in streamed and ex not in snapshots
+        ]
+        cached = self.snapshot_cache is not None
+        with self.metrics.stage("scan"):
+            fr_by_exchange = (
+                async_scan.scan(
+                    polled,
+                    pool=self.pool,
+                    details=details or cached,
+                    fetcher=self.fetcher,
+                    metrics=self.metrics,
                 )
-                min_commission = self.get_commission(
-                    exchange=min_fr_exchange, trade="futures"
+                if polled
+                else {}
+            )
+        if cached:
+            for ex, settlements in fr_by_exchange.items():
+                self.snapshot_cache.write(ex, settlements)
+                if not details:
+                    fr_by_exchange[ex] = {p: s.rate for p, s in settlements.items()}
+        fr_by_exchange.update(
+            {ex: self.rate_table.get(ex, details=details) for ex in streamed}
+        )
+        fr_by_exchange.update(
+            {
+                ex: snapshot.to_dict(details=details)
+                for ex, snapshot in snapshots.items()
+            }
+        )
+        return {ex: fr_by_exchange[ex] for ex in self.exchanges if ex in fr_by_exchange}
+
+    def get_metrics_report(self) -> MetricsReport:
+        """
+        Get stage wall time, requests, bytes and retries per exchange recorded by self.metrics.
+        Recording starts with fr.metrics.enable(). MetricsReport.to_prometheus() formats them
+        as Prometheus metrics.
+
+        Returns (MetricsReport): Stage and exchange metrics.
+
+        """
+        return self.metrics.report()
+
+    def get_scan_report(self) -> pd.DataFrame:
+        """
+        Get requests and errors of every exchange in the last fetch.
+
+        Returns (pd.DataFrame): Requests, Retries, Failed Symbols and Error (None if not dropped) indexed by exchange.
+
+        """
+        reports = self.fetcher.report
+        index = list(reports)
+        return pd.DataFrame(
+            {
+                "Requests": [r.requests for r in reports.values()],
+                "Retries": [r.retries for r in reports.values()],
+                "Failed Symbols": [len(r.failed_symbols) for r in reports.values()],
+                # object column, pandas would infer str and turn None into NaN
+                "Error": pd.Series(
+                    [r.error for r in reports.values()], index=index, dtype=object
+                ),
+            },
+            index=index,
+        )
+
+    def _streamed(self, exchange: str) -> bool:
+        return self.rate_table is not None and exchange in self.rate_table.exchanges()
+
+    def _cached_snapshot(self, exchange: str, max_age):
+        if self.snapshot_cache is None or max_age is None:
+            return None
+        return self.snapshot_cache.read(exchange, max_age=max_age)
+
+    def get_large_divergence_dataframe_multi_exchanges(self, max_age=None):
+        """
+        Get large funding rate divergence between multi CEX.
+        "multi CEX" refers to self.exchanges.
+        Args:
+            max_age (float): Maximum age [s] of snapshots read from self.snapshot_cache. Always fetch if None.
+
+        Returns (pd.DataFrame): large funding rate divergence DataFrame.
+
+        """
+        return self._large_divergence_multi_exchanges(max_age)[0]
+
+    def _large_divergence_multi_exchanges(self, max_age=None) -> tuple:
+        # DataFrame and (sell, buy) exchange positions of every row
+        fr_by_exchange = self.fetch_all_funding_rate_multi_exchanges(
+            details=True, max_age=max_age
+        )
+        if self.normalize_symbols:
+            with self.metrics.stage("align"):
+                fr_by_exchange = self.get_instrument_index().align(fr_by_exchange)
+        with self.metrics.stage("build"):
+            df, legs = self.build_divergence_dataframe(fr_by_exchange, legs=True)
+        if self.depth is not None:
+            with self.metrics.stage("depth"):
+                df = self._fold_slippage(
+                    df, lambda s: self._divergence_legs(df, legs, s)
                 )
-            else:
-                try:
-                    max_commission = self.get_commission(
-                        exchange=max_fr_exchange, trade="options"
-                    ) + self.get_commission(exchange=max_fr_exchange, trade="spot")
-                    min_commission = self.get_commission(
-                        exchange=min_fr_exchange, trade="futures"
-                    )
-                except KeyError:
-                    max_commission = self.get_commission(
-                        exchange=max_fr_exchange, trade="futures"
-                    )
-                    min_commission = self.get_commission(
-                        exchange=min_fr_exchange, trade="futures"
-                    )
-            sum_of_commission = 2 * (max_commission + min_commission)
-            comm_list.append(sum_of_commission)
-
-        comm_d = {index: commission for index, commission in zip(df.index, comm_list)}
-        df_comm = pd.DataFrame(
-            comm_d.values(), index=list(comm_d.keys()), columns=["Commission [%]"]
-        ).T
-        df = pd.concat([df.T, df_comm]).T
-
-        revenue = [
-            diff_value - comm_value
-            for diff_value, comm_value in zip(diff_d.values(), comm_d.values())
+        return df, legs
+
+    def _divergence_legs(self, df: pd.DataFrame, legs: tuple, symbol: str) -> list:
+        row = df.index.get_loc(symbol)
+        sell_position, buy_position = legs[0][row], legs[1][row]
+        max_fr_exchange = df.columns[sell_position]
+        min_fr_exchange = df.columns[buy_position]
+        max_fr = df.iat[row, sell_position]
+        min_fr = df.iat[row, buy_position]
+        sell, buy = symbol, symbol
+        if self.normalize_symbols:
+            index = self.get_instrument_index()
+            sell = index.exchange_symbol(max_fr_exchange, symbol)
+            buy = index.exchange_symbol(min_fr_exchange, symbol)
+        # same cases as the commission: both plus, plus and minus, both minus
+        if min_fr >= 0:
+            return [
+                (max_fr_exchange, sell, "sell"),
+                (min_fr_exchange, buy.split(":")[0], "buy"),
+            ]
+        if max_fr >= 0:
+            return [(max_fr_exchange, sell, "sell"), (min_fr_exchange, buy, "buy")]
+        # options leg is not estimated
+        return [(min_fr_exchange, buy, "buy")]
+
+    def _fold_slippage(self, df: pd.DataFrame, legs_of) -> pd.DataFrame:
+        """
+        Subtract slippage of entry and exit from revenue of the top-K candidates.
+        Candidates with a book thinner than the notional get NaN revenue. Candidates with a book
+        that failed to fetch keep their revenue and are flagged in Depth Failed.
+        Args:
+            df (pd.DataFrame): large funding rate divergence DataFrame.
+            legs_of (callable): Function of symbol returning legs (exchange, symbol, side).
+
+        Returns (pd.DataFrame): DataFrame with Slippage [%] and Depth Failed columns.
+
+        """
+        revenue = df["Revenue [/100 USDT]"]
+        candidates = revenue.dropna().nlargest(self.depth.top_k).index
+        legs = [legs_of(symbol) for symbol in candidates]
+        slippage, fetched = self.depth.estimate(
+            [leg for symbol_legs in legs for leg in symbol_legs]
+        )
+        bounds = np.cumsum([0] + [len(symbol_legs) for symbol_legs in legs])
+        cost = pd.Series(np.nan, index=df.index)
+        failed = pd.Series(False, index=df.index)
+        cost[candidates] = [
+            2 * slippage[start:end].sum() for start, end in zip(bounds, bounds[1:])
+        ]
+        failed[candidates] = [
+            not fetched[start:end].all() for start, end in zip(bounds, bounds[1:])
         ]
-        df_rv = pd.DataFrame(
-            revenue, index=list(comm_d.keys()), columns=["Revenue [/100 USDT]"]
-        ).T
-        df = pd.concat([df.T, df_rv]).T
+        cost[failed] = np.nan
+        df["Slippage [%]"] = cost
+        df["Depth Failed"] = failed
+        adjusted = df.index.isin(candidates) & ~failed.to_numpy()
+        df["Revenue [/100 USDT]"] = revenue - cost.where(adjusted, 0)
+        return df
+
+    def get_instrument_index(self) -> InstrumentIndex:
+        """
+        Get the index of canonical instruments of multi CEX.
+        "multi CEX" refers to self.exchanges.
+        Built once from cached markets, and rebuilt when exchanges or merge_stablecoins change.
+        An index assigned to self.instrument_index is used as is.
+
+        Returns (InstrumentIndex): Instrument index.
+
+        """
+        key = (tuple(self.exchanges), self.merge_stablecoins)
+        built_for_other_exchanges = self._instrument_index_key not in (None, key)
+        if self.instrument_index is None or built_for_other_exchanges:
+            self.instrument_index = InstrumentIndex.from_markets(
+                {ex: self.pool.load_markets(ex) for ex in self.exchanges},
+                merge_stablecoins=self.merge_stablecoins,
+            )
+            self._instrument_index_key = key
+        return self.instrument_index
+
+    def build_divergence_dataframe(
+        self, fr_by_exchange: dict, now=None, legs=False
+    ) -> pd.DataFrame:
+        """
+        Build large funding rate divergence DataFrame from funding rates on multi CEX.
+        Divergence, exchanges of both legs and commission of every symbol are computed at once
+        over a symbols x exchanges matrix.
+        With FundingSettlement values, rates are scaled to self.funding_horizon [h] (when set) and
+        the time to the first settlement of either leg is given, NaN for plain funding rates.
+        Args:
+            fr_by_exchange (dict): Dict of exchange name and dict of perpetual contract pair and
+                funding rate or FundingSettlement.
+            now (float): Current time [ms]. time.time() if None.
+            legs (bool): Also return the exchange column positions of the sell (max funding rate)
+                and buy (min funding rate) legs of every row.
+
+        Returns (pd.DataFrame | tuple): large funding rate divergence DataFrame,
+            and (sell, buy) position arrays if legs.
 
+        """
+        exchanges = list(fr_by_exchange)
+        symbols = list(dict.fromkeys(p for fr in fr_by_exchange.values() for p in fr))
+        position = {p: i for i, p in enumerate(symbols)}
+        # rate, funding timestamp, next funding timestamp, interval
+        matrix = np.full((4, len(symbols), len(exchanges)), np.nan)
+        for j, fr in enumerate(fr_by_exchange.values()):
+            if not fr:
+                continue
+            positions = [position[p] for p in fr]
+            values = np.array(list(fr.values()), dtype=np.float64).reshape(len(fr), -1)
+            matrix[: values.shape[1], positions, j] = values.T
+        fr_matrix = matrix[0] * 100
+        if self.funding_horizon is not None:
+            fr_matrix = normalize_rates(fr_matrix, matrix[3], self.funding_horizon)
+        if now is None:
+            now = time.time() * 1000
+        settlement = next_settlement(matrix[1], matrix[2], now)
+
+        listed = ~np.isnan(fr_matrix)
+        any_listed = listed.any(axis=1)
+        max_fr_exchange = np.where(listed, fr_matrix, -np.inf).argmax(axis=1)
+        min_fr_exchange = np.where(listed, fr_matrix, np.inf).argmin(axis=1)
+        rows = np.arange(len(symbols))
+        max_fr = np.where(any_listed, fr_matrix[rows, max_fr_exchange], np.nan)
+        min_fr = np.where(any_listed, fr_matrix[rows, min_fr_exchange], np.nan)
+        divergence = max_fr - min_fr
+
+        # sign case: 0 = both plus, 1 = plus and minus, 2 = both minus
+        sign_case = np.where(min_fr >= 0, 0, np.where(max_fr >= 0, 1, 2))
+        with self.metrics.stage("commission"):
+            commission_table = self.get_commission_table(exchanges)
+        commission = 2 * (
+            commission_table[max_fr_exchange, sign_case, 0]
+            + commission_table[min_fr_exchange, sign_case, 1]
+        )
+        commission[~any_listed] = np.nan
+        first_settlement = np.fmin(
+            settlement[rows, max_fr_exchange], settlement[rows, min_fr_exchange]
+        )
+
+        df = pd.DataFrame(fr_matrix, index=symbols, columns=exchanges)
+        df["Divergence [%]"] = divergence
+        df["Commission [%]"] = commission
+        df["Revenue [/100 USDT]"] = divergence - commission
+        df["Time to Settlement [h]"] = (first_settlement - now) / HOUR_MS
+        if legs:
+            return df, (max_fr_exchange, min_fr_exchange)
         return df
 
+    @hybridmethod
+    def get_commission_table(self, exchanges: list) -> ndarray:
+        """
+        Get commission of both legs of arbitrage between multi CEX for every sign case.
+        Called on the class, the default commission schedule is used.
+        Sign case of funding rates (max, min): 0 = both plus, 1 = plus and minus, 2 = both minus.
+        Leg 0 is the max funding rate exchange (SELL), leg 1 is the min funding rate exchange (BUY).
+        # TODO: Check perp or spot or options exists on CEX.
+        Args:
+            exchanges (list): Names of exchanges (binance, bybit, ...)
+
+        Returns (ndarray): Commission indexed by (exchange, sign case, leg).
+
+        """
+        futures = self.commission_schedule.get_commissions(exchanges, "futures")
+        spot = self.commission_schedule.get_commissions(exchanges, "spot")
+        options = self.commission_schedule.get_commissions(
+            exchanges, "options", default=np.nan
+        )
+        options = np.where(np.isnan(options), futures, options + spot)
+        table = np.stack(
+            [
+                np.stack([futures, spot], axis=-1),
+                np.stack([futures, futures], axis=-1),
+                np.stack([options, futures], axis=-1),
+            ],
+            axis=1,
+        )
+        return table
+
+    def get_opportunities_single_exchange(
+        self, exchange: str, minus=False, display_num=10
+    ) -> list:
+        """
+        Get the top opportunities on single CEX ranked by funding rate.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            minus (bool): Ranked by minus FR or plus FR.
+            display_num (int): Number of opportunities.
+
+        Returns (list): List of Opportunity (legs, rates, commission and revenue).
+
+        """
+        df = self.get_large_divergence_dataframe_single_exchange(
+            exchange=exchange, minus=minus
+        )
+        with self.metrics.stage("sort"):
+            return single_exchange_opportunities(df, exchange, display_num, minus=minus)
+
+    def get_opportunities_multi_exchanges(
+        self, display_num=10, sorted_by="revenue"
+    ) -> list:
+        """
+        Get the top opportunities between multi CEX.
+        "multi CEX" refers to self.exchanges.
+        Args:
+            display_num (int): Number of opportunities.
+            sorted_by (str): Ranked by "revenue" or "divergence"
+
+        Returns (list): List of Opportunity (legs, rates, commission and revenue).
+
+        """
+        if sorted_by == "revenue":
+            sorted_by = "Revenue [/100 USDT]"
+        elif sorted_by == "divergence":
+            sorted_by = "Divergence [%]"
+        else:
+            log.error(f"{sorted_by} is not available.")
+            raise KeyError
+        df, legs = self._large_divergence_multi_exchanges()
+        with self.metrics.stage("sort"):
+            return multi_exchange_opportunities(df, display_num, sorted_by, legs=legs)
+
     def display_one_by_one_single_exchange(
         self, exchange: str, minus=False, display_num=10
     ):
@@ -320,29 +1064,14 @@ class FundingRateArbitrage:
         Returns: None
 
         """
-        df = self.get_large_divergence_dataframe_single_exchange(
-            exchange=exchange, minus=minus
-        )
+        from rich import print
+
         # TODO: Check perp or spot or options exists on CEX.
-        for i in (
-            df.sort_values(by="Funding Rate [%]", ascending=minus)
-            .head(display_num)
-            .index
+        for opportunity in self.get_opportunities_single_exchange(
+            exchange=exchange, minus=minus, display_num=display_num
         ):
-            print("------------------------------------------------")
-            revenue = df.loc[i]["Revenue [/100 USDT]"]
-            if revenue > 0:
-                print(f"[bold deep_sky_blue1]Revenue: {revenue} / 100USDT[/]")
-            else:
-                print(f"[bold red]Revenue: {revenue} / 100USDT[/]")
-            if minus:
-                print(f"[bold red]SELL: {i} Options[/]")
-                print(f"[bold blue]BUY: {i} Perp[/]")
-            else:
-                print(f"[bold red]SELL: {i} Perp[/]")
-                print(f"[bold blue]BUY: {i} Spot[/]")
-            print(f'Funding Rate: {df.loc[i]["Funding Rate [%]"]:.4f} %')
-            print(f'Commission: {df.loc[i]["Commission [%]"]} %')
+            for line in single_exchange_lines(opportunity):
+                print(line)
 
     def display_one_by_one_multi_exchanges(self, display_num=10, sorted_by="revenue"):
         """
@@ -354,45 +1083,14 @@ class FundingRateArbitrage:
         Returns: None
 
         """
-        if sorted_by == "revenue":
-            sorted_by = "Revenue [/100 USDT]"
-        elif sorted_by == "divergence":
-            sorted_by = "Divergence [%]"
-        else:
-            log.error(f"{sorted_by} is not available.")
-            raise KeyError
-        df = self.get_large_divergence_dataframe_multi_exchanges()
+        from rich import print
+
         # TODO: Check perp or spot or options exists on CEX.
-        for i in df.sort_values(by=sorted_by, ascending=False).head(display_num).index:
-            print("------------------------------------------------")
-            revenue = df.loc[i]["Revenue [/100 USDT]"]
-            if revenue > 0:
-                print(f"[bold deep_sky_blue1]Revenue: {revenue:.4f} USDT / 100USDT[/]")
-            else:
-                print(f"[bold red]Revenue: {revenue:.4f} USDT / 100USDT[/]")
-            max_fr_exchange = df.loc[i][:-3].idxmax()
-            min_fr_exchange = df.loc[i][:-3].idxmin()
-            max_fr = df.loc[i][:-3].max()
-            min_fr = df.loc[i][:-3].min()
-            if max_fr > 0 and min_fr > 0:
-                print(
-                    f"[bold red]SELL: {max_fr_exchange} {i} Perp (Funding Rate {max_fr:.4f} %)[/]"
-                )
-                print(f"[bold blue]BUY: {min_fr_exchange} {i} Spot[/]")
-            elif max_fr > 0 > min_fr:
-                print(
-                    f"[bold red]SELL: {max_fr_exchange} {i} Perp (Funding Rate {max_fr:.4f} %)[/]"
-                )
-                print(
-                    f"[bold blue]BUY: {min_fr_exchange} {i} Perp (Funding Rate {min_fr:.4f} %)[/]"
-                )
-            else:
-                print(f"[bold red]SELL: {max_fr_exchange} {i} Options[/]")
-                print(
-                    f"[bold blue]BUY: {min_fr_exchange} {i} Perp (Funding Rate {min_fr:.4f} %)[/]"
-                )
-            print(f'Divergence: {df.loc[i]["Divergence [%]"]:.4f} %')
-            print(f'Commission: {df.loc[i]["Commission [%]"]:.4f} %')
+        for opportunity in self.get_opportunities_multi_exchanges(
+            display_num=display_num, sorted_by=sorted_by
+        ):
+            for line in multi_exchange_lines(opportunity):
+                print(line)
 
     def get_exchanges(self) -> list:
         """
@@ -414,10 +1112,13 @@ class FundingRateArbitrage:
         self.exchanges.append(exchange)
         return self.exchanges
 
-    @staticmethod
-    def get_commission(exchange: str, trade: str, taker=True, by_token=False) -> float:
+    @hybridmethod
+    def get_commission(
+        self, exchange: str, trade: str, taker=True, by_token=False
+    ) -> float:
         """
         Get commission.
+        Called on the class, the default commission schedule is used.
         TODO: Get with ccxt or CEX API.
         Args:
             exchange (str): Name of exchanges (binance, bybit, ...)
@@ -428,110 +1129,6 @@ class FundingRateArbitrage:
         Returns (float): Commission.
 
         """
-        # https://www.binance.com/en/fee/schedule
-        if exchange == "binance":
-            if trade == "spot":
-                if by_token:
-                    return 0.075
-                else:
-                    return 0.1
-            elif trade == "futures":
-                if taker:
-                    if by_token:
-                        return 0.036
-                    else:
-                        return 0.04
-                else:
-                    if by_token:
-                        return 0.018
-                    else:
-                        return 0.02
-            elif trade == "options":
-                return 0.02
-            else:
-                log.error(f"{trade} is not available on {exchange}.")
-                raise KeyError
-
-        # https://www.bybit.com/ja-JP/help-center/bybitHC_Article?id=360039261154&language=ja
-        if exchange == "bybit":
-            if trade == "spot":
-                return 0.1
-            elif trade == "futures":
-                if taker:
-                    return 0.06
-                else:
-                    return 0.01
-            elif trade == "options":
-                return 0.03
-            else:
-                log.error(f"{trade} is not available on {exchange}.")
-                raise KeyError
-
-        # https://www.okx.com/fees
-        if exchange == "okx":
-            if trade == "spot":
-                if taker:
-                    return 0.1
-                else:
-                    return 0.08
-            elif trade == "futures":
-                if taker:
-                    return 0.05
-                else:
-                    return 0.02
-            elif trade == "options":
-                if taker:
-                    return 0.03
-                else:
-                    return 0.02
-            else:
-                log.error(f"{trade} is not available on {exchange}.")
-                raise KeyError
-
-        # https://www.bitget.com/ja/rate/
-        if exchange == "bitget":
-            if trade == "spot":
-                if by_token:
-                    return 0.08
-                else:
-                    return 0.1
-            elif trade == "futures":
-                if taker:
-                    return 0.051
-                else:
-                    return 0.017
-            else:
-                log.error(f"{trade} is not available on {exchange}.")
-                raise KeyError
-
-        # https://www.gate.io/ja/fee
-        if exchange == "gate":
-            if trade == "spot":
-                if by_token:
-                    return 0.15
-                else:
-                    return 0.2
-            elif trade == "futures":
-                if taker:
-                    return 0.05
-                else:
-                    return 0.015
-            else:
-                log.error(f"{trade} is not available on {exchange}.")
-                raise KeyError
-
-        # https://www.coinex.zone/fees?type=spot&market=normal
-        if exchange == "coinex":
-            if trade == "spot":
-                if by_token:
-                    return 0.16
-                else:
-                    return 0.2
-            elif trade == "futures":
-                if taker:
-                    return 0.05
-                else:
-                    return 0.03
-            else:
-                log.error(f"{trade} is not available on {exchange}.")
-                raise KeyError
+        return self.commission_schedule.get(
+            exchange=exchange, trade=trade, taker=taker, by_token=by_token
+        )
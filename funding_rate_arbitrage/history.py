@@ -0,0 +1,478 @@
+"""
+Local store of funding rate history
+"""
+
+from __future__ import annotations
+
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+
+import numpy as np
+
+from funding_rate_arbitrage.lazy import pd
+from funding_rate_arbitrage.ratelimit import TokenBucket
+
+log = logging.getLogger("rich")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS funding_rate (
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    funding_rate REAL NOT NULL,
+    PRIMARY KEY (exchange, symbol, timestamp)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS backfill_cursor (
+    exchange TEXT NOT NULL,
+    symbol TEXT NOT NULL,
+    since INTEGER NOT NULL,
+    cursor INTEGER NOT NULL,
+    PRIMARY KEY (exchange, symbol, since)
+) WITHOUT ROWID;
+"""
+
+
+def to_milliseconds(value) -> int:
+    """
+    Convert datetime or epoch milliseconds to epoch milliseconds.
+
+    Args:
+        value (datetime | int): Time.
+
+    Returns (int): Epoch milliseconds.
+
+    """
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    return int(value)
+
+
+@dataclass
+class BackfillResult:
+    """
+    Result of a funding rate history backfill.
+    """
+
+    records: dict = field(default_factory=dict)
+    failed: dict = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def total_records(self) -> int:
+        return sum(self.records.values())
+
+    @property
+    def records_per_second(self) -> float:
+        return self.total_records / self.seconds if self.seconds else 0.0
+
+
+class FundingRateHistory:
+    """
+    Funding rate history of one (exchange, symbol) as typed columns.
+    Settlement times are int64 epoch milliseconds and funding rates float64 ccxt raw rates (not %).
+    datetime objects are only built on request (datetimes, to_tuple).
+    """
+
+    __slots__ = ("exchange", "symbol", "timestamps", "rates")
+
+    def __init__(self, exchange: str, symbol: str, timestamps, rates):
+        """
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            timestamps (ndarray): Settlement times [ms].
+            rates (ndarray): Funding rates.
+        """
+        self.exchange = exchange
+        self.symbol = symbol
+        self.timestamps = np.asarray(timestamps, dtype=np.int64)
+        self.rates = np.asarray(rates, dtype=np.float64)
+
+    @classmethod
+    def from_records(cls, exchange: str, symbol: str, records: list):
+        """
+        Build from ccxt funding rate history structures.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            records (list): ccxt funding rate history structures.
+
+        Returns (FundingRateHistory): Funding rate history.
+
+        """
+        timestamps = np.fromiter(
+            (r["timestamp"] for r in records), dtype=np.int64, count=len(records)
+        )
+        rates = np.fromiter(
+            (r["fundingRate"] for r in records), dtype=np.float64, count=len(records)
+        )
+        return cls(exchange, symbol, timestamps, rates)
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def datetimes(self) -> list:
+        """
+        Settlement times as local datetime.
+        """
+        return [datetime.fromtimestamp(t * 0.001) for t in self.timestamps.tolist()]
+
+    def to_tuple(self) -> tuple:
+        """
+        Convert to the (settlement time, funding rate [%]) lists of fetch_funding_rate_history.
+
+        Returns (tuple): settlement time, funding rate.
+
+        """
+        return self.datetimes, (self.rates * 100).tolist()
+
+
+class FundingRateHistoryStore:
+    """
+    Funding rate history of (exchange, symbol) stored in a SQLite file.
+    Timestamps are settlement times in epoch milliseconds, funding rates are ccxt raw rates (not %).
+    """
+
+    def __init__(self, path="funding_rate_history.sqlite"):
+        """
+        Args:
+            path (str): Path of the SQLite file (":memory:" for a temporary store).
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.executescript(SCHEMA)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the SQLite connection.
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._conn.close()
+
+    def last_timestamp(self, exchange: str, symbol: str):
+        """
+        Get the latest stored settlement time.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+
+        Returns (int | None): Epoch milliseconds, None if nothing is stored.
+
+        """
+        with self._lock:
+            (timestamp,) = self._conn.execute(
+                "SELECT MAX(timestamp) FROM funding_rate WHERE exchange = ? AND symbol = ?",
+                (exchange, symbol),
+            ).fetchone()
+        return timestamp
+
+    def write(self, exchange: str, symbol: str, records: list) -> int:
+        """
+        Write ccxt funding rate history records, replacing records of the same settlement time.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            records (list): ccxt funding rate history structures.
+
+        Returns (int): Number of written records.
+
+        """
+        rows = self._rows(exchange, symbol, records)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO funding_rate VALUES (?, ?, ?, ?)", rows
+            )
+        return len(rows)
+
+    def read(self, exchange: str, symbol: str, since=None, until=None) -> tuple:
+        """
+        Read stored funding rate history in settlement time order.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (int): Earliest settlement time [ms] (inclusive).
+            until (int): Latest settlement time [ms] (exclusive).
+
+        Returns (tuple): settlement time [ms] (int64 ndarray), funding rate (float64 ndarray).
+
+        """
+        query = "SELECT timestamp, funding_rate FROM funding_rate WHERE exchange = ? AND symbol = ?"
+        params = [exchange, symbol]
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp < ?"
+            params.append(int(until))
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY timestamp", params).fetchall()
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        timestamps, rates = zip(*rows)
+        return np.array(timestamps, dtype=np.int64), np.array(rates, dtype=np.float64)
+
+    def read_history(
+        self, exchange: str, symbol: str, since=None, until=None
+    ) -> FundingRateHistory:
+        """
+        Read stored funding rate history as typed columns.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (int): Earliest settlement time [ms] (inclusive).
+            until (int): Latest settlement time [ms] (exclusive).
+
+        Returns (FundingRateHistory): Funding rate history.
+
+        """
+        timestamps, rates = self.read(exchange, symbol, since=since, until=until)
+        return FundingRateHistory(exchange, symbol, timestamps, rates)
+
+    def load_histories(self, keys=None, since=None, until=None) -> pd.DataFrame:
+        """
+        Load funding rate histories of many (exchange, symbol) pairs into one DataFrame.
+
+        Args:
+            keys (list): List of (exchange, symbol). All stored pairs if None.
+            since (int): Earliest settlement time [ms] (inclusive).
+            until (int): Latest settlement time [ms] (exclusive).
+
+        Returns (pd.DataFrame): timestamp [ms] (int64) and funding_rate (float64) columns
+            indexed by (exchange, symbol), in settlement time order within each pair.
+
+        """
+        query = "SELECT exchange, symbol, timestamp, funding_rate FROM funding_rate WHERE 1 = 1"
+        params = []
+        if since is not None:
+            query += " AND timestamp >= ?"
+            params.append(int(since))
+        if until is not None:
+            query += " AND timestamp < ?"
+            params.append(int(until))
+        rows = []
+        with self._lock:
+            if keys is None:
+                rows = self._conn.execute(
+                    query + " ORDER BY exchange, symbol, timestamp", params
+                ).fetchall()
+            else:
+                keys = list(keys)
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i : i + 500]
+                    values = ", ".join(["(?, ?)"] * len(chunk))
+                    rows += self._conn.execute(
+                        query + f" AND (exchange, symbol) IN (VALUES {values})"
+                        " ORDER BY exchange, symbol, timestamp",
+                        params + [v for key in chunk for v in key],
+                    ).fetchall()
+        exchanges, symbols, timestamps, rates = zip(*rows) if rows else ([],) * 4
+        index = pd.MultiIndex.from_arrays(
+            [pd.Categorical(exchanges), pd.Categorical(symbols)],
+            names=["exchange", "symbol"],
+        )
+        return pd.DataFrame(
+            {
+                "timestamp": np.array(timestamps, dtype=np.int64),
+                "funding_rate": np.array(rates, dtype=np.float64),
+            },
+            index=index,
+        )
+
+    def keys(self) -> list:
+        """
+        Get stored (exchange, symbol) pairs.
+
+        Returns (list): List of (exchange, symbol).
+
+        """
+        with self._lock:
+            return self._conn.execute(
+                "SELECT DISTINCT exchange, symbol FROM funding_rate ORDER BY exchange, symbol"
+            ).fetchall()
+
+    def sync(self, ex, exchange: str, symbol: str, since=None, limit=None) -> int:
+        """
+        Fetch funding rate history newer than the latest stored record, page by page.
+
+        Args:
+            ex (ccxt.Exchange): Exchange object.
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (int): Settlement time [ms] to start from when nothing is stored yet.
+                The exchange default page (latest records) if None.
+            limit (int): Number of records per request. The exchange default if None.
+
+        Returns (int): Number of new records.
+
+        """
+        cursor = self.last_timestamp(exchange, symbol)
+        if cursor is not None:
+            since = cursor + 1
+        num_new = 0
+        while True:
+            page = ex.fetch_funding_rate_history(
+                symbol=symbol, since=since, limit=limit
+            )
+            page = sorted(
+                (r for r in page if cursor is None or r["timestamp"] > cursor),
+                key=lambda r: r["timestamp"],
+            )
+            if not page:
+                break
+            num_new += self.write(exchange, symbol, page)
+            cursor = page[-1]["timestamp"]
+            since = cursor + 1
+        log.info(f"{exchange} {symbol}: {num_new} new funding rates")
+        return num_new
+
+    def backfill_cursor(self, exchange: str, symbol: str, since: int):
+        """
+        Get how far a backfill starting at `since` has progressed.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (int): Start of the backfill [ms].
+
+        Returns (int | None): Next settlement time [ms] to fetch, None if the backfill never ran.
+
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT cursor FROM backfill_cursor WHERE exchange = ? AND symbol = ? AND since = ?",
+                (exchange, symbol, since),
+            ).fetchone()
+        return row[0] if row else None
+
+    def backfill(
+        self,
+        ex,
+        exchange: str,
+        symbols: list,
+        since,
+        until=None,
+        limit=None,
+        workers=4,
+        bucket=None,
+    ) -> BackfillResult:
+        """
+        Fetch the full funding rate history of symbols in [since, until) page by page.
+        Symbols run in parallel and share the request budget of the exchange. Every page is
+        stored together with the cursor of its symbol, so an interrupted backfill called again
+        with the same `since` resumes where it stopped.
+
+        Args:
+            ex (ccxt.Exchange): Exchange object.
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbols (list): Symbols (BTC/USDT:USDT, ETH/USDT:USDT, ...).
+            since (datetime | int): Start of the range [ms] (inclusive).
+            until (datetime | int): End of the range [ms] (exclusive). Now if None.
+            limit (int): Number of records per request. The exchange default if None.
+            workers (int): Number of symbols fetched in parallel.
+            bucket (TokenBucket): Request budget of the exchange. Built from ex.rateLimit if None.
+
+        Returns (BackfillResult): Number of records per symbol, failed symbols and throughput.
+
+        """
+        since = to_milliseconds(since)
+        until = to_milliseconds(until if until is not None else datetime.now())
+        bucket = bucket or TokenBucket.from_exchange(ex)
+        result = BackfillResult()
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(
+                    self._backfill_symbol,
+                    ex,
+                    exchange,
+                    symbol,
+                    since,
+                    until,
+                    limit,
+                    bucket,
+                ): symbol
+                for symbol in symbols
+            }
+            for done, future in enumerate(as_completed(futures), start=1):
+                symbol = futures[future]
+                try:
+                    result.records[symbol] = future.result()
+                except Exception as e:
+                    log.exception(f"{exchange} {symbol}: backfill failed.")
+                    result.failed[symbol] = e
+                result.seconds = time.perf_counter() - start
+                log.info(
+                    f"[{done}/{len(symbols)}] {exchange} {symbol}: "
+                    f"{result.records.get(symbol, 0)} records "
+                    f"({result.records_per_second:.1f} records/sec)"
+                )
+        log.info(
+            f"{exchange}: backfilled {result.total_records} records of {len(result.records)} symbols "
+            f"in {result.seconds:.1f} sec ({result.records_per_second:.1f} records/sec)"
+        )
+        return result
+
+    def _backfill_symbol(
+        self, ex, exchange: str, symbol: str, since: int, until: int, limit, bucket
+    ) -> int:
+        cursor = self.backfill_cursor(exchange, symbol, since)
+        cursor = since if cursor is None else cursor
+        num_records = 0
+        while cursor < until:
+            bucket.acquire()
+            page = ex.fetch_funding_rate_history(
+                symbol=symbol, since=cursor, limit=limit
+            )
+            page = sorted(
+                (r for r in page if cursor <= r["timestamp"] < until),
+                key=lambda r: r["timestamp"],
+            )
+            next_cursor = page[-1]["timestamp"] + 1 if page else until
+            num_records += self._write_page(exchange, symbol, page, since, next_cursor)
+            cursor = next_cursor
+        return num_records
+
+    def _write_page(
+        self, exchange: str, symbol: str, records: list, since: int, cursor: int
+    ) -> int:
+        rows = self._rows(exchange, symbol, records)
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO funding_rate VALUES (?, ?, ?, ?)", rows
+            )
+            self._conn.execute(
+                "INSERT OR REPLACE INTO backfill_cursor VALUES (?, ?, ?, ?)",
+                (exchange, symbol, since, cursor),
+            )
+        return len(rows)
+
+    @staticmethod
+    def _rows(exchange: str, symbol: str, records: list) -> list:
+        return [
+            (exchange, symbol, int(r["timestamp"]), float(r["fundingRate"]))
+            for r in records
+            if r.get("timestamp") is not None and r.get("fundingRate") is not None
+        ]
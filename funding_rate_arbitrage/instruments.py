@@ -0,0 +1,192 @@
+"""
+Canonical instruments of perpetual contracts across CEX
+"""
+
+import logging
+import re
+from typing import NamedTuple
+
+log = logging.getLogger("rich")
+
+# "1000PEPE", "1000000MOG", "1MBABYDOGE", "kPEPE": base currency quoted per 1000, 1000000, ... units
+MULTIPLIER_PREFIX = re.compile(r"^(?:(10{2,})|(1M)|(k))(?=[A-Z])")
+STABLECOINS = {"USDT", "USDC", "USD", "BUSD", "FDUSD", "TUSD", "DAI"}
+
+
+class Instrument(NamedTuple):
+    """
+    Canonical instrument of a market.
+    symbol is the canonical "BASE/QUOTE:SETTLE" symbol, multiplier the base units per quoted unit
+    (1000 for 1000PEPE) and contract_size the base units per contract.
+    Funding rates are ratios of notional, so they line up without scaling; prices and amounts
+    scale by multiplier and contract_size.
+    """
+
+    symbol: str
+    base: str
+    quote: str
+    settle: str
+    multiplier: float
+    contract_size: float
+
+
+def split_multiplier(base: str) -> tuple:
+    """
+    Split multiplier prefix of base currency.
+
+    Args:
+        base (str): Base currency (1000PEPE, BTC, ...)
+
+    Returns (tuple): Base currency without prefix, multiplier.
+
+    """
+    m = MULTIPLIER_PREFIX.match(base)
+    if m is None:
+        return base, 1.0
+    zeros, million, kilo = m.groups()
+    multiplier = float(zeros) if zeros else 1e6 if million else 1e3
+    return base[m.end() :], multiplier
+
+
+class InstrumentIndex:
+    """
+    Index from (exchange, symbol) and (exchange, market id) to canonical instruments,
+    used to join funding rates of multi CEX on one key.
+    """
+
+    def __init__(self, merge_stablecoins=False):
+        """
+        Args:
+            merge_stablecoins (bool): Treat stablecoin quote/settle currencies (USDT, USDC, ...) as USD,
+                so that BTC/USDT:USDT and BTC/USDC:USDC line up.
+        """
+        self.merge_stablecoins = merge_stablecoins
+        self._by_symbol = {}
+        self._by_id = {}
+        # (exchange, canonical symbol) -> symbol of the exchange kept by align
+        self._aligned = {}
+
+    @classmethod
+    def from_markets(cls, markets_by_exchange: dict, merge_stablecoins=False):
+        """
+        Build the index from ccxt markets.
+
+        Args:
+            markets_by_exchange (dict): Dict of exchange name and ccxt markets (load_markets).
+            merge_stablecoins (bool): Treat stablecoin quote/settle currencies as USD.
+
+        Returns (InstrumentIndex): Instrument index.
+
+        """
+        index = cls(merge_stablecoins=merge_stablecoins)
+        for exchange, markets in markets_by_exchange.items():
+            index.add_markets(exchange, markets)
+        return index
+
+    def add_markets(self, exchange: str, markets: dict) -> None:
+        """
+        Add ccxt markets of the exchange.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            markets (dict): ccxt markets (load_markets).
+
+        Returns: None
+
+        """
+        for symbol, market in markets.items():
+            instrument = self._instrument(
+                base=market.get("base"),
+                quote=market.get("quote"),
+                settle=market.get("settle") or market.get("quote"),
+                contract_size=market.get("contractSize") or 1.0,
+            )
+            self._by_symbol[(exchange, symbol)] = instrument
+            if market.get("id") is not None:
+                self._by_id[(exchange, market["id"])] = instrument
+
+    def get(self, exchange: str, symbol: str) -> Instrument:
+        """
+        Get canonical instrument of the symbol.
+        Symbols missing from the index (new listings, ...) are parsed from the unified symbol.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Symbol (1000PEPE/USDT:USDT, BTC/USDT:USDT, ...).
+
+        Returns (Instrument): Canonical instrument.
+
+        """
+        instrument = self._by_symbol.get((exchange, symbol))
+        if instrument is None:
+            instrument = self._parse(symbol)
+            self._by_symbol[(exchange, symbol)] = instrument
+        return instrument
+
+    def get_by_id(self, exchange: str, market_id: str) -> Instrument:
+        """
+        Get canonical instrument of the exchange market id.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            market_id (str): Market id of the exchange (1000PEPEUSDT, ...).
+
+        Returns (Instrument): Canonical instrument.
+
+        """
+        return self._by_id[(exchange, market_id)]
+
+    def align(self, fr_by_exchange: dict) -> dict:
+        """
+        Re-key funding rates of multi CEX by canonical symbol.
+        When several symbols of one exchange map to the same instrument, the first one is kept.
+
+        Args:
+            fr_by_exchange (dict): Dict of exchange name and dict of perpetual contract pair and funding rate.
+
+        Returns (dict): Dict of exchange name and dict of canonical symbol and funding rate.
+
+        """
+        aligned = {}
+        for exchange, fr in fr_by_exchange.items():
+            fr_canonical = aligned[exchange] = {}
+            for symbol, rate in fr.items():
+                key = self.get(exchange, symbol).symbol
+                if key in fr_canonical:
+                    log.debug(f"{exchange} {symbol} duplicates {key}, skipped.")
+                    continue
+                fr_canonical[key] = rate
+                self._aligned[(exchange, key)] = symbol
+        return aligned
+
+    def exchange_symbol(self, exchange: str, symbol: str) -> str:
+        """
+        Get the symbol of the exchange aligned on the canonical symbol.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            symbol (str): Canonical symbol.
+
+        Returns (str): Symbol of the exchange (1000PEPE/USDT:USDT, ...), the canonical symbol if not aligned.
+
+        """
+        return self._aligned.get((exchange, symbol), symbol)
+
+    def _parse(self, symbol: str) -> Instrument:
+        pair, _, settle = symbol.partition(":")
+        base, _, quote = pair.partition("/")
+        return self._instrument(base, quote, settle or quote, 1.0)
+
+    def _instrument(self, base, quote, settle, contract_size) -> Instrument:
+        base, multiplier = split_multiplier(base or "")
+        if self.merge_stablecoins:
+            quote = "USD" if quote in STABLECOINS else quote
+            settle = "USD" if settle in STABLECOINS else settle
+        return Instrument(
+            symbol=f"{base}/{quote}:{settle}",
+            base=base,
+            quote=quote,
+            settle=settle,
+            multiplier=multiplier,
+            contract_size=float(contract_size),
+        )
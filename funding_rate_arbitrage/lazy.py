@@ -0,0 +1,37 @@
+"""
+Modules imported on first use, to keep `import funding_rate_arbitrage` fast
+"""
+
+import importlib
+
+
+class LazyModule:
+    """
+    Stand-in for a module imported on first attribute access.
+    ccxt (every exchange class) and pandas take most of the import time of the package, while
+    a short CLI or cron run may need neither of them, or only after its first network request.
+    """
+
+    def __init__(self, name: str):
+        """
+        Args:
+            name (str): Module name (ccxt, ccxt.async_support, pandas, ...).
+        """
+        self._name = name
+        self._module = None
+
+    def __getattr__(self, attr: str):
+        if attr in ("_name", "_module"):
+            raise AttributeError(attr)
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+    def __repr__(self) -> str:
+        state = "imported" if self._module is not None else "not imported"
+        return f"<lazy module {self._name!r} ({state})>"
+
+
+ccxt = LazyModule("ccxt")
+ccxt_async = LazyModule("ccxt.async_support")
+pd = LazyModule("pandas")
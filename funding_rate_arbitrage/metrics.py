@@ -0,0 +1,228 @@
+"""
+Instrumentation of scans: stage wall time, requests, bytes and retries per exchange
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+
+# returned by Instrumentation.stage while disabled, so that disabled stages cost one attribute check
+_NULL_STAGE = nullcontext()
+
+
+@dataclass
+class StageMetrics:
+    """
+    Calls and wall time of a stage.
+    """
+
+    calls: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class ExchangeMetrics:
+    """
+    HTTP responses, bytes received (decoded body) and retries of an exchange.
+    """
+
+    requests: int = 0
+    bytes: int = 0
+    retries: int = 0
+
+
+@dataclass
+class MetricsReport:
+    """
+    Snapshot of Instrumentation.
+    stages is keyed by (stage, exchange), exchange is "" for stages not bound to an exchange.
+    """
+
+    stages: dict = field(default_factory=dict)
+    exchanges: dict = field(default_factory=dict)
+
+    def to_prometheus(self, prefix="frarb") -> str:
+        """
+        Format metrics in Prometheus text exposition format.
+
+        Args:
+            prefix (str): Prefix of metric names.
+
+        Returns (str): Metrics text.
+
+        """
+        lines = []
+
+        def family(name, help_text, samples):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} counter")
+            for labels, value in samples:
+                label_text = ",".join(f'{k}="{v}"' for k, v in labels.items() if v)
+                lines.append(f"{prefix}_{name}{{{label_text}}} {value}")
+
+        stages = sorted(self.stages.items())
+        exchanges = sorted(self.exchanges.items())
+        family(
+            "stage_seconds_total",
+            "Wall time spent in the stage.",
+            [({"stage": s, "exchange": ex}, m.seconds) for (s, ex), m in stages],
+        )
+        family(
+            "stage_calls_total",
+            "Number of times the stage ran.",
+            [({"stage": s, "exchange": ex}, m.calls) for (s, ex), m in stages],
+        )
+        family(
+            "requests_total",
+            "HTTP responses received.",
+            [({"exchange": ex}, m.requests) for ex, m in exchanges],
+        )
+        family(
+            "response_bytes_total",
+            "Bytes of HTTP response bodies received.",
+            [({"exchange": ex}, m.bytes) for ex, m in exchanges],
+        )
+        family(
+            "retries_total",
+            "Requests retried.",
+            [({"exchange": ex}, m.retries) for ex, m in exchanges],
+        )
+        return "\n".join(lines) + "\n"
+
+
+class Instrumentation:
+    """
+    Records stage wall time, requests, bytes received and retries per exchange.
+    Disabled by default: stages then return a shared no-op context manager and hooked clients
+    skip counting, so the overhead is one attribute check per stage or response.
+    """
+
+    def __init__(self, enabled=False, clock=time.perf_counter):
+        """
+        Args:
+            enabled (bool): Record metrics.
+            clock (callable): Clock returning seconds.
+        """
+        self.enabled = enabled
+        self.clock = clock
+        self._stages = {}
+        self._exchanges = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        """
+        Clear recorded metrics.
+
+        Returns: None
+
+        """
+        with self._lock:
+            self._stages = {}
+            self._exchanges = {}
+
+    def stage(self, name: str, exchange=""):
+        """
+        Context manager timing a stage.
+
+        Args:
+            name (str): Stage name (markets, fetch, build, ...).
+            exchange (str): Name of exchange, "" for stages not bound to an exchange.
+
+        Returns: Context manager.
+
+        """
+        if not self.enabled:
+            return _NULL_STAGE
+        return _Stage(self, name, exchange)
+
+    def instrument(self, ex):
+        """
+        Hook ccxt on_rest_response of an exchange object to count responses and bytes.
+        Hooking twice is a no-op.
+
+        Args:
+            ex (ccxt.Exchange): Exchange object (sync or async).
+
+        Returns (ccxt.Exchange): The exchange object.
+
+        """
+        if getattr(ex, "_instrumentation", None) is not None:
+            return ex
+        on_rest_response = ex.on_rest_response
+
+        def hook(code, reason, url, method, headers, body, *args):
+            if self.enabled:
+                self.count_request(ex.id, len(body or ""))
+            return on_rest_response(code, reason, url, method, headers, body, *args)
+
+        ex.on_rest_response = hook
+        ex._instrumentation = self
+        return ex
+
+    def count_request(self, exchange: str, nbytes=0) -> None:
+        with self._lock:
+            metrics = self._exchange(exchange)
+            metrics.requests += 1
+            metrics.bytes += nbytes
+
+    def count_retry(self, exchange: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._exchange(exchange).retries += 1
+
+    def report(self) -> MetricsReport:
+        """
+        Get a snapshot of recorded metrics.
+
+        Returns (MetricsReport): Stage and exchange metrics.
+
+        """
+        with self._lock:
+            return MetricsReport(
+                stages={
+                    k: StageMetrics(m.calls, m.seconds) for k, m in self._stages.items()
+                },
+                exchanges={
+                    k: ExchangeMetrics(m.requests, m.bytes, m.retries)
+                    for k, m in self._exchanges.items()
+                },
+            )
+
+    def to_prometheus(self, prefix="frarb") -> str:
+        return self.report().to_prometheus(prefix)
+
+    def _exchange(self, exchange: str) -> ExchangeMetrics:
+        if exchange not in self._exchanges:
+            self._exchanges[exchange] = ExchangeMetrics()
+        return self._exchanges[exchange]
+
+    def _record(self, name: str, exchange: str, seconds: float) -> None:
+        with self._lock:
+            metrics = self._stages.setdefault((name, exchange), StageMetrics())
+            metrics.calls += 1
+            metrics.seconds += seconds
+
+
+class _Stage:
+    __slots__ = ("instrumentation", "name", "exchange", "start")
+
+    def __init__(self, instrumentation, name, exchange):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.exchange = exchange
+
+    def __enter__(self):
+        self.start = self.instrumentation.clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        seconds = self.instrumentation.clock() - self.start
+        self.instrumentation._record(self.name, self.exchange, seconds)
@@ -0,0 +1,220 @@
+"""
+Pool of long-lived exchange clients
+"""
+
+import asyncio
+import logging
+import threading
+import time
+
+from funding_rate_arbitrage.lazy import ccxt, ccxt_async
+
+log = logging.getLogger("rich")
+
+
+class ExchangePool:
+    """
+    Long-lived ccxt clients keyed by exchange id.
+    Sync clients keep their HTTP session between calls, async clients live on a dedicated
+    event loop thread so their aiohttp sessions survive between scans. Markets are shared
+    by both kinds of clients and reloaded only when older than market_ttl.
+    """
+
+    def __init__(self, market_ttl=3600, clock=time.monotonic, on_client=None):
+        """
+        Args:
+            market_ttl (float): Seconds before cached markets are reloaded.
+            clock (callable): Clock returning seconds.
+            on_client (callable): Function applied to every client the pool creates (instrumentation, ...).
+        """
+        self.market_ttl = market_ttl
+        self.clock = clock
+        self.on_client = on_client
+        self._clients = {}
+        self._async_clients = {}
+        self._markets = {}
+        self._synced = {}
+        self._lock = threading.Lock()
+        self._loop = None
+        self._thread = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def register(self, exchange: str, client=None, async_client=None) -> None:
+        """
+        Register prebuilt clients (custom options, fakes, ...) under the exchange name.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            client (ccxt.Exchange): Sync client.
+            async_client (ccxt.async_support.Exchange): Async client.
+
+        Returns: None
+
+        """
+        with self._lock:
+            if client is not None:
+                self._clients[exchange] = client
+            if async_client is not None:
+                self._async_clients[exchange] = async_client
+
+    def get(self, exchange: str):
+        """
+        Get the sync client of the exchange, creating it on first use.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+
+        Returns (ccxt.Exchange): Exchange object.
+
+        """
+        with self._lock:
+            if exchange not in self._clients:
+                self._clients[exchange] = self._new_client(getattr(ccxt, exchange))
+            return self._clients[exchange]
+
+    def async_client(self, exchange: str):
+        """
+        Get the async client of the exchange, creating it on first use.
+        Must be used on the pool event loop (see run).
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+
+        Returns (ccxt.async_support.Exchange): Exchange object.
+
+        """
+        with self._lock:
+            if exchange not in self._async_clients:
+                self._async_clients[exchange] = self._new_client(
+                    getattr(ccxt_async, exchange)
+                )
+            return self._async_clients[exchange]
+
+    def load_markets(self, exchange: str, fetcher=None) -> dict:
+        """
+        Load markets of the exchange on the sync client, from cache while fresh.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            fetcher (ResilientFetcher): Sends the request with rate limiting, retries and circuit breaking.
+
+        Returns (dict): Markets of the exchange.
+
+        """
+        ex = self.get(exchange)
+        if not self._inject_cached(exchange, ex):
+            if fetcher is None:
+                ex.load_markets(reload=True)
+            else:
+                fetcher.call_sync(ex, "load_markets", reload=True)
+            self._store(exchange, ex)
+        return ex.markets
+
+    async def load_markets_async(self, exchange: str, fetcher=None) -> dict:
+        """
+        Load markets of the exchange on the async client, from cache while fresh.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            fetcher (ResilientFetcher): Sends the request with rate limiting, retries and circuit breaking.
+
+        Returns (dict): Markets of the exchange.
+
+        """
+        ex = self.async_client(exchange)
+        if not self._inject_cached(exchange, ex):
+            if fetcher is None:
+                await ex.load_markets(reload=True)
+            else:
+                await fetcher.call(ex, "load_markets", reload=True)
+            self._store(exchange, ex)
+        return ex.markets
+
+    def invalidate(self, exchange=None) -> None:
+        """
+        Drop cached markets so that the next load downloads them again.
+
+        Args:
+            exchange (str): Name of exchange. All exchanges if None.
+
+        Returns: None
+
+        """
+        if exchange is None:
+            self._markets.clear()
+            self._synced.clear()
+        else:
+            self._markets.pop(exchange, None)
+
+    def run(self, coro):
+        """
+        Run a coroutine on the pool event loop and wait for the result.
+
+        Args:
+            coro: Coroutine.
+
+        Returns: Result of the coroutine.
+
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="exchange-pool", daemon=True
+                )
+                self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result()
+
+    def close(self) -> None:
+        """
+        Close every client and stop the pool event loop.
+
+        Returns: None
+
+        """
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            async_clients, self._async_clients = self._async_clients, {}
+            loop, self._loop = self._loop, None
+            thread, self._thread = self._thread, None
+        for ex in clients.values():
+            ex.close()
+        if loop is not None:
+
+            async def close_async():
+                for ex in async_clients.values():
+                    await ex.close()
+
+            asyncio.run_coroutine_threadsafe(close_async(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+        self._markets.clear()
+        self._synced.clear()
+
+    def _new_client(self, exchange_class):
+        client = exchange_class()
+        if self.on_client is not None:
+            self.on_client(client)
+        return client
+
+    def _inject_cached(self, exchange: str, ex) -> bool:
+        cached = self._markets.get(exchange)
+        if cached is None or self.clock() - cached[0] > self.market_ttl:
+            return False
+        loaded_at, markets, currencies = cached
+        if self._synced.get(id(ex)) != loaded_at:
+            ex.set_markets(markets, currencies)
+            self._synced[id(ex)] = loaded_at
+        return True
+
+    def _store(self, exchange: str, ex) -> None:
+        log.info(f"loaded markets of {exchange}")
+        loaded_at = self.clock()
+        self._markets[exchange] = (loaded_at, ex.markets, ex.currencies)
+        self._synced[id(ex)] = loaded_at
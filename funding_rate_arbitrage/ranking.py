@@ -0,0 +1,226 @@
+"""
+Top-N selection of arbitrage opportunities and their display lines
+"""
+
+from __future__ import annotations
+
+from typing import NamedTuple
+
+import numpy as np
+
+from funding_rate_arbitrage.lazy import pd
+
+# legs of the sign cases of commission: both plus, plus and minus, both minus
+LEG_KINDS = [("Perp", "Spot"), ("Perp", "Perp"), ("Options", "Perp")]
+
+
+class Opportunity(NamedTuple):
+    """
+    Arbitrage opportunity of a symbol: sell one leg and buy the other.
+    Rates, divergence, commission and revenue are in %, rates are NaN for spot and options legs.
+    """
+
+    symbol: str
+    sell_exchange: str
+    sell_kind: str
+    sell_rate: float
+    buy_exchange: str
+    buy_kind: str
+    buy_rate: float
+    divergence: float
+    commission: float
+    revenue: float
+
+
+def top_positions(values, n: int, ascending=False) -> np.ndarray:
+    """
+    Get positions of the n largest (smallest if ascending) values in order, NaN last like sort_values.
+    Only the n selected values are sorted, after a partial selection (np.argpartition) in O(len(values)).
+
+    Args:
+        values (array-like): Values.
+        n (int): Number of positions.
+        ascending (bool): Select the smallest values.
+
+    Returns (np.ndarray): Positions of the selected values.
+
+    """
+    values = np.asarray(values, dtype=np.float64)
+    keys = np.where(np.isnan(values), np.inf, values if ascending else -values)
+    n = max(0, min(n, len(keys)))
+    if n < len(keys):
+        positions = np.argpartition(keys, n - 1)[:n] if n else np.array([], dtype=int)
+    else:
+        positions = np.arange(len(keys))
+    return positions[np.argsort(keys[positions], kind="stable")]
+
+
+def top_rows(df: pd.DataFrame, column: str, n: int, ascending=False) -> pd.DataFrame:
+    """
+    Same rows as df.sort_values(by=column, ascending=ascending).head(n) without sorting df.
+
+    Args:
+        df (pd.DataFrame): DataFrame.
+        column (str): Column ranked.
+        n (int): Number of rows.
+        ascending (bool): Select the smallest values.
+
+    Returns (pd.DataFrame): Top n rows in order.
+
+    """
+    return df.iloc[top_positions(df[column].to_numpy(), n, ascending=ascending)]
+
+
+def single_exchange_opportunities(
+    df: pd.DataFrame, exchange: str, n: int, minus=False
+) -> list:
+    """
+    Get the top n opportunities of a large funding rate divergence DataFrame on single CEX.
+    Plus funding rates sell perp and buy spot, minus funding rates sell options and buy perp.
+
+    Args:
+        df (pd.DataFrame): DataFrame of FundingRateArbitrage.get_large_divergence_dataframe_single_exchange.
+        exchange (str): Name of exchange (binance, bybit, ...)
+        n (int): Number of opportunities.
+        minus (bool): Rank minus FR or plus FR.
+
+    Returns (list): Opportunities ranked by funding rate.
+
+    """
+    rates = df["Funding Rate [%]"].to_numpy(dtype=np.float64)
+    top = top_positions(rates, n, ascending=minus)
+    symbols = df.index[top].tolist()
+    rates = rates[top].tolist()
+    commissions = df["Commission [%]"].to_numpy(dtype=np.float64)[top].tolist()
+    revenues = df["Revenue [/100 USDT]"].to_numpy(dtype=np.float64)[top].tolist()
+    sell_kind, buy_kind = LEG_KINDS[2] if minus else LEG_KINDS[0]
+    return [
+        Opportunity(
+            symbol=symbol,
+            sell_exchange=exchange,
+            sell_kind=sell_kind,
+            sell_rate=np.nan if minus else rate,
+            buy_exchange=exchange,
+            buy_kind=buy_kind,
+            buy_rate=rate if minus else np.nan,
+            divergence=abs(rate) if minus else rate,
+            commission=commission,
+            revenue=revenue,
+        )
+        for symbol, rate, commission, revenue in zip(
+            symbols, rates, commissions, revenues
+        )
+    ]
+
+
+def multi_exchange_opportunities(
+    df: pd.DataFrame, n: int, sorted_by: str, legs=None
+) -> list:
+    """
+    Get the top n opportunities of a large funding rate divergence DataFrame between multi CEX.
+    The highest funding rate is sold and the lowest bought, with the legs of the commission sign cases.
+
+    Args:
+        df (pd.DataFrame): DataFrame of FundingRateArbitrage.get_large_divergence_dataframe_multi_exchanges.
+        n (int): Number of opportunities.
+        sorted_by (str): Column ranked (Revenue [/100 USDT], Divergence [%]).
+        legs (tuple): (sell, buy) exchange positions of every row of df
+            (see FundingRateArbitrage.build_divergence_dataframe). Computed from the rates if None.
+
+    Returns (list): Opportunities ranked by sorted_by.
+
+    """
+    top = top_positions(df[sorted_by].to_numpy(dtype=np.float64), n)
+    num_exchanges = df.columns.get_loc("Divergence [%]")
+    exchanges = df.columns[:num_exchanges].tolist()
+    rates = df.iloc[top, :num_exchanges].to_numpy(dtype=np.float64)
+    if legs is None:
+        listed = ~np.isnan(rates)
+        sell = np.where(listed, rates, -np.inf).argmax(axis=1)
+        buy = np.where(listed, rates, np.inf).argmin(axis=1)
+    else:
+        sell, buy = legs[0][top], legs[1][top]
+    rows = np.arange(len(top))
+    sell_rates, buy_rates = rates[rows, sell], rates[rows, buy]
+    sign_case = np.where(buy_rates >= 0, 0, np.where(sell_rates >= 0, 1, 2))
+    columns = [
+        df[c].to_numpy(dtype=np.float64)[top].tolist()
+        for c in ["Divergence [%]", "Commission [%]", "Revenue [/100 USDT]"]
+    ]
+    opportunities = []
+    for symbol, s, b, sell_rate, buy_rate, case, divergence, commission, revenue in zip(
+        df.index[top].tolist(),
+        sell.tolist(),
+        buy.tolist(),
+        sell_rates.tolist(),
+        buy_rates.tolist(),
+        sign_case.tolist(),
+        *columns,
+    ):
+        sell_kind, buy_kind = LEG_KINDS[case]
+        opportunities.append(
+            Opportunity(
+                symbol=symbol,
+                sell_exchange=exchanges[s],
+                sell_kind=sell_kind,
+                sell_rate=sell_rate if sell_kind == "Perp" else np.nan,
+                buy_exchange=exchanges[b],
+                buy_kind=buy_kind,
+                buy_rate=buy_rate if buy_kind == "Perp" else np.nan,
+                divergence=divergence,
+                commission=commission,
+                revenue=revenue,
+            )
+        )
+    return opportunities
+
+
+def single_exchange_lines(opportunity: Opportunity) -> list:
+    """
+    Format an opportunity on single CEX as rich markup lines.
+
+    Args:
+        opportunity (Opportunity): Opportunity.
+
+    Returns (list): Lines.
+
+    """
+    o = opportunity
+    color = "bold deep_sky_blue1" if o.revenue > 0 else "bold red"
+    rate = o.sell_rate if o.sell_kind == "Perp" else o.buy_rate
+    return [
+        "------------------------------------------------",
+        f"[{color}]Revenue: {o.revenue} / 100USDT[/]",
+        f"[bold red]SELL: {o.symbol} {o.sell_kind}[/]",
+        f"[bold blue]BUY: {o.symbol} {o.buy_kind}[/]",
+        f"Funding Rate: {rate:.4f} %",
+        f"Commission: {o.commission} %",
+    ]
+
+
+def multi_exchange_lines(opportunity: Opportunity) -> list:
+    """
+    Format an opportunity between multi CEX as rich markup lines.
+
+    Args:
+        opportunity (Opportunity): Opportunity.
+
+    Returns (list): Lines.
+
+    """
+    o = opportunity
+    color = "bold deep_sky_blue1" if o.revenue > 0 else "bold red"
+    legs = []
+    for side, color_leg, exchange, kind, rate in [
+        ("SELL", "bold red", o.sell_exchange, o.sell_kind, o.sell_rate),
+        ("BUY", "bold blue", o.buy_exchange, o.buy_kind, o.buy_rate),
+    ]:
+        rate_text = f" (Funding Rate {rate:.4f} %)" if kind == "Perp" else ""
+        legs.append(f"[{color_leg}]{side}: {exchange} {o.symbol} {kind}{rate_text}[/]")
+    return [
+        "------------------------------------------------",
+        f"[{color}]Revenue: {o.revenue:.4f} USDT / 100USDT[/]",
+        *legs,
+        f"Divergence: {o.divergence:.4f} %",
+        f"Commission: {o.commission:.4f} %",
+    ]
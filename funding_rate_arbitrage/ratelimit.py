@@ -0,0 +1,112 @@
+"""
+Request budget of CEX
+"""
+
+import asyncio
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. Tokens refill at `rate` per second up to `capacity`,
+    and every request takes one token, waiting for it when the bucket is empty.
+    """
+
+    def __init__(
+        self, rate: float, capacity=1.0, clock=time.monotonic, sleep=time.sleep
+    ):
+        """
+        Args:
+            rate (float): Tokens refilled per second.
+            capacity (float): Maximum number of tokens (burst size).
+            clock (callable): Clock returning seconds.
+            sleep (callable): Function sleeping for the given seconds.
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_exchange(cls, ex, capacity=1.0, **kwargs) -> "TokenBucket":
+        """
+        Build a token bucket from ccxt rateLimit (minimum interval between requests [ms]).
+
+        Args:
+            ex (ccxt.Exchange): Exchange object.
+            capacity (float): Maximum number of tokens (burst size).
+
+        Returns (TokenBucket): Token bucket of the exchange.
+
+        """
+        rate_limit = getattr(ex, "rateLimit", None) or 1000
+        return cls(rate=1000 / rate_limit, capacity=capacity, **kwargs)
+
+    def try_acquire(self, tokens=1.0) -> bool:
+        """
+        Take tokens if available without waiting.
+
+        Args:
+            tokens (float): Number of tokens.
+
+        Returns (bool): True if the tokens were taken.
+
+        """
+        return not self._take(tokens)
+
+    def acquire(self, tokens=1.0) -> float:
+        """
+        Take tokens, waiting until they are available.
+
+        Args:
+            tokens (float): Number of tokens.
+
+        Returns (float): Seconds waited.
+
+        """
+        waited = 0.0
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return waited
+            self.sleep(wait)
+            waited += wait
+
+    async def acquire_async(self, tokens=1.0, sleep=asyncio.sleep) -> float:
+        """
+        Take tokens, waiting on the event loop until they are available.
+
+        Args:
+            tokens (float): Number of tokens.
+            sleep (callable): Coroutine function sleeping for the given seconds.
+
+        Returns (float): Seconds waited.
+
+        """
+        waited = 0.0
+        while True:
+            wait = self._take(tokens)
+            if not wait:
+                return waited
+            await sleep(wait)
+            waited += wait
+
+    def _take(self, tokens: float) -> float:
+        # take tokens and return 0, or return seconds until they are available
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
@@ -0,0 +1,223 @@
+"""
+Resilient requests to CEX: rate limiting, retries with backoff and circuit breaking
+"""
+
+import asyncio
+import logging
+import random
+import time
+from dataclasses import dataclass, field
+
+from funding_rate_arbitrage.lazy import ccxt
+from funding_rate_arbitrage.ratelimit import TokenBucket
+
+log = logging.getLogger("rich")
+
+
+class CircuitOpen(Exception):
+    """
+    Raised on requests to an exchange dropped from the current scan.
+    """
+
+
+@dataclass
+class ExchangeReport:
+    """
+    Requests and errors of one exchange in a scan.
+    """
+
+    requests: int = 0
+    retries: int = 0
+    # symbol -> error of symbols that failed
+    failed_symbols: dict = field(default_factory=dict)
+    # error that dropped the exchange from the scan
+    error: str = None
+
+    @property
+    def dropped(self) -> bool:
+        return self.error is not None
+
+
+@dataclass
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter: attempt n waits uniform(0, min(max_delay, base_delay * 2**n)) seconds.
+    """
+
+    max_retries: int = 4
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, random=random.random) -> float:
+        return random() * min(self.max_delay, self.base_delay * 2**attempt)
+
+
+class ResilientFetcher:
+    """
+    Sends requests to CEX through a token bucket per exchange and retries network errors
+    (timeouts, rate limits, maintenance, ...) with jittered exponential backoff.
+    After max_failures consecutive requests fail, the exchange circuit opens and its remaining
+    requests raise CircuitOpen, so the scan drops it and keeps results of the other exchanges.
+    Exchange errors (bad symbol, bad request, ...) are not retried.
+    """
+
+    def __init__(
+        self,
+        retry=None,
+        max_failures=5,
+        capacity=1.0,
+        sleep=time.sleep,
+        sleep_async=asyncio.sleep,
+        random=random.random,
+        on_retry=None,
+    ):
+        """
+        Args:
+            retry (RetryPolicy): Backoff of retries. RetryPolicy() if None.
+            max_failures (int): Consecutive failed requests opening the circuit of an exchange.
+            capacity (float): Burst size of token buckets.
+            sleep (callable): Function sleeping for the given seconds.
+            sleep_async (callable): Coroutine function sleeping for the given seconds.
+            random (callable): Function returning a float in [0, 1) for jitter.
+            on_retry (callable): Function of exchange id called on every retry (instrumentation, ...).
+        """
+        self.retry = retry or RetryPolicy()
+        self.max_failures = max_failures
+        self.capacity = capacity
+        self.sleep = sleep
+        self.sleep_async = sleep_async
+        self.random = random
+        self.on_retry = on_retry
+        # exchange id -> TokenBucket, shared by sync and async clients
+        self.buckets = {}
+        # exchange id -> ExchangeReport of the current scan
+        self.report = {}
+        self._failures = {}
+
+    def begin(self, exchanges: list) -> None:
+        """
+        Start a scan: reset reports and close circuits of the exchanges.
+
+        Args:
+            exchanges (list): Exchange ids.
+
+        Returns: None
+
+        """
+        for exchange in exchanges:
+            self.report[exchange] = ExchangeReport()
+            self._failures[exchange] = 0
+
+    def bucket(self, ex) -> TokenBucket:
+        """
+        Get the token bucket of the exchange, built from its ccxt rateLimit.
+
+        Args:
+            ex (ccxt.Exchange): Exchange object.
+
+        Returns (TokenBucket): Token bucket of the exchange.
+
+        """
+        if ex.id not in self.buckets:
+            self.buckets[ex.id] = TokenBucket.from_exchange(ex, capacity=self.capacity)
+        return self.buckets[ex.id]
+
+    async def call(self, ex, method: str, *args, **kwargs):
+        """
+        Call a ccxt method of an async exchange object with rate limiting and retries.
+
+        Args:
+            ex (ccxt.async_support.Exchange): Exchange object.
+            method (str): Method name (fetch_funding_rates, ...).
+
+        Returns: Result of the method.
+
+        """
+        report = self._report(ex.id)
+        for attempt in range(self.retry.max_retries + 1):
+            self._check(ex.id)
+            await self.bucket(ex).acquire_async(sleep=self.sleep_async)
+            report.requests += 1
+            try:
+                result = await getattr(ex, method)(*args, **kwargs)
+            except ccxt.NetworkError as e:
+                if not self._retry(ex.id, method, attempt, e):
+                    raise
+                await self.sleep_async(self.retry.delay(attempt, self.random))
+                continue
+            self._failures[ex.id] = 0
+            return result
+
+    def call_sync(self, ex, method: str, *args, **kwargs):
+        """
+        Call a ccxt method of a sync exchange object with rate limiting and retries.
+
+        Args:
+            ex (ccxt.Exchange): Exchange object.
+            method (str): Method name (fetch_funding_rates, ...).
+
+        Returns: Result of the method.
+
+        """
+        report = self._report(ex.id)
+        for attempt in range(self.retry.max_retries + 1):
+            self._check(ex.id)
+            self.bucket(ex).acquire()
+            report.requests += 1
+            try:
+                result = getattr(ex, method)(*args, **kwargs)
+            except ccxt.NetworkError as e:
+                if not self._retry(ex.id, method, attempt, e):
+                    raise
+                self.sleep(self.retry.delay(attempt, self.random))
+                continue
+            self._failures[ex.id] = 0
+            return result
+
+    def symbol_failed(self, exchange: str, symbol: str, error: Exception) -> None:
+        """
+        Record a symbol that failed.
+
+        Args:
+            exchange (str): Exchange id.
+            symbol (str): Symbol (BTC/USDT:USDT, ...).
+            error (Exception): Error of the symbol.
+
+        Returns: None
+
+        """
+        self._report(exchange).failed_symbols[symbol] = repr(error)
+
+    def exchange_failed(self, exchange: str, error: Exception) -> None:
+        """
+        Record the error dropping an exchange from the scan.
+
+        Args:
+            exchange (str): Exchange id.
+            error (Exception): Error of the exchange.
+
+        Returns: None
+
+        """
+        self._report(exchange).error = repr(error)
+
+    def _report(self, exchange: str) -> ExchangeReport:
+        if exchange not in self.report:
+            self.begin([exchange])
+        return self.report[exchange]
+
+    def _check(self, exchange: str) -> None:
+        if self._failures[exchange] >= self.max_failures:
+            raise CircuitOpen(
+                f"{exchange}: {self.max_failures} consecutive requests failed."
+            )
+
+    def _retry(self, exchange: str, method: str, attempt: int, error) -> bool:
+        if attempt == self.retry.max_retries:
+            self._failures[exchange] += 1
+            return False
+        self.report[exchange].retries += 1
+        if self.on_retry is not None:
+            self.on_retry(exchange)
+        log.warning(f"{exchange}: {method} failed ({error!r}), retrying.")
+        return True
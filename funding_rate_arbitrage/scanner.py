@@ -0,0 +1,235 @@
+"""
+Continuous scanner of funding rate divergence between multi CEX
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import time
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from funding_rate_arbitrage.frarb import DIVERGENCE_COLUMNS
+from funding_rate_arbitrage.lazy import ccxt, pd
+from funding_rate_arbitrage.resilience import CircuitOpen
+from funding_rate_arbitrage.settlement import HOUR_MS
+
+log = logging.getLogger("rich")
+
+SORTED_BY = {"revenue": "Revenue [/100 USDT]", "divergence": "Divergence [%]"}
+
+
+class LiveScanner:
+    """
+    Keeps the latest funding rate matrix of multi CEX in memory and refreshes exchanges on a schedule.
+    A refresh rebuilds only the rows of symbols whose funding rate changed and moves them in a
+    sorted ranking, so it costs O(changed symbols) instead of O(universe).
+    """
+
+    def __init__(
+        self,
+        fr,
+        exchanges=None,
+        interval=60.0,
+        sorted_by="revenue",
+        fetch=None,
+        clock=time.monotonic,
+        sleep=time.sleep,
+        alerts=None,
+    ):
+        """
+        Args:
+            fr (FundingRateArbitrage): Provides fetching and the divergence/commission computation.
+            exchanges (list): Names of exchanges. fr.exchanges if None.
+            interval (float | dict): Seconds between refreshes, or dict of exchange name and seconds.
+            sorted_by (str): Ranked by "revenue" or "divergence".
+            fetch (callable): Function of exchange name returning dict of perpetual contract pair and
+                funding rate or FundingSettlement. fr.fetch_all_funding_rate (details) if None.
+            clock (callable): Clock returning seconds.
+            sleep (callable): Function sleeping for the given seconds.
+            alerts (AlertEngine): Evaluates alert rules on the rebuilt rows of every refresh.
+        """
+        if sorted_by not in SORTED_BY:
+            log.error(f"{sorted_by} is not available.")
+            raise KeyError(sorted_by)
+        self.fr = fr
+        self.exchanges = list(exchanges or fr.exchanges)
+        self.sorted_by = SORTED_BY[sorted_by]
+        self.fetch = fetch or (
+            lambda exchange: fr.fetch_all_funding_rate(exchange, details=True)
+        )
+        # reports exchanges dropped in the middle of a fetch (partial results)
+        self._fetcher = fr.fetcher if fetch is None else None
+        self.clock = clock
+        self.sleep = sleep
+        self.alerts = alerts
+        self.intervals = (
+            dict(interval)
+            if isinstance(interval, dict)
+            else {ex: interval for ex in self.exchanges}
+        )
+        # symbol -> exchange -> funding rate
+        self.rates = {}
+        # symbol -> row of the large divergence DataFrame
+        self.rows = {}
+        # symbol -> first settlement of either leg [ms], NaN if unknown
+        self._settlements = {}
+        # exchange -> listed symbols
+        self._listed = {}
+        self._ranking = []
+        self._rank_key = {}
+        self._next_refresh = {ex: clock() for ex in self.exchanges}
+
+    def refresh(self, exchange: str) -> set:
+        """
+        Fetch funding rates of the exchange and update rows and ranking of changed symbols.
+        When the exchange circuit opened during the fetch, symbols not fetched keep their
+        previous funding rates. With fr.normalize_symbols, symbols are aligned on canonical
+        instruments (see FundingRateArbitrage.get_instrument_index).
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+
+        Returns (set): Changed symbols.
+
+        """
+        fr = self.fetch(exchange)
+        if self.fr.normalize_symbols:
+            fr = self.fr.get_instrument_index().align({exchange: fr})[exchange]
+        changed = set()
+        for symbol, rate in fr.items():
+            if rate is None:
+                continue
+            rates = self.rates.setdefault(symbol, {})
+            if _changed(rates.get(exchange), rate):
+                rates[exchange] = rate
+                changed.add(symbol)
+        listed = {s for s, rate in fr.items() if rate is not None}
+        if self._partial(exchange):
+            listed.update(self._listed.get(exchange, set()))
+        for symbol in self._listed.get(exchange, set()).difference(listed):
+            del self.rates[symbol][exchange]
+            changed.add(symbol)
+        self._listed[exchange] = listed
+        self._rebuild(changed)
+        return changed
+
+    def run_pending(self) -> dict:
+        """
+        Refresh the exchanges whose refresh is due.
+        A failing exchange keeps its previous funding rates until the next refresh.
+
+        Returns (dict): Dict of refreshed exchange name and changed symbols.
+
+        """
+        refreshed = {}
+        now = self.clock()
+        for ex, due in self._next_refresh.items():
+            if due > now:
+                continue
+            self._next_refresh[ex] = now + self.intervals[ex]
+            try:
+                refreshed[ex] = self.refresh(ex)
+            except (ccxt.BaseError, CircuitOpen):
+                log.exception(f"failed to refresh {ex}.")
+                continue
+            log.info(f"{ex}: {len(refreshed[ex])} symbols changed")
+        return refreshed
+
+    def run_forever(self, iterations=None) -> None:
+        """
+        Refresh exchanges on schedule until interrupted.
+
+        Args:
+            iterations (int): Number of scheduling rounds. Forever if None.
+
+        Returns: None
+
+        """
+        done = 0
+        while iterations is None or done < iterations:
+            self.run_pending()
+            done += 1
+            wait = min(self._next_refresh.values()) - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+
+    def top(self, display_num=10, now=None) -> pd.DataFrame:
+        """
+        Get the current top of the ranking.
+        Time to Settlement is counted from now, not from the refresh of the row.
+
+        Args:
+            display_num (int): Number of display.
+            now (float): Current time [ms]. time.time() if None.
+
+        Returns (pd.DataFrame): DataFrame sorted by large funding rate divergence.
+
+        """
+        symbols = [symbol for _, symbol in self._ranking[:display_num]]
+        columns = self.exchanges + DIVERGENCE_COLUMNS
+        df = pd.DataFrame(
+            [self.rows[s] for s in symbols], index=symbols, columns=columns
+        )
+        if now is None:
+            now = time.time() * 1000
+        settlement = np.array([self._settlements[s] for s in symbols], dtype=float)
+        with np.errstate(invalid="ignore"):
+            # settlements passed since the refresh are unknown until the next one
+            df["Time to Settlement [h]"] = np.where(
+                settlement > now, (settlement - now) / HOUR_MS, np.nan
+            )
+        return df
+
+    def _rebuild(self, symbols: set) -> None:
+        listed = [s for s in symbols if self.rates.get(s)]
+        for symbol in symbols.difference(listed):
+            self.rates.pop(symbol, None)
+            self.rows.pop(symbol, None)
+            self._settlements.pop(symbol, None)
+            self._unrank(symbol)
+            if self.alerts is not None:
+                self.alerts.forget(symbol)
+        if not listed:
+            return
+        now = time.time() * 1000
+        df = self.fr.build_divergence_dataframe(
+            {
+                ex: {s: self.rates[s][ex] for s in listed if ex in self.rates[s]}
+                for ex in self.exchanges
+            },
+            now=now,
+        )
+        for symbol, row in zip(df.index, df.to_dict("records")):
+            self.rows[symbol] = row
+            self._settlements[symbol] = now + row["Time to Settlement [h]"] * HOUR_MS
+            self._unrank(symbol)
+            score = row[self.sorted_by]
+            if not math.isnan(score):
+                key = (-score, symbol)
+                insort(self._ranking, key)
+                self._rank_key[symbol] = key
+        if self.alerts is not None:
+            self.alerts.update({s: self.rows[s] for s in df.index})
+
+    def _partial(self, exchange: str) -> bool:
+        if self._fetcher is None:
+            return False
+        report = self._fetcher.report.get(exchange)
+        return report is not None and report.dropped
+
+    def _unrank(self, symbol: str) -> None:
+        key = self._rank_key.pop(symbol, None)
+        if key is not None:
+            del self._ranking[bisect_left(self._ranking, key)]
+
+
+def _changed(previous, rate) -> bool:
+    if previous is None or previous == rate:
+        return previous is None
+    # unknown fields (NaN) of FundingSettlement are equal
+    if isinstance(rate, tuple):
+        return any(a != b and not (a != a and b != b) for a, b in zip(previous, rate))
+    return True
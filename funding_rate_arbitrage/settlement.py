@@ -0,0 +1,121 @@
+"""
+Funding settlement schedule of perpetual contracts
+"""
+
+import re
+from typing import NamedTuple
+
+import numpy as np
+
+HOUR_MS = 60 * 60 * 1000
+# most CEX settle every 8h, used when the interval is unknown
+DEFAULT_INTERVAL_MS = 8 * HOUR_MS
+INTERVAL_UNITS = {"m": 60 * 1000, "h": HOUR_MS, "d": 24 * HOUR_MS}
+
+
+class FundingSettlement(NamedTuple):
+    """
+    Funding rate of a perpetual contract with its settlement schedule.
+    funding_timestamp is the settlement of rate and next_funding_timestamp the one after [ms].
+    interval is the settlement interval [ms], NaN if unknown.
+    """
+
+    rate: float
+    funding_timestamp: float
+    next_funding_timestamp: float
+    interval: float
+
+
+def parse_interval(interval) -> float:
+    """
+    Parse ccxt funding interval.
+
+    Args:
+        interval (str): Funding interval (1h, 8h, ...).
+
+    Returns (float): Funding interval [ms], NaN if unknown.
+
+    """
+    m = re.fullmatch(r"(\d+)([mhd])", interval or "")
+    if m is None:
+        return np.nan
+    return float(int(m.group(1)) * INTERVAL_UNITS[m.group(2)])
+
+
+def settlement_from_ccxt(fr: dict) -> FundingSettlement:
+    """
+    Get funding settlement from a ccxt funding rate structure.
+    The interval falls back to the gap between fundingTimestamp and nextFundingTimestamp.
+
+    Args:
+        fr (dict): ccxt funding rate structure.
+
+    Returns (FundingSettlement): Funding settlement.
+
+    """
+    funding_timestamp = fr.get("fundingTimestamp")
+    next_funding_timestamp = fr.get("nextFundingTimestamp")
+    interval = parse_interval(fr.get("interval"))
+    if np.isnan(interval) and funding_timestamp and next_funding_timestamp:
+        if next_funding_timestamp > funding_timestamp:
+            interval = float(next_funding_timestamp - funding_timestamp)
+    return FundingSettlement(
+        rate=fr["fundingRate"],
+        funding_timestamp=np.nan if funding_timestamp is None else funding_timestamp,
+        next_funding_timestamp=(
+            np.nan if next_funding_timestamp is None else next_funding_timestamp
+        ),
+        interval=interval,
+    )
+
+
+def normalize_rates(rates, intervals, horizon: float):
+    """
+    Scale funding rates to a common horizon.
+    Rates with unknown interval (NaN) are assumed to settle every 8h.
+
+    Args:
+        rates (ndarray): Funding rates.
+        intervals (ndarray): Settlement intervals [ms], same shape as rates.
+        horizon (float): Horizon [h].
+
+    Returns (ndarray): Funding rates accrued over the horizon.
+
+    """
+    intervals = np.where(np.isnan(intervals), DEFAULT_INTERVAL_MS, intervals)
+    return rates * (horizon * HOUR_MS / intervals)
+
+
+def settlement_grid(timestamps, resolution=HOUR_MS) -> np.ndarray:
+    """
+    Snap settlement times to a grid, so that settlements recorded a few ms apart
+    on different exchanges or symbols share a grid point.
+
+    Args:
+        timestamps (ndarray): Settlement times [ms].
+        resolution (int): Grid step [ms], rounded to the nearest step.
+
+    Returns (ndarray): Settlement times on the grid [ms].
+
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    return (timestamps + resolution // 2) // resolution * resolution
+
+
+def next_settlement(funding_timestamps, next_funding_timestamps, now: float):
+    """
+    Get the first settlement after now.
+
+    Args:
+        funding_timestamps (ndarray): fundingTimestamp [ms].
+        next_funding_timestamps (ndarray): nextFundingTimestamp [ms], same shape.
+        now (float): Current time [ms].
+
+    Returns (ndarray): Timestamp of the next settlement [ms], NaN if unknown or stale.
+
+    """
+    with np.errstate(invalid="ignore"):
+        settlement = np.where(
+            funding_timestamps > now, funding_timestamps, next_funding_timestamps
+        )
+        return np.where(settlement > now, settlement, np.nan)
@@ -0,0 +1,191 @@
+"""
+Funding rate snapshots shared between processes through memory-mapped files
+"""
+
+import logging
+import os
+import shutil
+import time
+from typing import NamedTuple
+
+import numpy as np
+
+from funding_rate_arbitrage.settlement import FundingSettlement
+
+log = logging.getLogger("rich")
+
+# arrays of a snapshot, one .npy file each
+COLUMNS = ["rates", "funding_timestamps", "next_funding_timestamps", "intervals"]
+# reads retried when the latest snapshot is pruned by the writer while it is opened
+READ_ATTEMPTS = 3
+
+
+class Snapshot(NamedTuple):
+    """
+    Funding rates of an exchange at a snapshot time [ms].
+    Arrays are read-only memory maps of the snapshot files, aligned with symbols.
+    """
+
+    exchange: str
+    timestamp: int
+    symbols: np.ndarray
+    rates: np.ndarray
+    funding_timestamps: np.ndarray
+    next_funding_timestamps: np.ndarray
+    intervals: np.ndarray
+
+    def age(self, now=None) -> float:
+        """
+        Get the age of the snapshot.
+
+        Args:
+            now (float): Current time [s]. time.time() if None.
+
+        Returns (float): Age [s].
+
+        """
+        now = time.time() if now is None else now
+        return now - self.timestamp / 1000
+
+    def to_dict(self, details=False) -> dict:
+        """
+        Convert to the result of FundingRateArbitrage.fetch_all_funding_rate.
+
+        Args:
+            details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+
+        Returns (dict): Dict of perpetual contract pair and funding rate.
+
+        """
+        symbols = self.symbols.tolist()
+        if not details:
+            return dict(zip(symbols, self.rates.tolist()))
+        return dict(
+            zip(
+                symbols,
+                map(
+                    FundingSettlement,
+                    self.rates.tolist(),
+                    self.funding_timestamps.tolist(),
+                    self.next_funding_timestamps.tolist(),
+                    self.intervals.tolist(),
+                ),
+            )
+        )
+
+
+class SnapshotCache:
+    """
+    Directory of funding rate snapshots keyed by (exchange, snapshot time).
+    One scanner writes snapshots and any number of processes read them: every column is a .npy file
+    opened as a read-only memory map, so readers share the page cache instead of copying.
+    A snapshot is written to a temporary directory and renamed into place, so readers never see
+    a partial snapshot. Only the latest `keep` snapshots of an exchange are kept.
+
+    Layout: <directory>/<exchange>/<snapshot time [ms]>/{symbols,rates,...}.npy
+    """
+
+    def __init__(self, directory: str, keep=2, clock=time.time):
+        """
+        Args:
+            directory (str): Directory of snapshots, shared by writer and readers.
+            keep (int): Number of snapshots kept per exchange.
+            clock (callable): Clock returning seconds since epoch.
+        """
+        self.directory = directory
+        self.keep = keep
+        self.clock = clock
+        os.makedirs(directory, exist_ok=True)
+
+    def write(self, exchange: str, fr: dict, timestamp=None) -> Snapshot:
+        """
+        Write a snapshot of funding rates of the exchange.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            fr (dict): Dict of perpetual contract pair and funding rate or FundingSettlement.
+            timestamp (int): Snapshot time [ms]. Now if None.
+
+        Returns (Snapshot): Written snapshot.
+
+        """
+        if timestamp is None:
+            timestamp = int(self.clock() * 1000)
+        values = [
+            v if isinstance(v, FundingSettlement) else (v, np.nan, np.nan, np.nan)
+            for v in fr.values()
+        ]
+        table = np.array(values, dtype=np.float64).reshape(len(values), len(COLUMNS))
+        exchange_dir = os.path.join(self.directory, exchange)
+        os.makedirs(exchange_dir, exist_ok=True)
+        tmp = os.path.join(exchange_dir, f".tmp-{os.getpid()}-{timestamp}")
+        os.makedirs(tmp, exist_ok=True)
+        np.save(os.path.join(tmp, "symbols.npy"), np.array(list(fr), dtype=str))
+        for i, column in enumerate(COLUMNS):
+            np.save(os.path.join(tmp, f"{column}.npy"), table[:, i])
+        path = os.path.join(exchange_dir, str(timestamp))
+        try:
+            os.rename(tmp, path)
+        except OSError:
+            # a snapshot of the same time was published by another writer
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._prune(exchange)
+        return self._open(exchange, timestamp)
+
+    def read(self, exchange: str, max_age=None):
+        """
+        Read the latest snapshot of the exchange.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            max_age (float): Maximum age [s] of the snapshot. Any age if None.
+
+        Returns (Snapshot | None): Latest snapshot, None if missing, older than max_age
+            or pruned by the writer on every attempt.
+
+        """
+        for _ in range(READ_ATTEMPTS):
+            timestamps = self.timestamps(exchange)
+            if not timestamps:
+                return None
+            timestamp = timestamps[-1]
+            if max_age is not None and self.clock() - timestamp / 1000 > max_age:
+                return None
+            try:
+                return self._open(exchange, timestamp)
+            except FileNotFoundError:
+                # pruned by the writer in the meantime
+                continue
+        log.warning(f"{exchange}: latest snapshot could not be opened, giving up.")
+        return None
+
+    def timestamps(self, exchange: str) -> list:
+        """
+        Get snapshot times of the exchange.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+
+        Returns (list): Snapshot times [ms] in ascending order.
+
+        """
+        try:
+            names = os.listdir(os.path.join(self.directory, exchange))
+        except FileNotFoundError:
+            return []
+        return sorted(int(name) for name in names if name.isdigit())
+
+    def _open(self, exchange: str, timestamp: int) -> Snapshot:
+        path = os.path.join(self.directory, exchange, str(timestamp))
+        columns = [
+            np.load(os.path.join(path, f"{column}.npy"), mmap_mode="r")
+            for column in ["symbols"] + COLUMNS
+        ]
+        return Snapshot(exchange, timestamp, *columns)
+
+    def _prune(self, exchange: str) -> None:
+        for timestamp in self.timestamps(exchange)[: -self.keep]:
+            shutil.rmtree(
+                os.path.join(self.directory, exchange, str(timestamp)),
+                ignore_errors=True,
+            )
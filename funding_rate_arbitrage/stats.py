@@ -0,0 +1,181 @@
+"""
+Rolling statistics of funding rate histories
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+from funding_rate_arbitrage.lazy import pd
+
+YEAR_MS = 365 * 24 * 60 * 60 * 1000
+STATISTICS = ["mean", "std", "zscore", "annualized_carry", "sign_persistence"]
+
+
+def rolling_statistics(
+    histories: pd.DataFrame, window=90, min_periods=2
+) -> pd.DataFrame:
+    """
+    Compute rolling statistics of every (exchange, symbol) history at once.
+    Windows count settlements, so venues settling every 1h/4h/8h all use the last `window` settlements.
+    Rates are ccxt raw rates (not %).
+
+    - mean, std: rolling mean and sample standard deviation of funding rate.
+    - zscore: (funding rate - mean) / std.
+    - annualized_carry: mean x settlements per year, from the settlement interval in the window.
+    - sign_persistence: share of settlements in the window with the same sign as the latest one.
+
+    Args:
+        histories (pd.DataFrame): timestamp [ms] and funding_rate columns indexed by (exchange, symbol)
+            (see FundingRateHistoryStore.load_histories).
+        window (int): Number of settlements in a window.
+        min_periods (int): Minimum number of settlements to compute statistics (NaN below).
+
+    Returns (pd.DataFrame): timestamp, funding_rate and statistics columns indexed by (exchange, symbol),
+        sorted by settlement time within each pair.
+
+    """
+    group, order = _group_order(histories)
+    group = group[order]
+    timestamp = histories["timestamp"].to_numpy(dtype=np.int64)[order]
+    rate = histories["funding_rate"].to_numpy(dtype=np.float64)[order]
+
+    n = len(rate)
+    position = np.arange(n)
+    new_group = np.ones(n, dtype=bool)
+    new_group[1:] = group[1:] != group[:-1]
+    group_start = np.maximum.accumulate(np.where(new_group, position, 0))
+    window_start = np.maximum(position - window + 1, group_start)
+    count = position - window_start + 1
+
+    # center each pair on its first rate, so that flat histories give exactly zero variance
+    centered = rate - rate[group_start]
+    mean = _window_sum(centered, group, window_start, group_start) / count
+    sum_sq = _window_sum(centered**2, group, window_start, group_start)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = np.maximum(sum_sq - count * mean**2, 0) / (count - 1)
+        std = np.sqrt(var)
+        mean = mean + rate[group_start]
+        zscore = np.where(std > 0, (rate - mean) / std, np.nan)
+        interval = (timestamp - timestamp[window_start]) / (count - 1)
+        annualized_carry = mean * YEAR_MS / interval
+
+        positive = (rate > 0).astype(np.float64)
+        share_positive = _window_sum(positive, group, window_start, group_start) / count
+    sign_persistence = np.where(rate > 0, share_positive, 1 - share_positive)
+
+    stats = pd.DataFrame(
+        {
+            "timestamp": timestamp,
+            "funding_rate": rate,
+            "mean": mean,
+            "std": std,
+            "zscore": zscore,
+            "annualized_carry": annualized_carry,
+            "sign_persistence": sign_persistence,
+        },
+        index=histories.index[order],
+    )
+    stats.loc[count < min_periods, STATISTICS] = np.nan
+    return stats
+
+
+def forward_fill(values: np.ndarray) -> np.ndarray:
+    """
+    Fill NaN with the latest value before them along the last axis (NaN before the first value).
+
+    Args:
+        values (np.ndarray): Values.
+
+    Returns (np.ndarray): Forward filled values.
+
+    """
+    position = np.where(~np.isnan(values), np.arange(values.shape[-1]), 0)
+    np.maximum.accumulate(position, axis=-1, out=position)
+    return np.take_along_axis(values, position, axis=-1)
+
+
+def _group_order(histories: pd.DataFrame) -> tuple:
+    index = histories.index
+    codes = [np.asarray(c, dtype=np.int64) for c in index.codes]
+    group = codes[0] * len(index.levels[1]) + codes[1]
+    order = np.lexsort((histories["timestamp"].to_numpy(), group))
+    return group, order
+
+
+def _window_sum(values, group, window_start, group_start):
+    cumsum = pd.Series(values).groupby(group).cumsum().to_numpy()
+    before = np.where(window_start > group_start, cumsum[window_start - 1], 0.0)
+    return cumsum - before
+
+
+class RollingFundingRateStatistics:
+    """
+    Rolling statistics updated incrementally as new settlements arrive.
+    Only the last window - 1 settlements of every pair are kept, and an update computes
+    statistics of the new settlements only.
+    """
+
+    def __init__(self, window=90, min_periods=2):
+        """
+        Args:
+            window (int): Number of settlements in a window.
+            min_periods (int): Minimum number of settlements to compute statistics (NaN below).
+        """
+        self.window = window
+        self.min_periods = min_periods
+        # statistics of the latest settlement of every pair
+        self.latest = None
+        self._tail = None
+
+    def update(self, histories: pd.DataFrame) -> pd.DataFrame:
+        """
+        Add settlements and compute their statistics.
+        Settlements not newer than the latest one seen for the pair are ignored.
+
+        Args:
+            histories (pd.DataFrame): timestamp [ms] and funding_rate columns indexed by (exchange, symbol).
+
+        Returns (pd.DataFrame): Statistics of the new settlements (see rolling_statistics).
+
+        """
+        histories = histories[["timestamp", "funding_rate"]]
+        histories.index = _plain_index(histories.index)
+        if self.latest is not None:
+            last = self.latest["timestamp"].reindex(histories.index)
+            histories = histories[
+                ~(histories["timestamp"].to_numpy() <= last.to_numpy())
+            ]
+        touched = histories.index.unique()
+        if self._tail is None:
+            tail, untouched_tail = histories.iloc[:0], None
+        else:
+            in_touched = self._tail.index.isin(touched)
+            tail, untouched_tail = self._tail[in_touched], self._tail[~in_touched]
+        combined = pd.concat([tail, histories])
+        is_new = np.r_[np.zeros(len(tail), bool), np.ones(len(histories), bool)]
+        _, order = _group_order(combined)
+        stats = rolling_statistics(
+            combined, window=self.window, min_periods=self.min_periods
+        )
+        new_stats = stats[is_new[order]]
+
+        new_tail = (
+            stats[["timestamp", "funding_rate"]]
+            .groupby(level=[0, 1], sort=False)
+            .tail(self.window - 1)
+        )
+        self._tail = pd.concat([untouched_tail, new_tail])
+        latest = new_stats.groupby(level=[0, 1], sort=False).tail(1)
+        if self.latest is not None:
+            latest = pd.concat([self.latest[~self.latest.index.isin(touched)], latest])
+        self.latest = latest
+        return new_stats
+
+
+def _plain_index(index: pd.MultiIndex) -> pd.MultiIndex:
+    # categorical levels of different loads do not concatenate, so use plain string levels
+    return pd.MultiIndex.from_arrays(
+        [index.get_level_values(0).astype(str), index.get_level_values(1).astype(str)],
+        names=index.names,
+    )
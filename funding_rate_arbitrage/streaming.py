@@ -0,0 +1,412 @@
+"""
+Streaming funding rate ingestion with exchange WebSocket feeds (ccxt.pro)
+"""
+
+import asyncio
+import collections
+import json
+import logging
+import threading
+import time
+
+import numpy as np
+
+from funding_rate_arbitrage.lazy import ccxt
+from funding_rate_arbitrage.settlement import settlement_from_ccxt
+
+log = logging.getLogger("rich")
+
+
+class LatestRateTable:
+    """
+    Thread-safe table of the latest funding rate of every (exchange, symbol).
+    Also keeps end-to-end update latency: local update time - message timestamp.
+    """
+
+    def __init__(self, clock=time.time, max_latency_samples=100_000):
+        """
+        Args:
+            clock (callable): Clock returning epoch seconds.
+            max_latency_samples (int): Number of latest latency samples kept.
+        """
+        self.clock = clock
+        self.max_latency_samples = max_latency_samples
+        self._rates = {}
+        self._latencies = collections.deque(maxlen=max_latency_samples)
+        self._lock = threading.Lock()
+
+    def update(self, exchange: str, funding_rate: dict) -> None:
+        """
+        Store a ccxt funding rate structure.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            funding_rate (dict): ccxt funding rate structure.
+
+        Returns: None
+
+        """
+        now_ms = self.clock() * 1000
+        with self._lock:
+            self._rates.setdefault(exchange, {})[funding_rate["symbol"]] = funding_rate
+            if funding_rate.get("timestamp") is not None:
+                self._latencies.append(now_ms - funding_rate["timestamp"])
+
+    def exchanges(self) -> list:
+        """
+        Get exchanges with at least one funding rate.
+
+        Returns (list): Names of exchanges.
+
+        """
+        with self._lock:
+            return [ex for ex, rates in self._rates.items() if rates]
+
+    def get(self, exchange: str, details=False) -> dict:
+        """
+        Get the latest funding rates of the exchange.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            details (bool): Return FundingSettlement (rate and settlement schedule) instead of funding rate.
+
+        Returns (dict): Dict of perpetual contract pair and funding rate.
+
+        """
+        with self._lock:
+            rates = {
+                s: fr
+                for s, fr in self._rates.get(exchange, {}).items()
+                if fr.get("fundingRate") is not None
+            }
+        if details:
+            return {s: settlement_from_ccxt(fr) for s, fr in rates.items()}
+        return {s: fr["fundingRate"] for s, fr in rates.items()}
+
+    def latency_report(self) -> dict:
+        """
+        Get end-to-end update latency statistics.
+
+        Returns (dict): count and mean, p50, p95, p99, max latency [ms].
+
+        """
+        with self._lock:
+            latencies = np.array(self._latencies, dtype=np.float64)
+        if not len(latencies):
+            return {"count": 0}
+        p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+        return {
+            "count": len(latencies),
+            "mean": float(latencies.mean()),
+            "p50": float(p50),
+            "p95": float(p95),
+            "p99": float(p99),
+            "max": float(latencies.max()),
+        }
+
+
+class FundingRateStream:
+    """
+    Feeds a LatestRateTable from ccxt.pro clients.
+    Exchanges with watchFundingRates are subscribed over WebSocket, exchanges with only
+    watchFundingRate are subscribed symbol by symbol, and others fall back to polling
+    fetchFundingRates every poll_interval seconds.
+    """
+
+    def __init__(
+        self, clients: dict, symbols=None, table=None, poll_interval=10.0, recorder=None
+    ):
+        """
+        Args:
+            clients (dict): Dict of exchange name and ccxt.pro exchange object.
+            symbols (dict): Dict of exchange name and list of symbols. All linear perpetuals if None.
+            table (LatestRateTable): Table to feed. A new table if None.
+            poll_interval (float): Seconds between polls of exchanges without WebSocket feed.
+            recorder (JsonlRecorder): Records received messages for replay.
+        """
+        self.clients = clients
+        self.symbols = symbols or {}
+        self.table = table or LatestRateTable()
+        self.poll_interval = poll_interval
+        self.recorder = recorder
+        self._loop = None
+        self._thread = None
+        self._tasks = []
+
+    async def run(self) -> None:
+        """
+        Ingest funding rates of every exchange until stop is called.
+        An exchange whose markets fail to load is dropped, other errors are raised.
+
+        Returns: None
+
+        """
+        self._tasks = [
+            asyncio.ensure_future(self._run_exchange(name, ex))
+            for name, ex in self.clients.items()
+        ]
+        results = await asyncio.gather(*self._tasks, return_exceptions=True)
+        for name, result in zip(self.clients, results):
+            if isinstance(result, ccxt.BaseError):
+                log.error(f"{name}: funding rate feed stopped ({result!r}).")
+            elif isinstance(result, Exception):
+                raise result
+
+    def start(self) -> LatestRateTable:
+        """
+        Run the stream on a background thread.
+
+        Returns (LatestRateTable): Table fed by the stream.
+
+        """
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._loop.run_until_complete,
+            args=(self.run(),),
+            name="funding-rate-stream",
+            daemon=True,
+        )
+        self._thread.start()
+        return self.table
+
+    def stop(self) -> None:
+        """
+        Stop ingestion and close clients.
+
+        Returns: None
+
+        """
+        if self._thread is None:
+            return
+        # the loop may not have scheduled the tasks yet, so cancel them from inside it
+        if self._thread.is_alive():
+            asyncio.run_coroutine_threadsafe(self._cancel(), self._loop).result()
+        self._thread.join()
+        self._loop.close()
+        self._thread = self._loop = None
+        if self.recorder is not None:
+            self.recorder.close()
+
+    async def _cancel(self) -> None:
+        while not self._tasks and self.clients:
+            await asyncio.sleep(0)
+        for task in self._tasks:
+            task.cancel()
+
+    async def _run_exchange(self, name: str, ex) -> None:
+        try:
+            markets = await ex.load_markets()
+            symbols = self.symbols.get(name) or [
+                s for s, m in markets.items() if m.get("linear") and m.get("swap", True)
+            ]
+            if (
+                not ex.has.get("watchFundingRates")
+                and ex.has.get("watchFundingRate")
+                and len(symbols) > 1
+            ):
+                log.info(f"{name}: watching {len(symbols)} symbols one by one.")
+                tasks = [
+                    asyncio.ensure_future(
+                        self._feed(name, lambda s=s: self._watch_one(ex, s))
+                    )
+                    for s in symbols
+                ]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    for task in tasks:
+                        task.cancel()
+            else:
+                await self._feed(name, lambda: self._receive(ex, symbols))
+        finally:
+            await ex.close()
+
+    async def _feed(self, name: str, receive) -> None:
+        while True:
+            try:
+                rates = await receive()
+            except ccxt.BaseError:
+                log.exception(f"{name}: funding rate feed failed, retrying.")
+                await asyncio.sleep(self.poll_interval)
+                continue
+            for fr in rates:
+                self.table.update(name, fr)
+                if self.recorder is not None:
+                    self.recorder.record(name, fr)
+
+    async def _receive(self, ex, symbols: list) -> list:
+        if ex.has.get("watchFundingRates"):
+            return list((await ex.watch_funding_rates(symbols)).values())
+        if ex.has.get("watchFundingRate") and len(symbols) == 1:
+            return await self._watch_one(ex, symbols[0])
+        await asyncio.sleep(self.poll_interval)
+        return list((await ex.fetch_funding_rates(symbols)).values())
+
+    @staticmethod
+    async def _watch_one(ex, symbol: str) -> list:
+        return [await ex.watch_funding_rate(symbol)]
+
+
+class JsonlRecorder:
+    """
+    Records funding rate messages as JSON lines for ReplayServer.
+    """
+
+    def __init__(self, path: str, clock=time.time):
+        """
+        Args:
+            path (str): Path of the JSON lines file.
+            clock (callable): Clock returning epoch seconds.
+        """
+        self.path = path
+        self.clock = clock
+        self._start = None
+        self._file = open(path, "w")
+
+    def record(self, exchange: str, funding_rate: dict) -> None:
+        """
+        Append a message with its delay [sec] from the first recorded message.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+            funding_rate (dict): ccxt funding rate structure.
+
+        Returns: None
+
+        """
+        now = self.clock()
+        if self._start is None:
+            self._start = now
+        data = {k: v for k, v in funding_rate.items() if k != "info"}
+        message = {"delay": now - self._start, "exchange": exchange, "data": data}
+        self._file.write(json.dumps(message) + "\n")
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ReplayServer:
+    """
+    Serves recorded funding rate messages to ReplayExchange clients with their recorded timing,
+    so the streaming layer runs offline. Message timestamps are set to the replay time, so the
+    table latency report measures the local ingestion path.
+    """
+
+    def __init__(self, messages: list, speed=1.0, clock=time.time):
+        """
+        Args:
+            messages (list): Messages {"delay": sec, "exchange": name, "data": ccxt funding rate structure}.
+            speed (float): Replay speed (2.0 replays twice as fast).
+            clock (callable): Clock returning epoch seconds.
+        """
+        self.messages = sorted(messages, key=lambda m: m["delay"])
+        self.speed = speed
+        self.clock = clock
+        self.start_time = None
+
+    @classmethod
+    def from_file(cls, path: str, speed=1.0) -> "ReplayServer":
+        """
+        Load messages recorded by JsonlRecorder.
+
+        Args:
+            path (str): Path of the JSON lines file.
+            speed (float): Replay speed.
+
+        Returns (ReplayServer): Replay server.
+
+        """
+        with open(path) as f:
+            return cls([json.loads(line) for line in f if line.strip()], speed=speed)
+
+    def client(self, exchange: str) -> "ReplayExchange":
+        """
+        Get a ccxt.pro-like client replaying the messages of the exchange.
+
+        Args:
+            exchange (str): Name of exchange (binance, bybit, ...)
+
+        Returns (ReplayExchange): Replay client.
+
+        """
+        return ReplayExchange(
+            self, exchange, [m for m in self.messages if m["exchange"] == exchange]
+        )
+
+    def clients(self) -> dict:
+        """
+        Get replay clients of every recorded exchange.
+
+        Returns (dict): Dict of exchange name and replay client.
+
+        """
+        return {
+            ex: self.client(ex)
+            for ex in dict.fromkeys(m["exchange"] for m in self.messages)
+        }
+
+    def elapsed(self) -> float:
+        if self.start_time is None:
+            self.start_time = self.clock()
+        return (self.clock() - self.start_time) * self.speed
+
+
+class ReplayExchange:
+    """
+    ccxt.pro-like client of ReplayServer implementing watch_funding_rates and watch_funding_rate.
+    """
+
+    has = {"watchFundingRates": True, "watchFundingRate": True}
+
+    def __init__(self, server: ReplayServer, exchange: str, messages: list):
+        self.id = exchange
+        self.server = server
+        self.messages = messages
+        self.markets = {
+            m["data"]["symbol"]: {
+                "symbol": m["data"]["symbol"],
+                "linear": True,
+                "swap": True,
+            }
+            for m in messages
+        }
+        # None (watch_funding_rates) or symbol (watch_funding_rate) -> position in its messages
+        self._positions = {}
+        self._symbol_messages = {}
+
+    async def load_markets(self, reload=False, params={}):
+        return self.markets
+
+    async def watch_funding_rates(self, symbols=None, params={}) -> dict:
+        data = await self._next(None, self.messages)
+        if data is None:
+            # recording exhausted: behave like an idle feed
+            await asyncio.sleep(3600)
+            return {}
+        if symbols and data["symbol"] not in symbols:
+            return {}
+        return {data["symbol"]: data}
+
+    async def watch_funding_rate(self, symbol: str, params={}) -> dict:
+        if symbol not in self._symbol_messages:
+            self._symbol_messages[symbol] = [
+                m for m in self.messages if m["data"]["symbol"] == symbol
+            ]
+        data = await self._next(symbol, self._symbol_messages[symbol])
+        while data is None:
+            await asyncio.sleep(3600)
+        return data
+
+    async def _next(self, key, messages: list):
+        position = self._positions.get(key, 0)
+        if position >= len(messages):
+            return None
+        message = messages[position]
+        self._positions[key] = position + 1
+        wait = (message["delay"] - self.server.elapsed()) / self.server.speed
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return dict(message["data"], timestamp=self.server.clock() * 1000)
+
+    async def close(self):
+        pass
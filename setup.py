@@ -6,6 +6,7 @@ setup(
     description="A framework to help you easily perform funding rate arbitrage on major centralized cryptocurrency "
     "exchanges.",
     install_requires=["ccxt", "pandas", "rich", "matplotlib"],
+    extras_require={"yaml": ["pyyaml"], "arrow": ["pyarrow"]},
     packages=find_packages(include=["funding_rate_arbitrage*"], exclude=["img"]),
     author="aoki-h-jp",
     author_email="aoki.hirotaka.biz@gmail.com",
@@ -0,0 +1,48 @@
+import pytest
+
+from funding_rate_arbitrage.ratelimit import TokenBucket
+from funding_rate_arbitrage.resilience import ResilientFetcher, RetryPolicy
+
+
+class FakeClock:
+    """
+    Simulated clock: sleeping advances the time instantly.
+    """
+
+    def __init__(self, now=0.0):
+        self.now = now
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+    async def sleep_async(self, seconds: float) -> None:
+        self.sleep(seconds)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def make_fetcher(clock):
+    def make(max_failures=5, max_retries=4, exchanges=()):
+        fetcher = ResilientFetcher(
+            retry=RetryPolicy(max_retries=max_retries),
+            max_failures=max_failures,
+            sleep=clock.sleep,
+            sleep_async=clock.sleep_async,
+            random=lambda: 1.0,
+        )
+        for ex in exchanges:
+            fetcher.buckets[ex.id] = TokenBucket.from_exchange(
+                ex, clock=clock, sleep=clock.sleep
+            )
+        return fetcher
+
+    return make
@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from funding_rate_arbitrage.archive import ScanDelta, ScanSnapshot, diff_scans
+from funding_rate_arbitrage.frarb import DIVERGENCE_COLUMNS
+from funding_rate_arbitrage.lazy import pd
+
+pytest.importorskip("pyarrow")
+
+
+def _scan(rows, exchanges=("binance", "bybit")) -> pd.DataFrame:
+    df = pd.DataFrame(
+        [row[: len(exchanges)] for row in rows.values()],
+        index=list(rows),
+        columns=list(exchanges),
+        dtype=float,
+    )
+    for i, column in enumerate(DIVERGENCE_COLUMNS):
+        df[column] = [row[len(exchanges) + i] for row in rows.values()]
+    return df
+
+
+def _assert_same(a: ScanSnapshot, b: ScanSnapshot):
+    assert a.timestamp == b.timestamp
+    assert a.sorted_by == b.sorted_by
+    assert list(a.symbols) == list(b.symbols)
+    assert a.exchanges == b.exchanges
+    np.testing.assert_array_equal(a.rates, b.rates)
+    np.testing.assert_array_equal(a.metrics, b.metrics)
+    np.testing.assert_array_equal(a.ranks, b.ranks)
+
+
+def test_snapshot_round_trip(tmp_path):
+    snapshot = ScanSnapshot.from_dataframe(
+        _scan(
+            {
+                "BTC/USDT:USDT": [0.01, 0.03, 0.02, 0.1, 1.9, 2.0],
+                "ETH/USDT:USDT": [0.02, np.nan, 0.0, 0.1, -0.1, 5.0],
+                "XRP/USDT:USDT": [np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],
+            }
+        ),
+        timestamp=1_700_000_000_000,
+    )
+    snapshot.write(tmp_path / "scan.parquet")
+    _assert_same(ScanSnapshot.read(tmp_path / "scan.parquet"), snapshot)
+
+
+def test_empty_snapshot_round_trip(tmp_path):
+    snapshot = ScanSnapshot.from_dataframe(_scan({}), timestamp=1_700_000_000_000)
+    snapshot.write(tmp_path / "scan.parquet")
+    read = ScanSnapshot.read(tmp_path / "scan.parquet")
+    _assert_same(read, snapshot)
+    assert read.metrics.shape == (0, len(DIVERGENCE_COLUMNS))
+
+
+def test_empty_delta_round_trip(tmp_path):
+    df = _scan({"BTC/USDT:USDT": [0.01, 0.03, 0.02, 0.1, 1.9, 2.0]})
+    base = ScanSnapshot.from_dataframe(df, timestamp=1_700_000_000_000)
+    new = ScanSnapshot.from_dataframe(df, timestamp=1_700_000_000_000)
+    delta = diff_scans(base, new)
+    assert len(delta.changed.symbols) == 0
+    delta.write(tmp_path / "delta.parquet")
+    read = ScanDelta.read(tmp_path / "delta.parquet")
+    assert read.base_timestamp == delta.base_timestamp
+    assert len(read.removed) == 0
+    _assert_same(read.changed, delta.changed)
+    _assert_same(read.apply(base), new)
@@ -0,0 +1,44 @@
+import asyncio
+
+from ccxt import RequestTimeout
+
+from funding_rate_arbitrage import async_scan
+from funding_rate_arbitrage.fakes import FakeExchange
+
+
+def test_circuit_open_keeps_partial_results(make_fetcher):
+    ex = FakeExchange(
+        id="binance",
+        num_symbols=10,
+        bulk=False,
+        faults={"fetch_funding_rate": [None] * 4 + [RequestTimeout("down")] * 10},
+    )
+    fetcher = make_fetcher(max_failures=2, max_retries=0, exchanges=[ex])
+    result = async_scan.scan([ex], fetcher=fetcher)
+    assert list(result["binance"]) == list(ex.markets)[:4]
+    assert fetcher.report["binance"].dropped
+    # requests stop once the circuit opens
+    assert ex.calls["fetch_funding_rate"] == 6
+
+
+def test_gather_cancels_siblings():
+    cancelled = []
+
+    async def fail():
+        raise RequestTimeout("down")
+
+    async def slow():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    async def main():
+        try:
+            await async_scan.gather([slow(), fail(), slow()])
+        except RequestTimeout:
+            return True
+
+    assert asyncio.run(main())
+    assert cancelled == [True, True]